@@ -4,6 +4,8 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 import logging
 
+from app.core.executors import AsyncStorageFacade
+
 logger = logging.getLogger(__name__)
 
 # Thailand timezone (UTC+7)
@@ -320,3 +322,6 @@ class ActivityLogManager:
 
 # Global instance
 activity_log_manager = ActivityLogManager()
+
+# Awaitable facade for async code (runs calls on the storage executor)
+async_activity_log_manager = AsyncStorageFacade(activity_log_manager)
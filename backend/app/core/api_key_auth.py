@@ -4,24 +4,57 @@ Allows API access using API keys instead of JWT tokens
 """
 from fastapi import Request, HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional
-import time
+from typing import List, Optional, Tuple
 import logging
+import math
 from fastapi import Request
 
-from app.core.api_keys import api_key_manager
+from app.core.api_keys import api_key_manager, async_api_key_manager
+from app.core.config import settings
+from app.core.rate_limit import RateLimitResult, rate_limiter
 from app.core.exceptions import UnauthorizedError
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer(auto_error=False)
 
 
+def _shared_lookup(api_key: str, request: Optional[Request]):
+    """(True, result) if this request already looked up api_key"""
+    shared = getattr(request.state, "api_key_lookup", None) if request else None
+    if shared is not None and shared[0] == api_key:
+        return True, shared[1]
+    return False, None
+
+
+def lookup_api_key(api_key: str, request: Optional[Request] = None) -> Optional[dict]:
+    """api_key_manager.verify_api_key result, looked up at most once per request.
+
+    The result is kept on request.state so the logging middleware and the
+    auth dependencies share one lookup.
+    """
+    found, key_info = _shared_lookup(api_key, request)
+    if not found:
+        key_info = api_key_manager.verify_api_key(api_key)
+        if request:
+            request.state.api_key_lookup = (api_key, key_info)
+    return key_info
+
+
+async def lookup_api_key_async(api_key: str, request: Optional[Request] = None) -> Optional[dict]:
+    """lookup_api_key for async code; only a cache miss goes to the storage executor"""
+    found, key_info = _shared_lookup(api_key, request)
+    if not found:
+        found, key_info = api_key_manager.cached_verification(api_key)
+    if not found:
+        key_info = await async_api_key_manager.verify_api_key(api_key)
+    if request:
+        request.state.api_key_lookup = (api_key, key_info)
+    return key_info
+
+
 class APIKeyAuth:
     """API Key Authentication dependency"""
     
-    def __init__(self):
-        self.rate_limit_cache = {}  # Simple in-memory cache for rate limiting
-    
     def verify_api_key(
         self,
         credentials: Optional[HTTPAuthorizationCredentials] = None,
@@ -33,8 +66,8 @@ class APIKeyAuth:
         
         api_key = credentials.credentials
         
-        # Verify API key
-        key_info = api_key_manager.verify_api_key(api_key)
+        # Verify API key (reuses the lookup made earlier in this request, if any)
+        key_info = lookup_api_key(api_key, request)
         if not key_info:
             raise UnauthorizedError("Invalid API key")
         
@@ -48,8 +81,14 @@ class APIKeyAuth:
             if client_ip not in key_info["ip_whitelist"]:
                 raise UnauthorizedError(f"IP address {client_ip} not allowed")
         
-        # Check rate limit (simple implementation)
-        if not self._check_rate_limit(key_info["id"], key_info["rate_limit"]):
+        # Check rate limit (per-minute tier from the key, per-hour tier derived from it);
+        # counted once per request even if several dependencies verify the key
+        rate_limit = getattr(request.state, "rate_limit", None) if request else None
+        if rate_limit is None:
+            rate_limit = self.check_rate_limit(key_info)
+            if request:
+                request.state.rate_limit = rate_limit
+        if not rate_limit.allowed:
             from app.core.exceptions import APIException
             from app.core.error_codes import APIErrorCode
             raise APIException(
@@ -57,8 +96,9 @@ class APIKeyAuth:
                 error_code=APIErrorCode.RATE_LIMIT_EXCEEDED,
                 message="Rate limit exceeded. Please try again later.",
                 details={
-                    "rate_limit": key_info["rate_limit"],
-                    "retry_after": 60
+                    "rate_limit": rate_limit.limit,
+                    "limit_type": rate_limit.limit_type,
+                    "retry_after": math.ceil(rate_limit.retry_after)
                 }
             )
         
@@ -86,31 +126,24 @@ class APIKeyAuth:
         
         return "unknown"
     
-    def _check_rate_limit(self, key_id: str, rate_limit: int) -> bool:
-        """
-        Simple rate limiting (in-memory)
-        For production, use Redis or similar
-        """
-        current_usage = self._get_current_usage(key_id)
-        return current_usage < rate_limit
+    @staticmethod
+    def rate_limit_tiers(key_info: dict) -> List[Tuple[int, int]]:
+        """(limit, window_seconds) tiers for an API key"""
+        per_minute = key_info["rate_limit"]
+        tiers = [(per_minute, 60)]
+        per_hour = int(per_minute * settings.API_KEY_HOURLY_LIMIT_FACTOR)
+        if per_hour > 0:
+            tiers.append((per_hour, 3600))
+        return tiers
     
-    def _get_current_usage(self, key_id: str) -> int:
-        """Get current usage count for this minute"""
-        now = time.time()
-        minute = int(now // 60)
-        cache_key = f"{key_id}:{minute}"
-        
-        if cache_key not in self.rate_limit_cache:
-            self.rate_limit_cache[cache_key] = 0
-        
-        self.rate_limit_cache[cache_key] += 1
-        
-        # Clean old entries (keep only last 2 minutes)
-        for k in list(self.rate_limit_cache.keys()):
-            if int(k.split(":")[1]) < minute - 2:
-                del self.rate_limit_cache[k]
-        
-        return self.rate_limit_cache[cache_key]
+    def check_rate_limit(self, key_info: dict) -> RateLimitResult:
+        """Count this request against the key's tiers (O(1), see RateLimiter)
+
+        Called from the sync verify_api_key dependency, which FastAPI runs in
+        its threadpool, so a shared backend's I/O stays off the event loop.
+        Async code uses rate_limiter.hit_async instead.
+        """
+        return rate_limiter.hit(f"api_key_{key_info['id']}", self.rate_limit_tiers(key_info))
     
     def record_usage(
         self,
@@ -2,27 +2,108 @@
 API Key Management System
 Manages API keys for external API access
 """
+import copy
 import sqlite3
 import secrets
 import hashlib
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import logging
 import json
 
+from app.core.config import settings
+from app.core.executors import AsyncStorageFacade
+
 logger = logging.getLogger(__name__)
 
 # Database file path
 API_KEYS_DB_PATH = Path(__file__).parent.parent.parent / "api_keys.db"
 
 
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+class VerifiedKeyCache:
+    """Active-key lookups by key hash, including misses (unknown keys)
+
+    Saves a SQLite round trip and JSON parsing per API-key request. Entries
+    expire after ``ttl`` seconds (``negative_ttl`` for unknown keys) and are
+    dropped immediately when this process updates, deletes or regenerates a
+    key; the TTL bounds how long other worker processes may lag behind.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 30.0, negative_ttl: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, Tuple[Optional[Dict[str, Any]], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def get(self, key_hash: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(True, key row or None for an unknown key) on a hit, (False, None) on a miss"""
+        with self._lock:
+            cached = self._entries.get(key_hash)
+            if cached is None or time.monotonic() >= cached[1]:
+                if cached is not None:
+                    del self._entries[key_hash]
+                self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key_hash)
+            self._stats["hits" if cached[0] is not None else "negative_hits"] += 1
+            return True, cached[0]
+
+    def put(self, key_hash: str, key_row: Optional[Dict[str, Any]]):
+        ttl = self.ttl if key_row is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key_hash] = (key_row, time.monotonic() + ttl)
+            self._entries.move_to_end(key_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, key_id: Optional[str] = None, key_hash: Optional[str] = None):
+        """Drop the entries of one key (by id and/or hash)"""
+        with self._lock:
+            stale = [cached_hash for cached_hash, (row, _) in self._entries.items()
+                     if cached_hash == key_hash or (key_id is not None and row is not None and row["id"] == key_id)]
+            for cached_hash in stale:
+                del self._entries[cached_hash]
+            self._stats["invalidations"] += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["negative_hits"] + self._stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "negative_ttl_seconds": self.negative_ttl,
+                **self._stats,
+                "hit_rate": round((lookups - self._stats["misses"]) / lookups, 3) if lookups else 0.0,
+            }
+
+
 class APIKeyManager:
     """Manage API keys for external API access"""
     
     def __init__(self):
         self.db_path = API_KEYS_DB_PATH
+        self.verified_keys = VerifiedKeyCache(
+            settings.API_KEY_CACHE_SIZE, settings.API_KEY_CACHE_TTL, settings.API_KEY_NEGATIVE_CACHE_TTL
+        )
         self._init_database()
     
     def _init_database(self):
@@ -138,7 +219,7 @@ class APIKeyManager:
         api_key = f"tbkk_{random_part}"
         
         # Hash the key for storage
-        key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        key_hash = hash_api_key(api_key)
         
         return api_key, key_hash
     
@@ -188,6 +269,8 @@ class APIKeyManager:
             
             conn.commit()
             conn.close()
+            # In case the new key was looked up (and cached as unknown) before it existed
+            self.verified_keys.invalidate(key_hash=key_hash)
             
             logger.info(f"✅ API Key created: {name} by {created_by}")
             
@@ -208,54 +291,74 @@ class APIKeyManager:
             logger.error(f"❌ Error creating API key: {e}")
             raise
     
-    def verify_api_key(self, api_key: str) -> Optional[Dict[str, Any]]:
-        """
-        Verify API key and return key info
-        Returns dict with key info if valid, None if invalid, or raises exception if expired
-        """
+    def _load_active_key(self, key_hash: str) -> Optional[Dict[str, Any]]:
+        """Active key row for key_hash (None if unknown or inactive); raises on database errors"""
+        conn = sqlite3.connect(str(self.db_path))
         try:
-            key_hash = hashlib.sha256(api_key.encode()).hexdigest()
-            
-            conn = sqlite3.connect(str(self.db_path))
             cursor = conn.cursor()
-            
             cursor.execute("""
                 SELECT id, name, key_prefix, created_by, created_at, expires_at,
                        permissions, rate_limit, is_active, ip_whitelist
                 FROM api_keys
                 WHERE key_hash = ? AND is_active = 1
             """, (key_hash,))
-            
             row = cursor.fetchone()
+        finally:
             conn.close()
-            
-            if not row:
-                return None
-            
-            # Check expiration
-            if row[5]:  # expires_at
-                expires_at = datetime.fromisoformat(row[5].replace('Z', '+00:00'))
-                if datetime.now(timezone.utc) > expires_at:
-                    logger.warning(f"API key expired: {row[1]} (expired at {expires_at})")
-                    # Return special dict to indicate expiration
-                    return {
-                        "expired": True,
-                        "name": row[1],
-                        "expires_at": row[5]
-                    }
-            
-            return {
-                "id": row[0],
-                "name": row[1],
-                "key_prefix": row[2],
-                "created_by": row[3],
-                "created_at": row[4],
-                "expires_at": row[5],
-                "permissions": json.loads(row[6] or "[]"),
-                "rate_limit": row[7],
-                "is_active": bool(row[8]),
-                "ip_whitelist": json.loads(row[9] or "[]")
-            }
+        
+        if not row:
+            return None
+        
+        return {
+            "id": row[0],
+            "name": row[1],
+            "key_prefix": row[2],
+            "created_by": row[3],
+            "created_at": row[4],
+            "expires_at": row[5],
+            "permissions": json.loads(row[6] or "[]"),
+            "rate_limit": row[7],
+            "is_active": bool(row[8]),
+            "ip_whitelist": json.loads(row[9] or "[]")
+        }
+    
+    @staticmethod
+    def _check_expiry(key_row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """verify_api_key result for a key row (expiry is checked on every call, cached or not)"""
+        if key_row is None:
+            return None
+        
+        if key_row["expires_at"]:
+            expires_at = datetime.fromisoformat(key_row["expires_at"].replace('Z', '+00:00'))
+            if datetime.now(timezone.utc) > expires_at:
+                logger.warning(f"API key expired: {key_row['name']} (expired at {expires_at})")
+                # Return special dict to indicate expiration
+                return {
+                    "expired": True,
+                    "name": key_row["name"],
+                    "expires_at": key_row["expires_at"]
+                }
+        
+        # Deep copy: permissions and ip_whitelist are lists that callers must not share with the cache
+        return copy.deepcopy(key_row)
+    
+    def cached_verification(self, api_key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(True, verify_api_key result) if it can be answered from memory, else (False, None)"""
+        hit, key_row = self.verified_keys.get(hash_api_key(api_key))
+        return (True, self._check_expiry(key_row)) if hit else (False, None)
+    
+    def verify_api_key(self, api_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Verify API key and return key info
+        Returns dict with key info if valid, None if invalid, or raises exception if expired
+        """
+        try:
+            key_hash = hash_api_key(api_key)
+            hit, key_row = self.verified_keys.get(key_hash)
+            if not hit:
+                key_row = self._load_active_key(key_hash)
+                self.verified_keys.put(key_hash, key_row)
+            return self._check_expiry(key_row)
         except Exception as e:
             logger.error(f"❌ Error verifying API key: {e}")
             return None
@@ -411,6 +514,7 @@ class APIKeyManager:
             
             conn.commit()
             conn.close()
+            self.verified_keys.invalidate(key_id=key_id, key_hash=key_hash)
             
             logger.info(f"✅ API Key regenerated: {key_id}")
             return api_key, key_hash
@@ -469,9 +573,13 @@ class APIKeyManager:
                 SET {', '.join(updates)}
                 WHERE id = ?
             """, params)
+            # A re-activated key may be cached as unknown under its hash
+            cursor.execute("SELECT key_hash FROM api_keys WHERE id = ?", (key_id,))
+            row = cursor.fetchone()
             
             conn.commit()
             conn.close()
+            self.verified_keys.invalidate(key_id=key_id, key_hash=row[0] if row else None)
             
             logger.info(f"✅ API Key updated: {key_id}")
             return True
@@ -493,6 +601,7 @@ class APIKeyManager:
             
             conn.commit()
             conn.close()
+            self.verified_keys.invalidate(key_id=key_id)
             
             logger.info(f"✅ API Key deleted: {key_id}")
             return True
@@ -770,3 +879,6 @@ class APIKeyManager:
 # Global instance
 api_key_manager = APIKeyManager()
 
+# Awaitable facade for async code (runs calls on the storage executor)
+async_api_key_manager = AsyncStorageFacade(api_key_manager)
+
@@ -10,8 +10,8 @@ import json
 import logging
 from typing import Callable
 
-from app.core.api_keys import api_key_manager
-from app.core.api_key_auth import api_key_auth
+from app.core.api_keys import async_api_key_manager
+from app.core.api_key_auth import api_key_auth, lookup_api_key_async
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +43,7 @@ class APILoggingMiddleware(BaseHTTPMiddleware):
                 token = auth_header.replace("Bearer ", "")
                 # Check if it's an API key (starts with tbkk_)
                 if token.startswith("tbkk_"):
-                    key_info = api_key_manager.verify_api_key(token)
+                    key_info = await lookup_api_key_async(token, request)
                     if key_info and not key_info.get("expired"):
                         api_key_id = key_info["id"]
         except Exception:
@@ -106,7 +106,7 @@ class APILoggingMiddleware(BaseHTTPMiddleware):
                     )
                     
                     if should_log_detail:
-                        api_key_manager.log_request_response(
+                        await async_api_key_manager.log_request_response(
                             api_key_id=api_key_id,
                             endpoint=request.url.path,
                             method=request.method,
@@ -142,7 +142,7 @@ class APILoggingMiddleware(BaseHTTPMiddleware):
                         for k, v in request_headers_dict.items()
                     }
                     
-                    api_key_manager.log_request_response(
+                    await async_api_key_manager.log_request_response(
                         api_key_id=api_key_id,
                         endpoint=request.url.path,
                         method=request.method,
@@ -4,6 +4,8 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 import logging
 
+from app.core.executors import AsyncStorageFacade
+
 logger = logging.getLogger(__name__)
 
 # Thailand timezone (UTC+7)
@@ -271,3 +273,6 @@ class APIUsageLogger:
 # Global instance
 api_usage_logger = APIUsageLogger()
 
+# Awaitable facade for async code (runs calls on the storage executor)
+async_api_usage_logger = AsyncStorageFacade(api_usage_logger)
+
@@ -0,0 +1,241 @@
+"""
+Authentication Binds
+Verifies user credentials for /api/auth/login over a small pool of open LDAP
+connections that are rebound per credential, on a dedicated executor so a
+login storm neither blocks the event loop nor queues behind directory searches
+"""
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from ldap3 import Connection
+
+from app.core.config import settings
+from app.core.database import make_server
+from app.core.executors import auth_executor, run_blocking
+from app.core.ldap_metrics import OperationTimer, ldap_request_source
+
+logger = logging.getLogger(__name__)
+
+UPN_FORMAT = "upn"
+CN_FORMAT = "cn"
+
+# AD invalidCredentials sub-codes ("data 530" in the diagnostic message) that prove the
+# account exists; trying another DN format would only add a bad-password count
+ACCOUNT_FOUND_CODES = ("530", "531", "532", "533", "701", "773", "775")
+# Wrong password, but AD also answers it for a bind name that does not exist
+INVALID_CREDENTIALS_CODE = "52e"
+
+
+class BindTimeout(Exception):
+    """The directory did not answer a login bind within AUTH_BIND_TIMEOUT"""
+
+
+def dn_candidates(username: str) -> List[Tuple[str, str]]:
+    """(format, bind name) pairs a username may authenticate as, in default order"""
+    domain = settings.LDAP_BASE_DN.replace('DC=', '').replace(',DC=', '.')
+    return [
+        (UPN_FORMAT, f"{username}@{domain}"),
+        (CN_FORMAT, f"CN={username},CN=Users,{settings.LDAP_BASE_DN}"),
+    ]
+
+
+class AuthBindPool:
+    """Pool of connections used only to test user credentials.
+
+    Each check rebinds a pooled connection as the user; the connection is
+    never used for anything else, so it does not matter whom it was left
+    bound as. The DN format that worked for a user is remembered, so the
+    next login tries it first. New connections go to the domain controllers
+    in ``urls`` in turn, skipping any that cannot be reached.
+    """
+
+    def __init__(self, urls: List[str], size: int = 10, timeout: float = 10.0, remember_size: int = 10000):
+        if not urls:
+            raise ValueError("At least one LDAP server is required")
+        self.urls = list(urls)
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.remember_size = remember_size
+        self._servers: Optional[list] = None
+        self._next_server = 0
+        self._idle: deque = deque()
+        self._lock = threading.Lock()
+        self._preferred: "OrderedDict[str, str]" = OrderedDict()  # username (lowercase) -> DN format
+        self._stats = {
+            "logins": 0,
+            "succeeded": 0,
+            "rejected": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "binds": 0,
+            "fallback_binds": 0,
+            "remembered_first": 0,
+            "connections_opened": 0,
+            "connect_errors": 0,
+            "connections_discarded": 0,
+        }
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _acquire(self) -> Tuple[Connection, bool]:
+        """Idle connection (reused=True) or a newly opened, still unbound one.
+
+        Raises the last connection error if no domain controller can be reached.
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            if self._servers is None:
+                self._servers = [make_server(url)[0] for url in self.urls]
+                for server in self._servers:
+                    server.connect_timeout = self.timeout
+            servers = self._servers
+            start = self._next_server
+            self._next_server = (start + 1) % len(servers)
+        last_error: Optional[Exception] = None
+        for offset in range(len(servers)):
+            server = servers[(start + offset) % len(servers)]
+            connection = Connection(server, receive_timeout=self.timeout, raise_exceptions=False)
+            try:
+                connection.open(read_server_info=False)
+            except Exception as e:
+                self._count("connect_errors")
+                logger.warning(f"⚠️ Login bind connection to {server.name} failed: {e}")
+                last_error = e
+                continue
+            self._count("connections_opened")
+            return connection, False
+        raise last_error
+
+    def _release(self, connection: Connection, discard: bool = False):
+        with self._lock:
+            if not discard and len(self._idle) < self.size:
+                self._idle.append(connection)
+                return
+            if discard:
+                self._stats["connections_discarded"] += 1
+        try:
+            connection.unbind()
+        except Exception:
+            pass
+
+    def _bind(self, bind_name: str, password: str, dn_format: str) -> Tuple[bool, Optional[str]]:
+        """Bind once as bind_name: (success, AD diagnostic message)"""
+        timer = OperationTimer("bind", "user", dn_format, ldap_request_source.get())
+        self._count("binds")
+        for attempt in range(2):
+            connection, reused = None, False
+            try:
+                connection, reused = self._acquire()
+                timer.server = connection.server.name
+                bound = connection.rebind(user=bind_name, password=password, read_server_info=False)
+            except Exception:
+                # Idle connections may have been dropped by the DC; retry once on a fresh one
+                if connection is not None:
+                    self._release(connection, discard=True)
+                if reused and attempt == 0:
+                    timer.retries += 1
+                    continue
+                timer.finish(False)
+                raise
+            result = connection.result or {}
+            if not bound and result.get("description") != "invalidCredentials":
+                self._release(connection, discard=True)
+                if reused and attempt == 0:
+                    timer.retries += 1
+                    continue
+                timer.finish(False)
+                raise Exception(f"Bind failed: {result.get('description')} {result.get('message', '')}".strip())
+            self._release(connection)
+            # A rejected password is the expected outcome, not an operation error
+            timer.finish(True)
+            return bound, result.get("message")
+        timer.finish(False)
+        raise Exception("Bind failed")
+
+    def check(self, username: str, password: str) -> Optional[str]:
+        """Bind name the credentials are valid for, None if they are not (runs on a worker thread)"""
+        if not username or not password:
+            # A simple bind with an empty password is an unauthenticated bind and always "succeeds"
+            return None
+
+        key = username.lower()
+        candidates = dn_candidates(username)
+        with self._lock:
+            preferred = self._preferred.get(key)
+            if preferred is not None:
+                self._preferred.move_to_end(key)
+                self._stats["remembered_first"] += 1
+        if preferred is not None:
+            candidates.sort(key=lambda candidate: candidate[0] != preferred)
+
+        for index, (dn_format, bind_name) in enumerate(candidates):
+            if index:
+                self._count("fallback_binds")
+            bound, message = self._bind(bind_name, password, dn_format)
+            if bound:
+                with self._lock:
+                    self._preferred[key] = dn_format
+                    self._preferred.move_to_end(key)
+                    while len(self._preferred) > self.remember_size:
+                        self._preferred.popitem(last=False)
+                return bind_name
+            message = (message or "").lower()
+            if any(f"data {code}" in message for code in ACCOUNT_FOUND_CODES):
+                break
+            # 52e after the remembered format is a wrong password; otherwise this bind name may not exist
+            if preferred is not None and f"data {INVALID_CREDENTIALS_CODE}" in message:
+                break
+        return None
+
+    async def authenticate(self, username: str, password: str) -> Optional[str]:
+        """Verify credentials without blocking the event loop; None if they are invalid.
+
+        Raises BindTimeout if the directory does not answer within ``timeout``
+        and the underlying error if it cannot be reached.
+        """
+        self._count("logins")
+        try:
+            bind_name = await run_blocking(auth_executor, self.check, username, password, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._count("timeouts")
+            raise BindTimeout(f"No bind response within {self.timeout}s")
+        except Exception:
+            self._count("errors")
+            raise
+        self._count("succeeded" if bind_name else "rejected")
+        return bind_name
+
+    def close(self):
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for connection in idle:
+            try:
+                connection.unbind()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "servers": self.urls,
+                "size": self.size,
+                "idle": len(self._idle),
+                "remembered_users": len(self._preferred),
+                **self._stats,
+            }
+
+
+# Global pool
+auth_bind_pool = AuthBindPool(
+    settings.ldap_urls,
+    size=settings.AUTH_BIND_POOL_SIZE,
+    timeout=settings.AUTH_BIND_TIMEOUT,
+    remember_size=settings.AUTH_DN_FORMAT_CACHE_SIZE,
+)
@@ -1,69 +1,168 @@
 """
-Simple in-memory cache for FastAPI endpoints
+Simple cache for FastAPI endpoints
 """
 from functools import wraps
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Awaitable, Callable, List, NamedTuple, Set
+import asyncio
 import hashlib
+import inspect
 import json
 import logging
+import time
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+from app.core.etags import check_not_modified, content_etag
+from app.core.exceptions import ServiceUnavailableError
+from app.core.executors import ldap_executor, run_blocking, storage_executor
+from app.core.shared_state import MemoryBackend, SharedStateBackend, shared_state
 
 logger = logging.getLogger(__name__)
 
+class SingleFlight:
+    """Coalesce concurrent computations of the same key (per worker process)
+
+    The first caller for a key runs the computation; callers that arrive
+    while it is running await its outcome instead of starting their own,
+    and get the same result or exception. Waiters give up after
+    ``timeout`` seconds; if the running computation is cancelled (its
+    client disconnected), one waiter takes over.
+    """
+    
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats = {"leaders": 0, "coalesced": 0, "failures": 0, "timeouts": 0, "takeovers": 0}
+    
+    async def do(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of compute(), shared with concurrent callers for the same key"""
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            self._stats["coalesced"] += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except asyncio.TimeoutError:
+                self._stats["timeouts"] += 1
+                logger.warning(f"⏱️ Gave up waiting {self.timeout}s for in-flight {key[:50]}...")
+                raise ServiceUnavailableError("Timed out waiting for the same request already in progress")
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The computation was cancelled, not this request: take over
+                self._stats["takeovers"] += 1
+        
+        future = asyncio.get_running_loop().create_future()
+        # Mark the exception as retrieved even when nobody was waiting
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._inflight[key] = future
+        self._stats["leaders"] += 1
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            self._stats["failures"] += 1
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+    
+    def running(self, key: str) -> bool:
+        return key in self._inflight
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._inflight), "timeout_seconds": self.timeout, **self._stats}
+
+
 class SimpleCache:
-    """Thread-safe in-memory cache with TTL"""
+    """Thread-safe cache with TTL, stored in a SharedStateBackend
+
+    With the default memory backend entries are per process and bounded
+    (LRU by count and approximate bytes); with the sqlite or redis backend
+    all workers share entries and invalidations.
+    """
     
-    def __init__(self):
-        self._cache: Dict[str, Dict[str, Any]] = {}
+    KEY_PREFIX = "cache:"
+    
+    def __init__(self, backend: Optional[SharedStateBackend] = None, coalesce_timeout: float = 30.0):
+        self.backend = backend or MemoryBackend()
+        self.flights = SingleFlight(coalesce_timeout)
+        self._background: Set[asyncio.Task] = set()
     
     def get(self, key: str) -> Optional[Any]:
         """Get cached value if not expired"""
-        if key in self._cache:
-            entry = self._cache[key]
-            if datetime.now() < entry['expires_at']:
-                logger.debug(f"✅ Cache HIT: {key[:50]}...")
-                return entry['value']
-            else:
-                # Expired, remove it
-                logger.debug(f"⏰ Cache EXPIRED: {key[:50]}...")
-                del self._cache[key]
+        value = self.backend.get(self.KEY_PREFIX + key)
+        if value is not None:
+            logger.debug(f"✅ Cache HIT: {key[:50]}...")
+            return value
         
         logger.debug(f"❌ Cache MISS: {key[:50]}...")
         return None
     
     def set(self, key: str, value: Any, ttl_seconds: int = 300):
         """Set cache value with TTL (default 5 minutes)"""
-        self._cache[key] = {
-            'value': value,
-            'expires_at': datetime.now() + timedelta(seconds=ttl_seconds),
-            'created_at': datetime.now()
-        }
+        self.backend.set(self.KEY_PREFIX + key, value, ttl_seconds)
         logger.debug(f"💾 Cache SET: {key[:50]}... (TTL: {ttl_seconds}s)")
     
+    async def get_async(self, key: str) -> Optional[Any]:
+        """get() for async code: a shared backend's I/O runs on the storage executor (a timeout is a miss)"""
+        if not self.backend.blocking:
+            return self.get(key)
+        try:
+            return await run_blocking(storage_executor, self.get, key, timeout=settings.STORAGE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ Cache GET timed out after {settings.STORAGE_TIMEOUT}s: {key[:50]}...")
+            return None
+    
+    async def set_async(self, key: str, value: Any, ttl_seconds: int = 300):
+        """set() for async code: a shared backend's I/O runs on the storage executor (a timeout drops the value)"""
+        if not self.backend.blocking:
+            self.set(key, value, ttl_seconds)
+            return
+        try:
+            await run_blocking(storage_executor, self.set, key, value, ttl_seconds, timeout=settings.STORAGE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ Cache SET timed out after {settings.STORAGE_TIMEOUT}s: {key[:50]}...")
+    
+    def run_in_background(self, coroutine: Awaitable[Any]):
+        """Run a refresh without awaiting it (a reference is kept until it finishes)"""
+        task = asyncio.ensure_future(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
     def invalidate(self, pattern: Optional[str] = None):
         """Invalidate cache entries matching pattern, or all if pattern is None"""
+        count = self.backend.delete_matching(self.KEY_PREFIX, pattern)
         if pattern is None:
-            count = len(self._cache)
-            self._cache.clear()
             logger.info(f"🗑️ Cache CLEARED: {count} entries")
         else:
-            keys_to_delete = [k for k in self._cache.keys() if pattern in k]
-            for key in keys_to_delete:
-                del self._cache[key]
-            logger.info(f"🗑️ Cache INVALIDATED: {len(keys_to_delete)} entries matching '{pattern}'")
+            logger.info(f"🗑️ Cache INVALIDATED: {count} entries matching '{pattern}'")
     
-    def stats(self) -> Dict[str, Any]:
-        """Get cache statistics"""
-        now = datetime.now()
-        active_entries = sum(1 for entry in self._cache.values() if now < entry['expires_at'])
-        return {
-            'total_entries': len(self._cache),
-            'active_entries': active_entries,
-            'expired_entries': len(self._cache) - active_entries
-        }
+    def stats(self, namespace: Optional[str] = None) -> Dict[str, Any]:
+        """Get cache statistics (per endpoint namespace with the memory backend)
+
+        namespace filters the per-namespace counters to names containing it.
+        """
+        stats = self.backend.stats()
+        if "namespaces" in stats:
+            stats["namespaces"] = {
+                name[len(self.KEY_PREFIX):]: counts for name, counts in stats["namespaces"].items()
+                if name.startswith(self.KEY_PREFIX) and (namespace is None or namespace in name[len(self.KEY_PREFIX):])
+            }
+        stats["coalescing"] = self.flights.stats()
+        stats["background_refreshes"] = len(self._background)
+        return stats
 
 # Global cache instance
-cache = SimpleCache()
+cache = SimpleCache(shared_state, coalesce_timeout=settings.CACHE_COALESCE_TIMEOUT)
 
 def make_cache_key(endpoint: str, **kwargs) -> str:
     """Create a cache key from endpoint and parameters.
@@ -77,18 +176,77 @@ def make_cache_key(endpoint: str, **kwargs) -> str:
     params_hash = hashlib.md5(params_str.encode()).hexdigest()
     return f"{endpoint}:{params_hash}"
 
-def cached_response(ttl_seconds: int = 300):
+class CachedValue(NamedTuple):
+    """Cached endpoint result; kept until the hard TTL, fresh until fresh_until"""
+    value: Any
+    stored_at: float  # Unix time (compared across workers with a shared backend)
+    fresh_until: float
+    retry_at: float = 0.0  # After a failed refresh: no new attempt before this time
+    etag: str = ""  # Content hash of value, computed once when stored
+
+def _record_cache_status(request: Optional[Request], status: str, entry: Optional[CachedValue] = None):
+    """Expose X-Cache / Age to ResponseHeadersMiddleware through request.state"""
+    if request is not None:
+        age = int(max(0.0, time.time() - entry.stored_at)) if entry is not None else 0
+        request.state.cache_status = (status, age)
+
+def cached_response(ttl_seconds: int = 300, stale_ttl_seconds: Optional[int] = None):
     """
     Decorator to cache endpoint responses
     
+    A result is fresh for ttl_seconds. For stale_ttl_seconds after that
+    (default CACHE_STALE_TTL) it is still returned immediately while a
+    background task refreshes it; if the refresh fails, the last good value
+    keeps being served until the stale period ends. Responses carry
+    X-Cache (HIT, STALE or MISS) and Age headers.
+    
+    Concurrent misses for the same key are coalesced: only one of them
+    calls the endpoint (see SingleFlight).
+    
+    Each stored result gets a content-hash ETag; a request whose
+    If-None-Match matches it gets 304 Not Modified without the body being
+    serialized again. A refresh that returns the same content keeps the ETag.
+    
     Usage:
         @cached_response(ttl_seconds=300)
         async def get_users(...):
             ...
     """
+    stale_ttl = settings.CACHE_STALE_TTL if stale_ttl_seconds is None else stale_ttl_seconds
+    
     def decorator(func):
+        signature = inspect.signature(func)
+        # The request is needed for the cache headers; add it to the endpoint signature if missing
+        inject_request = "request" not in signature.parameters
+        
+        async def compute(cache_key: str, args, kwargs) -> CachedValue:
+            result = await func(*args, **kwargs)
+            etag = ""
+            if settings.ETAGS_ENABLED and not isinstance(result, Response):
+                # Hashing serializes the whole result once; keep it off the event loop
+                etag = await run_blocking(ldap_executor, content_etag, result)
+            now = time.time()
+            entry = CachedValue(result, now, now + ttl_seconds, etag=etag)
+            # Stored before waiters resume, so later requests hit the cache
+            await cache.set_async(cache_key, entry, ttl_seconds + stale_ttl)
+            return entry
+        
+        async def refresh(cache_key: str, entry: CachedValue, args, kwargs):
+            try:
+                await cache.flights.do(cache_key, lambda: compute(cache_key, args, kwargs))
+            except Exception as e:
+                now = time.time()
+                hard_expiry = entry.fresh_until + stale_ttl
+                if hard_expiry > now:
+                    retry_at = now + min(ttl_seconds, settings.CACHE_REFRESH_RETRY_INTERVAL)
+                    await cache.set_async(cache_key, entry._replace(retry_at=retry_at), hard_expiry - now)
+                logger.warning(f"⚠️ Refresh of {cache_key[:50]}... failed, serving stale value "
+                               f"({int(now - entry.stored_at)}s old): {e}")
+        
         @wraps(func)
         async def wrapper(*args, **kwargs):
+            request = kwargs.pop("request", None) if inject_request else kwargs.get("request")
+            
             # Extract only serializable params for cache key
             cache_params = {
                 k: v for k, v in kwargs.items() 
@@ -98,23 +256,55 @@ def cached_response(ttl_seconds: int = 300):
             cache_key = make_cache_key(func.__name__, **cache_params)
             
             # Try to get from cache
-            cached_value = cache.get(cache_key)
-            if cached_value is not None:
-                return cached_value
-            
-            # Cache miss, call function
-            result = await func(*args, **kwargs)
+            entry = await cache.get_async(cache_key)
+            if isinstance(entry, CachedValue):
+                now = time.time()
+                if now < entry.fresh_until:
+                    _record_cache_status(request, "HIT", entry)
+                else:
+                    # Stale: answer now, refresh in the background (once per key)
+                    if now >= entry.retry_at and not cache.flights.running(cache_key):
+                        cache.run_in_background(refresh(cache_key, entry, args, kwargs))
+                    _record_cache_status(request, "STALE", entry)
+                return check_not_modified(request, entry.etag) or entry.value
             
-            # Store in cache
-            cache.set(cache_key, result, ttl_seconds)
-            
-            return result
+            # Cache miss: one concurrent caller per key runs the function, the rest await its result
+            _record_cache_status(request, "MISS")
+            entry = await cache.flights.do(cache_key, lambda: compute(cache_key, args, kwargs))
+            return check_not_modified(request, entry.etag) or entry.value
         
+        if inject_request:
+            wrapper.__signature__ = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            ])
         return wrapper
     return decorator
 
+_invalidation_listeners: List[Callable[[Optional[str]], None]] = []
+
+def add_invalidation_listener(callback: Callable[[Optional[str]], None]):
+    """Call callback(pattern) after every invalidate_cache(), for data cached outside SimpleCache"""
+    _invalidation_listeners.append(callback)
+
 def invalidate_cache(pattern: Optional[str] = None):
     """Helper to invalidate cache entries"""
     cache.invalidate(pattern)
+    for callback in _invalidation_listeners:
+        try:
+            callback(pattern)
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener failed for '{pattern}': {e}")
+
+async def invalidate_cache_async(pattern: Optional[str] = None):
+    """invalidate_cache() for async code: a shared backend's deletes and generation bumps run on the storage executor"""
+    if not cache.backend.blocking:
+        invalidate_cache(pattern)
+        return
+    try:
+        await run_blocking(storage_executor, invalidate_cache, pattern, timeout=settings.STORAGE_TIMEOUT)
+    except asyncio.TimeoutError:
+        # The job is not interrupted: the invalidation still completes, just after this response
+        logger.warning(f"⏱️ Cache invalidation of '{pattern}' still running after {settings.STORAGE_TIMEOUT}s")
 
 
@@ -0,0 +1,314 @@
+"""
+AD Change Notifications
+Listens for directory changes with the LDAP_SERVER_NOTIFICATION control and
+invalidates cached data as soon as an object changes
+
+Covers changes made outside this app (ADUC, PowerShell, HR sync) that the
+write-path invalidate_cache() calls never see.
+"""
+import logging
+import random
+import threading
+import time
+from queue import Empty
+from typing import Any, Dict, Optional, Set
+
+from ldap3 import ASYNC_STREAM, DEREF_NEVER, DSA, SUBTREE, Connection
+from ldap3.extend.standard.PersistentSearch import PersistentSearch
+
+from app.core.cache import invalidate_cache
+from app.core.config import settings
+from app.core.database import LDAPSearchError, decode_search_response, ldap_conn, make_server
+from app.core.directory_replica import SHOW_DELETED_OID, directory_replica
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_OID = "1.2.840.113556.1.4.528"
+NOTIFICATION_ATTRIBUTES = ["objectClass", "objectGUID", "isDeleted"]
+
+# objectClass -> cache_response keys (function names) whose results include that kind of object
+CACHE_PATTERNS_BY_CLASS = {
+    "user": ("get_users",),
+    "group": ("get_groups", "get_users"),  # membership shows up in users' memberOf
+    "organizationalunit": ("get_ous",),
+}
+
+
+class ChangeNotificationListener:
+    """Background subscriber to AD change notifications.
+
+    One long-lived asynchronous search on the domain naming context
+    (AD allows subtree notifications only on an NC head) streams every
+    changed object. Events are coalesced until the directory has been quiet
+    for ``debounce`` seconds, or for at most ``max_delay`` seconds during a
+    sustained burst (bulk import, replication catch-up), so a burst costs
+    one reload of the cached lists per ``max_delay`` rather than one per
+    event. Then:
+
+    - cached single-object reads of the changed DNs are dropped
+    - cached list responses for the affected object kinds are invalidated
+    - the directory replica (if running) is asked to poll right away
+
+    A dropped connection or ended search is retried with exponential
+    backoff; after reconnecting everything is invalidated once, since
+    changes made while disconnected were not seen.
+    """
+
+    def __init__(self, debounce: float = 1.0, max_backoff: float = 300.0, max_delay: float = 10.0):
+        self.debounce = debounce
+        self.max_delay = max(max_delay, debounce)
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._connection: Optional[Connection] = None
+        self._url_index = 0
+
+        # Pending batch
+        self._pending_dns: Set[str] = set()
+        self._pending_classes: Set[str] = set()
+        self._pending_deletes = 0
+        self._batch_started: Optional[float] = None
+        self._batch_last_event: Optional[float] = None
+
+        self.state = "stopped"
+        self.server: Optional[str] = None
+        self.base_dn: Optional[str] = None
+        self.connected_since: Optional[float] = None
+        self.last_event_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.next_retry_at: Optional[float] = None
+        self.consecutive_failures = 0
+        self._stats = {
+            "events": 0,
+            "deletes": 0,
+            "batches": 0,
+            "reconnects": 0,
+            "full_invalidations": 0,
+        }
+
+    # Lifecycle
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.state = "connecting"
+        self._thread = threading.Thread(target=self._run, name="ldap-change-notify", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        connection = self._connection
+        if connection is not None:
+            # Unbinding closes the socket, which also ends the receiver thread
+            try:
+                connection.unbind()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.state = "stopped"
+
+    def _run(self):
+        backoff = 1.0
+        listened_before = False
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self._listen(resync=listened_before)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"⚠️ AD change notifications interrupted ({self.server}): {e}")
+            finally:
+                listened_before = listened_before or self.connected_since is not None
+                self.connected_since = None
+                self._connection = None
+            if self._stop.is_set():
+                break
+
+            # A connection that stayed up for a while resets the backoff
+            if time.monotonic() - started > self.max_backoff:
+                backoff = 1.0
+                self.consecutive_failures = 0
+            self.consecutive_failures += 1
+            self._stats["reconnects"] += 1
+            delay = min(backoff, self.max_backoff) * random.uniform(0.8, 1.2)
+            backoff = min(backoff * 2, self.max_backoff)
+            # Rotate to the next DC in case this one is the problem
+            self._url_index += 1
+            self.state = "backoff"
+            self.next_retry_at = time.time() + delay
+            self._stop.wait(delay)
+            self.next_retry_at = None
+            self.state = "connecting"
+
+    def _choose_url(self) -> str:
+        urls = settings.ldap_urls
+        # Prefer the DC the replica polls so notifications and USNs come from the same place
+        replica_server = directory_replica.stats()["server"]
+        if replica_server in urls and self.consecutive_failures == 0:
+            return replica_server
+        return urls[self._url_index % len(urls)]
+
+    def _listen(self, resync: bool = False):
+        """Open the notification search and process events until it fails or stop() is called"""
+        url = self._choose_url()
+        self.server = url
+        server, _ = make_server(url, get_info=DSA)
+        connection = Connection(
+            server,
+            user=settings.LDAP_BIND_DN,
+            password=settings.LDAP_BIND_PASSWORD,
+            client_strategy=ASYNC_STREAM,
+            auto_bind=True
+        )
+        self._connection = connection
+        naming_context = None
+        if server.info is not None:
+            naming_context = (server.info.other.get("defaultNamingContext") or [None])[0]
+        self.base_dn = naming_context or settings.LDAP_BASE_DN
+
+        search = PersistentSearch(
+            connection, self.base_dn, "(objectClass=*)", SUBTREE, DEREF_NEVER,
+            NOTIFICATION_ATTRIBUTES, 0, 0,
+            [(NOTIFICATION_OID, True, None), (SHOW_DELETED_OID, True, None)],
+            True, None, False, False, None
+        )
+        try:
+            self.state = "listening"
+            self.connected_since = time.time()
+            self.last_error = None
+            self.consecutive_failures = 0
+            logger.info(f"👂 Listening for AD change notifications on {url} ({self.base_dn})")
+            if resync:
+                # Changes made while disconnected were missed
+                self._invalidate_all()
+
+            while not self._stop.is_set():
+                try:
+                    change = connection.strategy.events.get(timeout=0.5)
+                except Empty:
+                    change = None
+
+                if change is None:
+                    if connection.closed:
+                        raise ConnectionError("connection closed by server")
+                elif change.get("type") == "searchResEntry":
+                    self._record(change)
+                else:
+                    raise LDAPSearchError(
+                        f"notification search ended: {change.get('description')} {change.get('message', '')}".strip()
+                    )
+
+                if self._batch_due():
+                    self.flush()
+        finally:
+            self.flush()
+            try:
+                search.stop()
+            except Exception:
+                pass
+
+    # Event handling
+
+    def _batch_due(self) -> bool:
+        """Pending batch has been quiet for debounce seconds, or open for max_delay seconds"""
+        with self._lock:
+            if self._batch_started is None:
+                return False
+            now = time.monotonic()
+            return now - self._batch_last_event >= self.debounce or now - self._batch_started >= self.max_delay
+
+    def _record(self, change: Dict[str, Any]):
+        """Add one notification entry to the pending batch"""
+        decoded = decode_search_response([change])
+        if not decoded:
+            return
+        dn, attrs = decoded[0]
+        object_classes = {value.lower() for value in attrs.get("objectClass") or []}
+        deleted = any(value.upper() == "TRUE" for value in attrs.get("isDeleted") or [])
+        guid = (attrs.get("objectGUID") or [None])[0]
+
+        with self._lock:
+            self._stats["events"] += 1
+            self.last_event_at = time.time()
+            now = time.monotonic()
+            if self._batch_started is None:
+                self._batch_started = now
+            self._batch_last_event = now
+            self._pending_classes.update(object_classes & set(CACHE_PATTERNS_BY_CLASS))
+            if not deleted:
+                self._pending_dns.add(dn)
+
+            # The event only carries the current DN; the replica knows the previous one (rename/move/delete)
+            previous = directory_replica.locate(guid.hex()) if isinstance(guid, bytes) else None
+            if previous is not None and previous[1].lower() != dn.lower():
+                self._pending_dns.add(previous[1])
+            elif previous is None and deleted:
+                self._pending_deletes += 1
+            if deleted:
+                self._stats["deletes"] += 1
+
+    def flush(self):
+        """Apply the pending batch of invalidations"""
+        with self._lock:
+            if self._batch_started is None:
+                return
+            dns, self._pending_dns = self._pending_dns, set()
+            classes, self._pending_classes = self._pending_classes, set()
+            unknown_deletes, self._pending_deletes = self._pending_deletes, 0
+            self._batch_started = None
+            self._batch_last_event = None
+            self._stats["batches"] += 1
+
+        if unknown_deletes:
+            # Deleted object's old DN is unknown: drop every cached single-object read
+            ldap_conn.entry_cache.clear()
+        else:
+            for dn in dns:
+                ldap_conn.invalidate_entry(dn, subtree=True)
+
+        patterns = sorted({pattern for object_class in classes for pattern in CACHE_PATTERNS_BY_CLASS[object_class]})
+        for pattern in patterns:
+            invalidate_cache(pattern)
+        directory_replica.request_sync()
+        logger.info(f"🔔 AD changes: {len(dns)} objects, {unknown_deletes} untracked deletions, "
+                    f"invalidated {', '.join(patterns) or 'no list caches'}")
+
+    def _invalidate_all(self):
+        with self._lock:
+            self._stats["full_invalidations"] += 1
+        ldap_conn.entry_cache.clear()
+        for patterns in CACHE_PATTERNS_BY_CLASS.values():
+            for pattern in patterns:
+                invalidate_cache(pattern)
+        directory_replica.request_sync()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            pending = len(self._pending_dns) + self._pending_deletes
+        return {
+            "enabled": settings.LDAP_NOTIFY_ENABLED,
+            "state": self.state,
+            "server": self.server,
+            "base_dn": self.base_dn,
+            "connected_since": self.connected_since,
+            "last_event_at": self.last_event_at,
+            "pending": pending,
+            "consecutive_failures": self.consecutive_failures,
+            "next_retry_in": round(max(self.next_retry_at - time.time(), 0.0), 1) if self.next_retry_at else None,
+            "last_error": self.last_error,
+            **stats,
+        }
+
+
+# Global listener instance
+change_listener = ChangeNotificationListener(
+    debounce=settings.LDAP_NOTIFY_DEBOUNCE,
+    max_backoff=settings.LDAP_NOTIFY_MAX_BACKOFF,
+    max_delay=settings.LDAP_NOTIFY_MAX_DELAY
+)
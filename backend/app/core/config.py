@@ -10,6 +10,91 @@ class Settings(BaseSettings):
     LDAP_BIND_DN: str = "CN=admin,CN=Users,DC=example,DC=com"
     LDAP_BIND_PASSWORD: str = "password"
     
+    # LDAP Connection Pool
+    LDAP_POOL_MIN_SIZE: int = 2  # Connections kept warm
+    LDAP_POOL_MAX_SIZE: int = 10  # Upper bound on concurrent LDAP connections
+    LDAP_POOL_IDLE_TIMEOUT: int = 300  # Seconds before an idle connection above min size is closed
+    LDAP_POOL_CHECKOUT_TIMEOUT: float = 10.0  # Seconds to wait for a free connection
+    LDAP_POOL_HEALTH_CHECK_INTERVAL: int = 60  # Probe connections idle longer than this (seconds)
+    
+    # Multiple Domain Controllers
+    # Comma-separated, e.g. LDAP_URLS=ldaps://dc1:636,ldaps://dc2:636 (empty = LDAP_URL only)
+    LDAP_URLS: str = ""
+    LDAP_ROUTING_STRATEGY: str = "least_latency"  # least_latency or round_robin
+    LDAP_DC_PROBE_INTERVAL: int = 15  # Seconds between DC health probes
+    LDAP_DC_SLOW_THRESHOLD_MS: float = 500.0  # Quarantine DCs whose probe latency exceeds this
+    LDAP_DC_QUARANTINE_SECONDS: int = 60  # How long a failing/slow DC is skipped
+    LDAP_WRITE_PIN_SECONDS: int = 30  # Route a session's reads to the DC of its last write (replication lag)
+    
+    # Blocking I/O executors (keep LDAP/SQLite calls off the event loop)
+    LDAP_EXECUTOR_WORKERS: int = 10  # Match LDAP_POOL_MAX_SIZE
+    LDAP_SEARCH_TIMEOUT: float = 60.0  # Seconds before an awaited search is abandoned
+    LDAP_WRITE_TIMEOUT: float = 30.0  # Seconds before an awaited add/modify/delete/rename is abandoned
+    LDAP_SEARCH_PAGE_SIZE: int = 1000  # Entries per page for paged searches (AD MaxPageSize is 1000)
+    LDAP_RESOLVE_CHUNK_SIZE: int = 100  # DNs per OR-filter when resolving many DNs at once
+    LDAP_RESOLVE_CONCURRENCY: int = 4  # Chunk searches run in parallel per batch
+    LDAP_ENTRY_CACHE_SIZE: int = 1000  # DNs kept in the single-object read cache
+    LDAP_ENTRY_CACHE_TTL: float = 30.0  # Seconds a cached single-object read stays valid
+    LDAP_METRICS_ENABLED: bool = True  # Per-operation latency histograms (GET /api/metrics/ldap)
+    LDAP_METRICS_MAX_SERIES: int = 500  # Distinct label sets kept before new ones are folded into "other"
+    LDAP_VLV_ENABLED: bool = True  # Page user lists on the DC with server-side sort + virtual list view
+    LDAP_SCHEMA_CACHE_ENABLED: bool = True  # Reuse persisted rootDSE/schema instead of downloading them per bind
+    LDAP_SCHEMA_CACHE_PATH: str = "ldap_server_info.json"
+    LDAP_SCHEMA_CACHE_REVALIDATE_INTERVAL: int = 3600  # Seconds before a reconnect re-checks the schema version
+    AUTH_BIND_POOL_SIZE: int = 10  # Concurrent login binds (connections kept open and rebound per login)
+    AUTH_BIND_TIMEOUT: float = 10.0  # Seconds before a login bind is abandoned
+    AUTH_DN_FORMAT_CACHE_SIZE: int = 10000  # Users whose working DN format (UPN / CN) is remembered
+    API_KEY_CACHE_SIZE: int = 1000  # Verified API-key lookups kept in memory (per worker process)
+    API_KEY_CACHE_TTL: float = 30.0  # Seconds a verified key is trusted before SQLite is read again
+    API_KEY_NEGATIVE_CACHE_TTL: float = 5.0  # Seconds an unknown key is remembered as unknown
+    API_KEY_HOURLY_LIMIT_FACTOR: float = 60.0  # Per-hour tier = key rate_limit x this (60 = sustained per-minute rate, 0 = off)
+    STORAGE_EXECUTOR_WORKERS: int = 4
+    STORAGE_TIMEOUT: float = 10.0  # Seconds before an awaited SQLite call is abandoned
+    
+    # Response cache bounds for the memory shared-state backend
+    CACHE_MAX_ENTRIES: int = 2000  # Cached responses kept before least recently used ones are evicted (0 = unbounded)
+    CACHE_MAX_MEMORY_MB: int = 256  # Approximate memory for cached responses (0 = unbounded)
+    CACHE_SWEEP_INTERVAL: float = 60.0  # Seconds between background sweeps of expired entries
+    CACHE_COALESCE_TIMEOUT: float = 30.0  # Seconds a request waits for an identical in-flight cache miss
+    CACHE_STALE_TTL: int = 1800  # Seconds past its TTL a response is still served while refreshed in the background (0 = off)
+    CACHE_REFRESH_RETRY_INTERVAL: float = 30.0  # Seconds between refresh attempts while the DC is failing
+    
+    # Users list served from one in-memory dataset (filter/page/fields applied in-process)
+    USER_DATASET_ENABLED: bool = True
+    USER_DATASET_TTL: float = 300.0  # Seconds before the dataset is reloaded in the background
+    
+    # Cursor (keyset) pagination of list endpoints
+    CURSOR_SNAPSHOT_TTL: float = 600.0  # Seconds a walk's result snapshot is kept (then pages continue on live data)
+    CURSOR_SNAPSHOT_MAX: int = 200  # Snapshots kept per worker (least recently used dropped first)
+    
+    # Conditional list responses: ETag headers and 304 Not Modified for a matching If-None-Match
+    ETAGS_ENABLED: bool = True
+    
+    # Shared state for the response cache and rate limits (must be sqlite or redis with --workers > 1)
+    SHARED_STATE_BACKEND: str = "memory"  # memory (per process), sqlite (workers on one host) or redis
+    SHARED_STATE_PATH: str = "shared_state.db"  # SQLite file, opened in WAL mode
+    SHARED_STATE_REDIS_URL: str = "redis://localhost:6379/0"  # Needs the optional redis package
+    SHARED_STATE_KEY_PREFIX: str = "adm:"  # Namespace for keys on a shared Redis server
+    
+    # Directory replica (local copy of users/groups/OUs kept current via uSNChanged)
+    REPLICA_ENABLED: bool = False  # Opt in: keeps a copy of the directory in memory and in REPLICA_PATH
+    REPLICA_PATH: str = "directory_replica.json"  # Persisted copy for warm restarts
+    REPLICA_POLL_INTERVAL: int = 30  # Seconds between incremental polls
+    REPLICA_MAX_STALENESS: int = 300  # Older than this (seconds) and endpoints read LDAP directly
+    REPLICA_PERSIST_INTERVAL: int = 300  # Minimum seconds between writes of REPLICA_PATH
+    REPLICA_FULL_RESYNC_INTERVAL: int = 21600  # Periodic full sync (non-replicated lastLogon, unreadable tombstones)
+    
+    # Bulk group membership (POST /api/groups/members/bulk, user creation)
+    GROUP_BULK_CHUNK_SIZE: int = 500  # Member values per modify operation
+    GROUP_BULK_CONCURRENCY: int = 4  # Groups modified in parallel
+    GROUP_BULK_MAX_CHANGES: int = 10000  # Upper bound on (group, member) pairs per request
+    
+    # AD change notifications (invalidate caches when objects change outside this app)
+    LDAP_NOTIFY_ENABLED: bool = True
+    LDAP_NOTIFY_DEBOUNCE: float = 1.0  # Quiet seconds after the last change event before invalidating
+    LDAP_NOTIFY_MAX_DELAY: float = 10.0  # During a continuous burst, invalidate at most this often (seconds)
+    LDAP_NOTIFY_MAX_BACKOFF: float = 300.0  # Upper bound (seconds) on reconnect backoff
+    
     # Server Configuration
     HOST: str = "0.0.0.0"
     PORT: int = 8000
@@ -46,6 +131,12 @@ class Settings(BaseSettings):
     SMTP_FROM_EMAIL: str = "noreply@example.com"
     SMTP_FROM_NAME: str = "AD Management System"
     
+    @property
+    def ldap_urls(self) -> List[str]:
+        """Domain controller URLs from LDAP_URLS, falling back to LDAP_URL"""
+        urls = [url.strip() for url in self.LDAP_URLS.split(",") if url.strip()]
+        return urls or [self.LDAP_URL]
+    
     # Pydantic v2 uses model_config; keep empty Config for backward compatibility in code references
     # Remove legacy Config to avoid conflicts with Pydantic v2
 
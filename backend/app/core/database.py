@@ -1,15 +1,930 @@
-from ldap3 import Server, Connection, ALL, MODIFY_REPLACE, MODIFY_ADD, MODIFY_DELETE, SUBTREE, Tls
+from ldap3 import Server, Connection, ALL, DSA, NONE, BASE, MODIFY_REPLACE, MODIFY_ADD, MODIFY_DELETE, SUBTREE, Tls
+from ldap3.utils.conv import escape_filter_chars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import asyncio
+import re
 import ssl
+import threading
+import time
 from app.core.config import settings
+from app.core.executors import ldap_executor, run_blocking, check_cancelled, OperationCancelled
+from app.core.ldap_controls import decode_sort_response, decode_vlv_response, sort_control, vlv_control
+from app.core.ldap_metrics import ldap_metrics
+from app.core.server_info_cache import server_info_cache
 import logging
-from typing import Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Seconds to stop trying server-side sort/VLV after a DC reports it does not support the controls
+VLV_RETRY_SECONDS = 600
+
+
+class SessionReuseTls(Tls):
+    """TLS configuration that shares one SSLContext and resumes TLS sessions.
+
+    ldap3 builds a fresh SSLContext for every socket, which forces a full
+    handshake per pooled connection. Keeping one context lets new sockets
+    resume the last negotiated session instead.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._ssl_context = None
+        self._session = None
+        self._session_lock = threading.Lock()
+        self.sessions_reused = 0
+
+    def _get_ssl_context(self) -> ssl.SSLContext:
+        if self._ssl_context is None:
+            ssl_context = ssl.SSLContext(self.version or ssl.PROTOCOL_TLS_CLIENT)
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = self.validate
+            if self.ca_certs_file or self.ca_certs_path or self.ca_certs_data:
+                ssl_context.load_verify_locations(self.ca_certs_file, self.ca_certs_path, self.ca_certs_data)
+            self._ssl_context = ssl_context
+        return self._ssl_context
+
+    def wrap_socket(self, connection, do_handshake=False):
+        """Wrap the connection socket, resuming the cached TLS session if any"""
+        with self._session_lock:
+            session = self._session
+        wrapped_socket = self._get_ssl_context().wrap_socket(
+            connection.socket,
+            server_side=False,
+            do_handshake_on_connect=do_handshake,
+            session=session
+        )
+        connection.socket = wrapped_socket
+        if do_handshake:
+            self.remember_session(wrapped_socket)
+
+    def remember_session(self, wrapped_socket):
+        """Store the socket's TLS session so the next socket can resume it"""
+        try:
+            if getattr(wrapped_socket, "session_reused", False):
+                self.sessions_reused += 1
+            session = getattr(wrapped_socket, "session", None)
+            if session is not None:
+                with self._session_lock:
+                    self._session = session
+        except (ssl.SSLError, ValueError, AttributeError):
+            pass
+
+
+# Session/request key used to pin reads to the DC that took the caller's last write
+ldap_affinity_key: ContextVar[Optional[str]] = ContextVar("ldap_affinity_key", default=None)
+
+
+# Attributes AD returns as opaque binary; kept as bytes instead of decoded as UTF-8
+BINARY_ATTRIBUTES = frozenset(name.lower() for name in (
+    "objectGUID",
+    "objectSid",
+    "sIDHistory",
+    "tokenGroups",
+    "thumbnailPhoto",
+    "jpegPhoto",
+    "userCertificate",
+    "logonHours",
+    "nTSecurityDescriptor",
+    "msExchMailboxGuid",
+    "msDS-GenerationId",
+    "invocationId",
+))
+
+
+class LDAPAttributes(dict):
+    """Attribute dict with case-insensitive key lookups (LDAP names are case-insensitive).
+
+    Keys keep the server's spelling; a lowercase index is built once so
+    lookups by any casing stay O(1).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._keys = {key.lower(): key for key in self}
+
+    def _resolve(self, key):
+        if isinstance(key, str) and not dict.__contains__(self, key):
+            return self._keys.get(key.lower(), key)
+        return key
+
+    def key_for(self, name: str) -> str:
+        """Stored spelling of an attribute name (name itself if absent)"""
+        return self._resolve(name)
+
+    def __getitem__(self, key):
+        return super().__getitem__(self._resolve(key))
+
+    def __contains__(self, key):
+        return super().__contains__(self._resolve(key))
+
+    def __setitem__(self, key, value):
+        key = self._resolve(key)
+        super().__setitem__(key, value)
+        self._keys[key.lower()] = key
+
+    def __delitem__(self, key):
+        key = self._resolve(key)
+        super().__delitem__(key)
+        self._keys.pop(key.lower(), None)
+
+    def get(self, key, default=None):
+        return super().get(self._resolve(key), default)
+
+    def pop(self, key, *default):
+        key = self._resolve(key)
+        if isinstance(key, str):
+            self._keys.pop(key.lower(), None)
+        return super().pop(key, *default)
+
+
+def decode_search_response(response) -> List[Tuple[str, LDAPAttributes]]:
+    """Decode a raw ldap3 search response into (dn, attributes) tuples.
+
+    Works on ``connection.response`` raw values instead of ldap3 Entry objects:
+    each value is decoded from UTF-8 once (integers and timestamps stay in
+    their LDAP string form) and BINARY_ATTRIBUTES are kept as bytes.
+    Referrals and other non-entry items are skipped.
+    """
+    results = []
+    for item in response or ():
+        if item.get('type') != 'searchResEntry':
+            continue
+        attrs = {}
+        for name, values in item.get('raw_attributes', {}).items():
+            if name.lower() in BINARY_ATTRIBUTES:
+                attrs[name] = list(values)
+            else:
+                attrs[name] = [
+                    value.decode('utf-8', errors='replace') if isinstance(value, bytes) else str(value)
+                    for value in values
+                ]
+        results.append((item['dn'], LDAPAttributes(attrs)))
+    return results
+
+
+def chunk_dn_filters(dns: Iterable[str], object_filter: Optional[str] = None, chunk_size: int = 100) -> List[Tuple[List[str], str]]:
+    """Split DNs into (chunk, filter) pairs matching each chunk on distinguishedName.
+
+    Duplicates (case-insensitive) are dropped; object_filter (e.g. "(objectClass=user)")
+    is ANDed into every chunk filter.
+    """
+    unique = list({dn.lower(): dn for dn in dns if dn}.values())
+    chunk_size = max(1, chunk_size)
+    chunks = []
+    for i in range(0, len(unique), chunk_size):
+        chunk = unique[i:i + chunk_size]
+        dn_filter = "(|" + "".join(f"(distinguishedName={escape_filter_chars(dn)})" for dn in chunk) + ")"
+        chunks.append((chunk, f"(&{object_filter}{dn_filter})" if object_filter else dn_filter))
+    return chunks
+
+
+def match_resolved_dns(dns: Iterable[str], results: Iterable[Tuple[str, Any]]) -> Tuple[Dict[str, Tuple[str, Any]], List[str]]:
+    """Map each requested DN to its search result entry; return (found, missing)"""
+    by_dn = {entry[0].lower(): entry for entry in results}
+    found = {}
+    missing = []
+    for dn in dict.fromkeys(dns):
+        entry = by_dn.get(dn.lower()) if dn else None
+        if entry is None:
+            missing.append(dn)
+        else:
+            found[dn] = entry
+    return found, missing
+
+
+# "member;range=0-1499" -> attribute, first index, last index ("*" = final chunk)
+_RANGE_ATTRIBUTE = re.compile(r"^(?P<name>[^;]+);range=(?P<low>\d+)-(?P<high>\d+|\*)$", re.IGNORECASE)
+
+
+def parse_range_attribute(name: str) -> Optional[Tuple[str, int, Optional[int]]]:
+    """Split a ranged attribute name into (attribute, low, high); high is None for the last chunk"""
+    match = _RANGE_ATTRIBUTE.match(name)
+    if not match:
+        return None
+    high = match.group("high")
+    return match.group("name"), int(match.group("low")), None if high == "*" else int(high)
+
+
+class EntryCache:
+    """Small per-DN LRU cache for BASE-scope reads.
+
+    Attribute sets requested for the same DN are merged, so a later read of a
+    subset (or the same set) is served from memory. Entries expire after
+    ``ttl`` seconds and are invalidated by our own writes.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    @staticmethod
+    def _object_class(object_filter: Optional[str]) -> Optional[str]:
+        """'user' for '(objectClass=user)'; '*' for no filter; None if not cacheable"""
+        if not object_filter or object_filter.lower() == "(objectclass=*)":
+            return "*"
+        lowered = object_filter.lower()
+        if lowered.startswith("(objectclass=") and lowered.endswith(")") and lowered.count("(") == 1:
+            return lowered[len("(objectclass="):-1]
+        return None
+
+    @staticmethod
+    def cacheable(object_filter: Optional[str]) -> bool:
+        return EntryCache._object_class(object_filter) is not None
+
+    def get(self, dn: str, attributes: List[str], object_filter: Optional[str] = None, record_stats: bool = True):
+        """Cached (dn, attrs) if every requested attribute is known, else None.
+
+        Returns False (not None) when the cached object does not match object_filter.
+        """
+        object_class = self._object_class(object_filter)
+        key = dn.lower()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None or object_class is None or time.monotonic() - cached["stored_at"] > self.ttl:
+                if cached is not None:
+                    del self._entries[key]
+                if record_stats:
+                    self._stats["misses"] += 1
+                return None
+
+            wanted = [name for name in attributes if name != "*"]
+            if ("*" in attributes and not cached["all_user"]) or any(name.lower() not in cached["fetched"] for name in wanted):
+                if record_stats:
+                    self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if record_stats:
+                self._stats["hits"] += 1
+            attrs = cached["attrs"]
+            if object_class != "*" and object_class not in (value.lower() for value in attrs.get("objectClass", [])):
+                return False
+            if "*" in attributes:
+                selected = {name: list(values) for name, values in attrs.items()}
+            else:
+                selected = {}
+            for name in wanted:
+                selected[attrs.key_for(name)] = list(attrs.get(name, []))
+            return cached["dn"], LDAPAttributes(selected)
+
+    def put(self, dn: str, attributes: List[str], entry_attrs: Dict[str, list]):
+        """Store (merge) the attributes read for dn"""
+        key = dn.lower()
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None or now - cached["stored_at"] > self.ttl:
+                cached = {"dn": dn, "attrs": LDAPAttributes(), "fetched": set(), "all_user": False, "stored_at": now}
+                self._entries[key] = cached
+            for name, values in entry_attrs.items():
+                cached["attrs"][name] = list(values)
+                cached["fetched"].add(name.lower())
+            for name in attributes:
+                if name == "*":
+                    cached["all_user"] = True
+                else:
+                    cached["fetched"].add(name.lower())
+                    if name not in cached["attrs"]:
+                        cached["attrs"][name] = []
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, dn: str, subtree: bool = False):
+        """Drop dn (and, with subtree, every cached entry below it)"""
+        key = dn.lower()
+        with self._lock:
+            removed = 1 if self._entries.pop(key, None) is not None else 0
+            if subtree:
+                suffix = "," + key
+                for child in [k for k in self._entries if k.endswith(suffix)]:
+                    del self._entries[child]
+                    removed += 1
+            self._stats["invalidations"] += removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled LDAP connection becomes available in time"""
+
+
+class LDAPSearchError(Exception):
+    """Raised by the streaming search iterators when a search fails"""
+
+
+class _PooledConnection:
+    """Bookkeeping wrapper around a bound ldap3 Connection"""
+
+    __slots__ = ("connection", "pool", "created_at", "last_used")
+
+    def __init__(self, connection: Connection, pool: "LDAPConnectionPool"):
+        now = time.monotonic()
+        self.connection = connection
+        self.pool = pool
+        self.created_at = now
+        self.last_used = now
+
+
+class LDAPConnectionPool:
+    """Bounded pool of bound LDAP connections with checkout/return semantics.
+
+    - Connections are created lazily up to ``max_size`` and kept warm down to ``min_size``
+    - Connections idle longer than ``idle_timeout`` are evicted
+    - Connections idle longer than ``health_check_interval`` are probed before checkout
+    - A broken connection is discarded on its own; other checkouts are unaffected
+    """
+
+    def __init__(
+        self,
+        server: Server,
+        user: str,
+        password: str,
+        min_size: int = 2,
+        max_size: int = 10,
+        idle_timeout: float = 300.0,
+        checkout_timeout: float = 10.0,
+        health_check_interval: float = 60.0,
+        tls: Optional[SessionReuseTls] = None,
+        name: Optional[str] = None
+    ):
+        self.server = server
+        self.name = name or str(server)
+        self.user = user
+        self.password = password
+        self.max_size = max(1, max_size)
+        self.min_size = max(0, min(min_size, self.max_size))
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.tls = tls
+
+        self._idle: deque = deque()
+        self._in_use: set = set()
+        self._pending = 0  # connections being opened outside the lock
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+        # Statistics
+        self._waiting = 0
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "created": 0,
+            "create_failures": 0,
+            "discarded": 0,
+            "evicted": 0,
+            "health_check_failures": 0,
+            "wait_time_total_ms": 0.0,
+            "wait_time_max_ms": 0.0,
+        }
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._pending
+
+    def _open_connection(self) -> _PooledConnection:
+        """Open and bind a new connection (called without holding the lock)"""
+        connection = Connection(
+            self.server,
+            user=self.user,
+            password=self.password,
+            auto_bind=True
+        )
+        if not connection.bound:
+            raise Exception("Failed to bind to LDAP server")
+        if self.tls is not None and connection.socket is not None:
+            self.tls.remember_session(connection.socket)
+        return _PooledConnection(connection, self)
+
+    @staticmethod
+    def _close_connection(pooled: _PooledConnection):
+        try:
+            pooled.connection.unbind()
+        except Exception as e:
+            err = str(e)
+            if "socket sending error" in err.lower() or "winerror 10054" in err.lower():
+                # Connection already dropped by server – safe to ignore
+                logger.debug("Pooled LDAP connection already closed by remote host")
+            else:
+                logger.warning(f"Error closing pooled LDAP connection: {e}")
+
+    def _is_healthy(self, pooled: _PooledConnection) -> bool:
+        """Check a pooled connection; probe the server if it has been idle for a while"""
+        connection = pooled.connection
+        if connection.closed or not connection.bound:
+            return False
+        if time.monotonic() - pooled.last_used < self.health_check_interval:
+            return True
+        timer = ldap_metrics.start_search("", "(objectClass=*)", base_scope=True, source="pool-health-check")
+        timer.server = connection.server.name
+        healthy = False
+        try:
+            # Cheap rootDSE read – no attributes returned
+            healthy = bool(connection.search("", "(objectClass=*)", search_scope=BASE, attributes=["1.1"]))
+            return healthy
+        except Exception as e:
+            logger.debug(f"Pooled LDAP connection failed health check: {e}")
+            return False
+        finally:
+            timer.finish(healthy)
+
+    def _evict_idle_locked(self) -> list:
+        """Pop idle connections past idle_timeout (keeping min_size); caller closes them"""
+        evicted = []
+        now = time.monotonic()
+        while self._idle and self.size > self.min_size:
+            oldest = self._idle[0]
+            if now - oldest.last_used < self.idle_timeout:
+                break
+            self._idle.popleft()
+            evicted.append(oldest)
+        self._stats["evicted"] += len(evicted)
+        return evicted
+
+    def fill(self, target: Optional[int] = None) -> int:
+        """Open connections until target (default min_size) is reached. Returns number opened."""
+        target = self.min_size if target is None else min(target, self.max_size)
+        opened = 0
+        while True:
+            with self._cond:
+                if self._closed or self.size >= target:
+                    break
+                self._pending += 1
+            try:
+                pooled = self._open_connection()
+            except Exception:
+                with self._cond:
+                    self._pending -= 1
+                    self._stats["create_failures"] += 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._pending -= 1
+                self._stats["created"] += 1
+                self._idle.append(pooled)
+                self._cond.notify()
+            opened += 1
+        return opened
+
+    def acquire(self, timeout: Optional[float] = None) -> _PooledConnection:
+        """Check out a healthy connection, opening a new one if below max_size"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        while True:
+            stale = []
+            candidate = None
+            create = False
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeoutError("LDAP connection pool is closed")
+                stale = self._evict_idle_locked()
+                while not self._idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {timeout:.1f}s waiting for an LDAP connection "
+                            f"({len(self._in_use)}/{self.max_size} in use)"
+                        )
+                    waited = True
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                if self._idle:
+                    # LIFO keeps the hottest connections busy and lets cold ones age out
+                    candidate = self._idle.pop()
+                    self._in_use.add(candidate)
+                else:
+                    self._pending += 1
+                    create = True
+
+            for pooled in stale:
+                self._close_connection(pooled)
+
+            if create:
+                try:
+                    candidate = self._open_connection()
+                except Exception:
+                    with self._cond:
+                        self._pending -= 1
+                        self._stats["create_failures"] += 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._pending -= 1
+                    self._stats["created"] += 1
+                    self._in_use.add(candidate)
+            elif not self._is_healthy(candidate):
+                with self._cond:
+                    self._stats["health_check_failures"] += 1
+                self.release(candidate, discard=True)
+                continue
+
+            wait_ms = (time.monotonic() - start) * 1000
+            with self._cond:
+                self._stats["checkouts"] += 1
+                if waited:
+                    self._stats["waits"] += 1
+                self._stats["wait_time_total_ms"] += wait_ms
+                self._stats["wait_time_max_ms"] = max(self._stats["wait_time_max_ms"], wait_ms)
+            return candidate
+
+    def release(self, pooled: _PooledConnection, discard: bool = False):
+        """Return a connection to the pool, or close it if discard is set"""
+        with self._cond:
+            self._in_use.discard(pooled)
+            keep = not discard and not self._closed and pooled.connection.bound and not pooled.connection.closed
+            if keep:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+            else:
+                self._stats["discarded"] += 1
+            self._cond.notify()
+        if not keep:
+            self._close_connection(pooled)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Context manager yielding a pooled ldap3 Connection"""
+        pooled = self.acquire(timeout)
+        try:
+            yield pooled.connection
+        except Exception:
+            self.release(pooled, discard=True)
+            raise
+        else:
+            self.release(pooled)
+
+    def close(self):
+        """Close all idle connections and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for pooled in idle:
+            self._close_connection(pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, saturation and checkout wait-time statistics"""
+        with self._cond:
+            in_use = len(self._in_use)
+            checkouts = self._stats["checkouts"]
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self.size,
+                "idle": len(self._idle),
+                "in_use": in_use,
+                "waiting": self._waiting,
+                "saturation": round(in_use / self.max_size, 3),
+                "checkouts": checkouts,
+                "waits": self._stats["waits"],
+                "timeouts": self._stats["timeouts"],
+                "created": self._stats["created"],
+                "create_failures": self._stats["create_failures"],
+                "discarded": self._stats["discarded"],
+                "evicted": self._stats["evicted"],
+                "health_check_failures": self._stats["health_check_failures"],
+                "wait_time_avg_ms": round(self._stats["wait_time_total_ms"] / checkouts, 3) if checkouts else 0.0,
+                "wait_time_max_ms": round(self._stats["wait_time_max_ms"], 3),
+                "tls_sessions_reused": self.tls.sessions_reused if self.tls else 0,
+            }
+
+
+class _DomainController:
+    """Routing state for one domain controller and its connection pool"""
+
+    def __init__(self, url: str, pool: LDAPConnectionPool):
+        self.url = url
+        self.pool = pool
+        self.latency_ms: Optional[float] = None  # EWMA of probe round-trips
+        self.quarantined_until = 0.0
+        self.quarantine_reason: Optional[str] = None
+        self.consecutive_failures = 0
+        self.last_probe: Optional[float] = None
+
+    @property
+    def quarantined(self) -> bool:
+        return time.monotonic() < self.quarantined_until
+
+
+class LDAPServerPool:
+    """Routes pooled connections across several domain controllers.
+
+    - Reads go round-robin or to the lowest-latency DC (``strategy``)
+    - A background probe measures each DC; failing or slow DCs are quarantined
+    - After a write the caller's affinity key is pinned to the DC that took it,
+      so follow-up reads see the write before replication catches up
+
+    Exposes the same acquire/release/close/stats interface as LDAPConnectionPool.
+    """
+
+    def __init__(
+        self,
+        pools: List[LDAPConnectionPool],
+        strategy: str = "least_latency",
+        probe_interval: float = 15.0,
+        slow_threshold_ms: float = 500.0,
+        quarantine_seconds: float = 60.0,
+        pin_seconds: float = 30.0
+    ):
+        if not pools:
+            raise ValueError("At least one LDAP server is required")
+        self.strategy = strategy
+        self.probe_interval = probe_interval
+        self.slow_threshold_ms = slow_threshold_ms
+        self.quarantine_seconds = quarantine_seconds
+        self.pin_seconds = pin_seconds
+
+        self._controllers = [_DomainController(pool.name, pool) for pool in pools]
+        self._by_pool = {id(dc.pool): dc for dc in self._controllers}
+        self._lock = threading.Lock()
+        self._next_index = 0
+        self._pins: Dict[str, Tuple[_DomainController, float]] = {}
+        self._stats = {"pinned_checkouts": 0, "pins": 0, "quarantines": 0, "failovers": 0}
+
+        self._stop = threading.Event()
+        self._probe_thread: Optional[threading.Thread] = None
+        if len(self._controllers) > 1 and probe_interval > 0:
+            self._probe_thread = threading.Thread(target=self._probe_loop, name="ldap-dc-probe", daemon=True)
+            self._probe_thread.start()
+
+    @property
+    def size(self) -> int:
+        return sum(dc.pool.size for dc in self._controllers)
+
+    @property
+    def min_size(self) -> int:
+        return self._controllers[0].pool.min_size
+
+    @property
+    def max_size(self) -> int:
+        return sum(dc.pool.max_size for dc in self._controllers)
+
+    # Routing
+
+    def _pinned_locked(self, key: Optional[str]) -> Optional[_DomainController]:
+        if not key:
+            return None
+        pin = self._pins.get(key)
+        if pin is None:
+            return None
+        dc, expires = pin
+        if time.monotonic() >= expires or dc.quarantined:
+            del self._pins[key]
+            return None
+        return dc
+
+    def _choose(self, exclude=()) -> _DomainController:
+        """Pick a DC for the current caller (pinned DC first, then by strategy)"""
+        with self._lock:
+            pinned = self._pinned_locked(ldap_affinity_key.get())
+            if pinned is not None and pinned not in exclude:
+                self._stats["pinned_checkouts"] += 1
+                return pinned
+
+            candidates = [dc for dc in self._controllers if dc not in exclude and not dc.quarantined]
+            if not candidates:
+                # Everything quarantined: try whichever DC comes back soonest
+                candidates = sorted(
+                    (dc for dc in self._controllers if dc not in exclude),
+                    key=lambda dc: dc.quarantined_until
+                )[:1] or self._controllers[:1]
+
+            if self.strategy == "round_robin" or len(candidates) == 1:
+                dc = candidates[self._next_index % len(candidates)]
+                self._next_index += 1
+                return dc
+            # Unprobed DCs count as fast so they get measured
+            return min(candidates, key=lambda dc: dc.latency_ms or 0.0)
+
+    def acquire(self, timeout: Optional[float] = None) -> _PooledConnection:
+        """Check out a connection from the DC chosen for the current caller"""
+        tried = []
+        while True:
+            dc = self._choose(exclude=tried)
+            try:
+                return dc.pool.acquire(timeout)
+            except PoolTimeoutError:
+                raise
+            except Exception as e:
+                self._quarantine(dc, f"connect failed: {e}")
+                tried.append(dc)
+                if len(tried) >= len(self._controllers):
+                    raise
+                with self._lock:
+                    self._stats["failovers"] += 1
+                logger.warning(f"🔀 Failing over from {dc.url}: {e}")
+
+    def acquire_from(self, url: str, timeout: Optional[float] = None) -> _PooledConnection:
+        """Check out a connection from one specific DC (no failover or pinning)"""
+        for dc in self._controllers:
+            if dc.url == url:
+                return dc.pool.acquire(timeout)
+        raise ValueError(f"Unknown domain controller: {url}")
+
+    def release(self, pooled: _PooledConnection, discard: bool = False):
+        pooled.pool.release(pooled, discard=discard)
+
+    def pin(self, pooled: _PooledConnection):
+        """Pin the current affinity key to the DC that served pooled (after a write)"""
+        key = ldap_affinity_key.get()
+        dc = self._by_pool.get(id(pooled.pool))
+        if not key or dc is None or len(self._controllers) == 1:
+            return
+        with self._lock:
+            self._pins[key] = (dc, time.monotonic() + self.pin_seconds)
+            self._stats["pins"] += 1
+            # Drop expired pins so the map stays bounded by active sessions
+            if len(self._pins) > 1000:
+                now = time.monotonic()
+                for k in [k for k, (_, expires) in self._pins.items() if expires <= now]:
+                    del self._pins[k]
+
+    def report_failure(self, pooled: _PooledConnection, error: str):
+        """Quarantine the DC behind pooled after a connection-level failure"""
+        dc = self._by_pool.get(id(pooled.pool))
+        if dc is not None:
+            self._quarantine(dc, error)
+
+    def _quarantine(self, dc: _DomainController, reason: str):
+        if len(self._controllers) == 1:
+            return
+        with self._lock:
+            dc.consecutive_failures += 1
+            if not dc.quarantined:
+                self._stats["quarantines"] += 1
+                logger.warning(f"🚧 Quarantining domain controller {dc.url} for {self.quarantine_seconds}s: {reason}")
+            dc.quarantined_until = time.monotonic() + self.quarantine_seconds
+            dc.quarantine_reason = reason
+
+    # Health probing
+
+    def probe(self, dc: _DomainController):
+        """Time a rootDSE read on dc; quarantine it if it fails or is too slow"""
+        started = time.monotonic()
+        try:
+            pooled = dc.pool.acquire(timeout=min(dc.pool.checkout_timeout, self.probe_interval or 5.0))
+        except Exception as e:
+            self._quarantine(dc, f"probe connect failed: {e}")
+            return
+        ok = False
+        timer = ldap_metrics.start_search("", "(objectClass=*)", base_scope=True, source="dc-probe")
+        timer.server = pooled.connection.server.name
+        try:
+            ok = bool(pooled.connection.search("", "(objectClass=*)", search_scope=BASE, attributes=["1.1"]))
+        except Exception as e:
+            logger.debug(f"Probe of {dc.url} raised: {e}")
+        finally:
+            timer.finish(ok)
+            dc.pool.release(pooled, discard=not ok)
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        dc.last_probe = time.time()
+        if not ok:
+            self._quarantine(dc, "probe search failed")
+            return
+
+        with self._lock:
+            dc.latency_ms = elapsed_ms if dc.latency_ms is None else 0.7 * dc.latency_ms + 0.3 * elapsed_ms
+            latency = dc.latency_ms
+        if latency > self.slow_threshold_ms:
+            self._quarantine(dc, f"slow ({latency:.0f}ms > {self.slow_threshold_ms:.0f}ms)")
+        else:
+            with self._lock:
+                if dc.quarantined or dc.consecutive_failures:
+                    logger.info(f"✅ Domain controller {dc.url} healthy again ({latency:.0f}ms)")
+                dc.quarantined_until = 0.0
+                dc.quarantine_reason = None
+                dc.consecutive_failures = 0
+
+    def _probe_loop(self):
+        while not self._stop.wait(self.probe_interval):
+            for dc in self._controllers:
+                if self._stop.is_set():
+                    return
+                try:
+                    self.probe(dc)
+                except Exception as e:
+                    logger.warning(f"Probe of {dc.url} failed: {e}")
+
+    def fill(self, target: Optional[int] = None) -> int:
+        """Warm every DC's pool; succeeds if at least one DC binds"""
+        opened = 0
+        errors = []
+        for dc in self._controllers:
+            try:
+                opened += dc.pool.fill(target)
+            except Exception as e:
+                errors.append(e)
+                self._quarantine(dc, f"initial bind failed: {e}")
+        if len(errors) == len(self._controllers):
+            raise errors[0]
+        return opened
+
+    def close(self):
+        self._stop.set()
+        for dc in self._controllers:
+            dc.pool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregate pool statistics plus per-DC routing state"""
+        controllers = []
+        for dc in self._controllers:
+            controllers.append({
+                "url": dc.url,
+                "quarantined": dc.quarantined,
+                "quarantine_reason": dc.quarantine_reason if dc.quarantined else None,
+                "latency_ms": round(dc.latency_ms, 3) if dc.latency_ms is not None else None,
+                "last_probe": dc.last_probe,
+                "pool": dc.pool.stats(),
+            })
+        totals = {
+            key: sum(c["pool"][key] for c in controllers)
+            for key in ("size", "idle", "in_use", "waiting", "checkouts", "waits", "timeouts", "created", "discarded")
+        }
+        with self._lock:
+            routing = dict(self._stats, active_pins=len(self._pins))
+        return {
+            "strategy": self.strategy,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            **totals,
+            "saturation": round(totals["in_use"] / self.max_size, 3),
+            "routing": routing,
+            "domain_controllers": controllers,
+        }
+
+
+def make_server(url: str, get_info=ALL) -> Tuple[Server, Optional[SessionReuseTls]]:
+    """ldap3 Server for one DC URL plus its TLS configuration (None for plain ldap://)
+
+    With the server info cache enabled, rootDSE info and schema come from the
+    cache instead of being downloaded on every bind (see ServerInfoCache).
+    """
+    use_ssl = url.startswith('ldaps://')
+    # Sessions are per server, so each DC gets its own TLS session cache
+    tls_configuration = SessionReuseTls(validate=ssl.CERT_NONE, version=ssl.PROTOCOL_TLSv1_2) if use_ssl else None
+    use_cache = settings.LDAP_SCHEMA_CACHE_ENABLED and get_info in (ALL, DSA)
+    server = Server(
+        url,
+        get_info=NONE if use_cache else get_info,
+        use_ssl=use_ssl,
+        tls=tls_configuration
+    )
+    if use_cache:
+        server_info_cache.attach(server, url)
+    return server, tls_configuration
+
+
 class LDAPConnection:
     def __init__(self):
-        self.connection = None
         self.server = None
+        self.pool: Optional[LDAPConnectionPool] = None
+        self._pool_lock = threading.RLock()
+        self._local = threading.local()
+        self.entry_cache = EntryCache(settings.LDAP_ENTRY_CACHE_SIZE, settings.LDAP_ENTRY_CACHE_TTL)
+        self._write_listeners: List[Callable[[str], None]] = []
+        self._vlv_unsupported_until = 0.0
+
+    @property
+    def connection(self) -> Optional[Connection]:
+        """Connection currently checked out by this thread (None outside an operation)"""
+        return getattr(self._local, "connection", None)
+
+    @property
+    def last_error(self) -> Optional[str]:
+        """Last LDAP error seen by an operation on this thread"""
+        return getattr(self._local, "last_error", None)
 
     def _is_connection_error(self, message: Optional[str]) -> bool:
         if not message:
@@ -22,228 +937,618 @@ class LDAPConnection:
             or "server is unwilling" in lowered  # add safety for abrupt resets
         )
 
-    def _ensure_connection(self) -> bool:
-        if self.connection and self.connection.bound:
+    def _ensure_pool(self) -> bool:
+        if self.pool is not None:
             return True
-        logger.warning("🔄 LDAP connection not bound. Attempting to reconnect...")
-        self.disconnect()
-        return self.connect()
+        with self._pool_lock:
+            if self.pool is not None:
+                return True
+            logger.warning("🔄 LDAP connection pool not initialized. Attempting to connect...")
+            return self.connect()
 
-    def _reset_connection(self):
-        logger.warning("🔁 Resetting LDAP connection...")
-        self.disconnect()
-        self.connect()
+    def _execute_with_retry(self, operation_name: str, operation_callable, write: bool = False,
+                            timer=None) -> Tuple[bool, Optional[str]]:
+        """Run operation_callable(connection) on a pooled connection.
 
-    def _execute_with_retry(self, operation_name: str, operation_callable) -> Tuple[bool, Optional[str]]:
+        On a connection-level failure only the broken connection is discarded
+        (its DC is quarantined) and the operation is retried once on another
+        pooled connection. A successful write pins the caller to that DC.
+        timer (an ldap_metrics OperationTimer) gets the DC and retry count;
+        the caller finishes it.
+        """
         attempts = 0
         last_error = None
 
         while attempts < 2:
             attempts += 1
 
-            if not self._ensure_connection():
+            if not self._ensure_pool():
                 last_error = "Unable to bind to LDAP server"
                 break
 
             try:
-                result = operation_callable()
+                pooled = self.pool.acquire()
+            except Exception as e:
+                last_error = f"Unable to get LDAP connection: {e}"
+                logger.error(f"{operation_name} failed: {last_error}")
+                break
+
+            discard = False
+            self._local.connection = pooled.connection
+            if timer is not None:
+                timer.server = pooled.connection.server.name
+                timer.retries = attempts - 1
+                timer.reset()
+            try:
+                result = operation_callable(pooled.connection)
                 if result:
+                    self._local.last_error = None
+                    if write:
+                        self.pool.pin(pooled)
                     return True, None
 
-                last_error = self.connection.last_error if self.connection else "Unknown error"
+                last_error = pooled.connection.last_error or "Unknown error"
                 logger.error(f"{operation_name} failed: {last_error}")
 
-                if self._is_connection_error(last_error) and attempts < 2:
-                    self._reset_connection()
-                    continue
+                if self._is_connection_error(last_error):
+                    discard = True
+                    self.pool.report_failure(pooled, last_error)
+                    if attempts < 2:
+                        continue
                 break
             except Exception as e:
                 last_error = str(e)
                 logger.error(f"{operation_name} raised exception: {last_error}")
-                if self._is_connection_error(last_error) and attempts < 2:
-                    self._reset_connection()
-                    continue
+                discard = True
+                if self._is_connection_error(last_error):
+                    self.pool.report_failure(pooled, last_error)
+                    if attempts < 2:
+                        continue
                 break
+            finally:
+                self._local.connection = None
+                self._local.last_error = last_error
+                self.pool.release(pooled, discard=discard)
 
+        self._local.last_error = last_error
         return False, last_error
-        
+
     def connect(self):
-        """Establish LDAP connection"""
-        try:
-            # Use SSL/TLS for secure connection (required for password operations)
-            use_ssl = settings.LDAP_URL.startswith('ldaps://')
-            
-            # IMPORTANT: Log LDAP URL to verify settings
-            logger.info(f"🔌 Connecting to LDAP: {settings.LDAP_URL}")
-            logger.info(f"🔒 Using SSL/TLS: {use_ssl}")
-            
-            if not use_ssl:
-                # Note: LDAPS is recommended for password operations
-                logger.debug("Note: Using LDAP (not LDAPS). For production, use ldaps://...:636")
-            
-            # Configure TLS for LDAPS
-            tls_configuration = None
-            if use_ssl:
-                # Allow self-signed certificates (for development/internal AD)
-                tls_configuration = Tls(validate=ssl.CERT_NONE, version=ssl.PROTOCOL_TLSv1_2)
-                logger.info("🔐 TLS configured with CERT_NONE validation (allowing self-signed certs)")
-            
-            self.server = Server(
-                settings.LDAP_URL, 
-                get_info=ALL, 
-                use_ssl=use_ssl,
-                tls=tls_configuration
-            )
-            
-            self.connection = Connection(
-                self.server,
-                user=settings.LDAP_BIND_DN,
-                password=settings.LDAP_BIND_PASSWORD,
-                auto_bind=True
-            )
-            if not self.connection.bound:
-                raise Exception("Failed to bind to LDAP server")
-            logger.info("✅ LDAP connection established successfully")
-            return True
-        except Exception as e:
-            logger.error(f"LDAP connection failed: {e}")
-            return False
-    
-    def disconnect(self):
-        """Close LDAP connection"""
-        if self.connection:
+        """Initialize the LDAP connection pool and open the minimum number of connections"""
+        with self._pool_lock:
             try:
-                self.connection.unbind()
-            except Exception as e:
-                err = str(e)
-                if "socket sending error" in err.lower() or "winerror 10054" in err:
-                    # Connection already dropped by server – safe to ignore
-                    logger.warning("LDAP connection already closed by remote host (WinError 10054). Resetting locally.")
+                urls = settings.ldap_urls
+                # Use SSL/TLS for secure connection (required for password operations)
+                use_ssl = all(url.startswith('ldaps://') for url in urls)
+
+                # IMPORTANT: Log LDAP URL to verify settings
+                logger.info(f"🔌 Connecting to LDAP: {', '.join(urls)}")
+                logger.info(f"🔒 Using SSL/TLS: {use_ssl}")
+
+                if not use_ssl:
+                    # Note: LDAPS is recommended for password operations
+                    logger.debug("Note: Using LDAP (not LDAPS). For production, use ldaps://...:636")
                 else:
-                    logger.error(f"Error closing LDAP connection: {e}")
-        self.connection = None
-    
-    def _do_search(self, base_dn, filter_str, attributes=None):
-        """Internal search method (for retry logic)"""
+                    # Allow self-signed certificates (for development/internal AD)
+                    # Session reuse lets pooled connections skip the full handshake
+                    logger.info("🔐 TLS configured with CERT_NONE validation (allowing self-signed certs)")
+
+                if self.pool is not None:
+                    self.pool.close()
+                    self.pool = None
+
+                # One connection pool per domain controller
+                pools = []
+                for url in urls:
+                    server, tls_configuration = make_server(url)
+                    pools.append(LDAPConnectionPool(
+                        server,
+                        user=settings.LDAP_BIND_DN,
+                        password=settings.LDAP_BIND_PASSWORD,
+                        min_size=settings.LDAP_POOL_MIN_SIZE,
+                        max_size=settings.LDAP_POOL_MAX_SIZE,
+                        idle_timeout=settings.LDAP_POOL_IDLE_TIMEOUT,
+                        checkout_timeout=settings.LDAP_POOL_CHECKOUT_TIMEOUT,
+                        health_check_interval=settings.LDAP_POOL_HEALTH_CHECK_INTERVAL,
+                        tls=tls_configuration,
+                        name=url
+                    ))
+                self.server = pools[0].server
+
+                pool = LDAPServerPool(
+                    pools,
+                    strategy=settings.LDAP_ROUTING_STRATEGY,
+                    probe_interval=settings.LDAP_DC_PROBE_INTERVAL,
+                    slow_threshold_ms=settings.LDAP_DC_SLOW_THRESHOLD_MS,
+                    quarantine_seconds=settings.LDAP_DC_QUARANTINE_SECONDS,
+                    pin_seconds=settings.LDAP_WRITE_PIN_SECONDS
+                )
+                # Make sure at least one connection binds before accepting the pool
+                pool.fill(max(pool.min_size, 1))
+                self.pool = pool
+                logger.info(f"✅ LDAP connection pool established ({pool.size}/{pool.max_size} connections)")
+                if settings.LDAP_SCHEMA_CACHE_ENABLED:
+                    self._refresh_server_info(pools)
+                return True
+            except Exception as e:
+                logger.error(f"LDAP connection failed: {e}")
+                return False
+
+    def _refresh_server_info(self, pools: List[LDAPConnectionPool]):
+        """Fetch server info for DCs missing from the cache now, revalidate stale ones in the background"""
+        def refresh(dc_pool):
+            try:
+                with dc_pool.connection() as connection:
+                    server_info_cache.refresh(connection, dc_pool.name)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not refresh server info for {dc_pool.name}: {e}")
+
+        for dc_pool in pools:
+            if dc_pool.server.schema is None:
+                # Cold cache: callers expect schema-aware attribute formatting from the first search
+                refresh(dc_pool)
+            elif server_info_cache.needs_refresh(dc_pool.name):
+                threading.Thread(target=refresh, args=(dc_pool,), name="ldap-server-info", daemon=True).start()
+
+    def disconnect(self):
+        """Close all pooled LDAP connections"""
+        with self._pool_lock:
+            if self.pool is not None:
+                self.pool.close()
+            self.pool = None
+
+    def is_connected(self) -> bool:
+        """True if the pool holds at least one bound connection"""
+        return self.pool is not None and self.pool.size > 0
+
+    def pool_stats(self) -> Optional[Dict[str, Any]]:
+        """Connection pool statistics (None if the pool is not initialized)"""
+        return self.pool.stats() if self.pool is not None else None
+
+    @staticmethod
+    def _paging_cookie(connection) -> Optional[bytes]:
+        """Cookie for the next page (None when done or the server ignored paging)"""
+        controls = connection.result.get('controls') if isinstance(connection.result, dict) else None
+        paging_control = None
+
+        if isinstance(controls, dict):
+            paging_control = controls.get('1.2.840.113556.1.4.319')
+
+        if paging_control and isinstance(paging_control, dict):
+            value_dict = paging_control.get('value')
+            if isinstance(value_dict, dict):
+                return value_dict.get('cookie') or None
+        return None
+
+    def _iter_range_chunks(self, connection, dn, attribute, start=0, timer=None):
+        """Yield the values of one multi-valued attribute chunk by chunk (AD ranged retrieval).
+
+        AD returns at most MaxValRange (1500) values per read, named e.g.
+        ``member;range=0-1499``; the final chunk ends in ``-*``.
+        """
+        while True:
+            check_cancelled()
+            connection.search(dn, '(objectClass=*)', search_scope=BASE, attributes=[f"{attribute};range={start}-*"])
+            result = connection.result if isinstance(connection.result, dict) else {}
+            if result.get('result', 0) != 0:
+                raise LDAPSearchError(f"Ranged read of {attribute} on {dn} failed: {result.get('description')}")
+            entries = decode_search_response(connection.response)
+            if not entries:
+                return
+            attrs = entries[0][1]
+            if timer is not None:
+                timer.add_page(sum(len(values) for values in attrs.values()))
+            chunk = None
+            for name, values in attrs.items():
+                parsed = parse_range_attribute(name)
+                if parsed and parsed[0].lower() == attribute.lower():
+                    chunk = (parsed[2], values)
+                    break
+            if chunk is None:
+                # Small enough to come back whole (or empty)
+                values = attrs.get(attribute) or []
+                if values and start == 0:
+                    yield values
+                return
+            high, values = chunk
+            if values:
+                yield values
+            if high is None:
+                return
+            start = high + 1
+
+    def _complete_ranges(self, connection, entries):
+        """Replace truncated ``attr;range=low-high`` values in entries with the full value lists"""
+        for dn, attrs in entries:
+            for name in [name for name in attrs if ';' in name]:
+                parsed = parse_range_attribute(name)
+                if parsed is None:
+                    continue
+                attribute, _, high = parsed
+                values = list(attrs.pop(name))
+                if high is not None:
+                    logger.debug(f"Fetching {attribute} values of {dn} beyond {high} with ranged retrieval")
+                    for chunk in self._iter_range_chunks(connection, dn, attribute, high + 1):
+                        values.extend(chunk)
+                attrs[attrs.key_for(attribute)] = values
+        return entries
+
+    def _iter_pages(self, connection, base_dn, filter_str, attributes=None, page_size=None, controls=None, strict=False,
+                    timer=None):
+        """Run a paged search on the given connection, yielding one decoded page at a time.
+
+        Multi-valued attributes AD truncated (``member;range=...``) are completed
+        before the page is yielded. With strict, a rejected page raises LDAPSearchError.
+        Pages and entries are counted on timer, if given.
+        """
         if attributes is None:
             attributes = ['*']
-        
-        all_results = []
-        page_size = 1000
+        page_size = page_size or settings.LDAP_SEARCH_PAGE_SIZE
         cookie = None
-        
+
         while True:
-            self.connection.search(
+            # Stop between pages if the awaiting request gave up
+            check_cancelled()
+
+            # Perform paged search
+            connection.search(
                 search_base=base_dn,
                 search_filter=filter_str,
                 search_scope=SUBTREE,
                 attributes=attributes,
                 paged_size=page_size,
-                paged_cookie=cookie
+                paged_cookie=cookie,
+                controls=controls
             )
-            
-            for entry in self.connection.entries:
-                entry_dict = {}
-                for attr in entry.entry_attributes:
-                    values = []
-                    for value in entry[attr].values:
-                        if isinstance(value, bytes):
-                            values.append(value.decode('utf-8'))
-                        else:
-                            values.append(str(value))
-                    entry_dict[attr] = values
-                all_results.append((str(entry.entry_dn), entry_dict))
-            
-            cookie = self.connection.result['controls']['1.2.840.113556.1.4.319']['value']['cookie']
-            
+
+            result = connection.result if isinstance(connection.result, dict) else {}
+            if strict and result.get('result', 0) != 0:
+                raise LDAPSearchError(f"Search {base_dn} failed: {result.get('description')} {result.get('message', '')}".strip())
+            page = decode_search_response(connection.response)
+            if timer is not None:
+                timer.add_page(len(page))
+            cookie = self._paging_cookie(connection)
+            # Ranged reads reuse the connection, so they run after the cookie is read
+            yield self._complete_ranges(connection, page)
+
+            # If no more pages, stop
             if not cookie:
                 break
-        
+
+    @contextmanager
+    def dedicated_connection(self, server_url: Optional[str] = None):
+        """Check out one pooled connection for a multi-step job (e.g. replica sync).
+
+        With server_url the connection comes from that domain controller,
+        otherwise from the usual routing. Yields the _PooledConnection so the
+        caller can see which DC (``pooled.pool.name``) it is talking to.
+        """
+        if not self._ensure_pool():
+            raise LDAPSearchError("Unable to bind to LDAP server")
+        pooled = self.pool.acquire_from(server_url) if server_url else self.pool.acquire()
+        discard = False
+        try:
+            yield pooled
+        except Exception as e:
+            discard = True
+            if self._is_connection_error(str(e)):
+                self.pool.report_failure(pooled, str(e))
+            raise
+        finally:
+            # Also runs when a generator holding the connection is closed early
+            self.pool.release(pooled, discard=discard)
+
+    def search_pages_on(self, connection, base_dn, filter_str, attributes=None, page_size=None, controls=None):
+        """Paged SUBTREE search on a connection from dedicated_connection(), one page at a time.
+
+        Raises LDAPSearchError if the server rejects a page instead of
+        silently ending the scan early.
+        """
+        timer = ldap_metrics.start_search(base_dn, filter_str)
+        timer.server = connection.server.name
+        completed = False
+        try:
+            yield from self._iter_pages(connection, base_dn, filter_str, attributes, page_size, controls, strict=True,
+                                        timer=timer)
+            completed = True
+        except GeneratorExit:
+            # Caller stopped early; not a failure
+            completed = True
+            raise
+        finally:
+            timer.finish(completed)
+
+    def _do_search(self, connection, base_dn, filter_str, attributes=None, timer=None):
+        """Run a paged search on the given connection and collect all pages"""
+        all_results = []
+        for page in self._iter_pages(connection, base_dn, filter_str, attributes, timer=timer):
+            if all_results:
+                logger.info(f"Fetched {len(all_results)} results so far, fetching next page...")
+            all_results.extend(page)
         return all_results
-    
+
+    def iter_search_pages(self, base_dn, filter_str, attributes=None, page_size=None):
+        """Paged SUBTREE search yielding one list of (dn, attributes) entries per page.
+
+        Only the current page is held in memory. One pooled connection is
+        checked out until the iterator is exhausted or closed. A connection
+        failure before the first page is retried once on another connection;
+        any other failure raises LDAPSearchError (details in last_error).
+        """
+        attempts = 0
+        timer = ldap_metrics.start_search(base_dn, filter_str)
+        completed = False
+
+        try:
+            while True:
+                attempts += 1
+
+                if not self._ensure_pool():
+                    self._local.last_error = "Unable to bind to LDAP server"
+                    raise LDAPSearchError(self._local.last_error)
+
+                try:
+                    pooled = self.pool.acquire()
+                except Exception as e:
+                    self._local.last_error = f"Unable to get LDAP connection: {e}"
+                    logger.error(f"Search {base_dn} failed: {self._local.last_error}")
+                    raise LDAPSearchError(self._local.last_error) from e
+
+                started = False
+                discard = False
+                timer.server = pooled.connection.server.name
+                timer.retries = attempts - 1
+                timer.reset()
+                try:
+                    for page in self._iter_pages(pooled.connection, base_dn, filter_str, attributes, page_size,
+                                                 timer=timer):
+                        started = True
+                        yield page
+                    self._local.last_error = None
+                    completed = True
+                    return
+                except OperationCancelled:
+                    raise
+                except Exception as e:
+                    last_error = str(e)
+                    discard = True
+                    self._local.last_error = last_error
+                    if self._is_connection_error(last_error):
+                        self.pool.report_failure(pooled, last_error)
+                    if not started and attempts < 2 and self._is_connection_error(last_error):
+                        logger.warning(f"Search {base_dn} lost its connection, retrying: {last_error}")
+                        continue
+                    logger.error(f"Search {base_dn} raised exception: {last_error}")
+                    raise LDAPSearchError(f"Search {base_dn} failed: {last_error}") from e
+                finally:
+                    self.pool.release(pooled, discard=discard)
+        except GeneratorExit:
+            # Consumer stopped early; not a failure
+            completed = True
+            raise
+        finally:
+            timer.finish(completed)
+
+    def iter_search(self, base_dn, filter_str, attributes=None, page_size=None):
+        """Paged SUBTREE search yielding one (dn, attributes) entry at a time"""
+        pages = self.iter_search_pages(base_dn, filter_str, attributes, page_size)
+        try:
+            for page in pages:
+                yield from page
+        finally:
+            pages.close()
+
     def search(self, base_dn, filter_str, attributes=None):
         """Search LDAP directory with unlimited size using paged search"""
-        if not self.connection or not self.connection.bound:
-            logger.warning("🔄 LDAP connection not bound, reconnecting...")
-            if not self.connect():
-                return None
-        
-        try:
-            if attributes is None:
-                attributes = ['*']
-            
+        if attributes is None:
+            attributes = ['*']
+
+        logger.info(f"Starting paged LDAP search (filter: {filter_str})")
+
+        results = []
+        timer = ldap_metrics.start_search(base_dn, filter_str)
+
+        def operation(connection):
             # Use paged search to bypass AD's default 1000 record limit
-            # This properly handles pagination by fetching all pages
-            all_results = []
-            page_size = 1000
-            cookie = None
-            
-            logger.info(f"Starting paged LDAP search (filter: {filter_str})")
-            
-            while True:
-                # Perform paged search
-                self.connection.search(
-                    search_base=base_dn,
-                    search_filter=filter_str,
-                    search_scope=SUBTREE,
-                    attributes=attributes,
-                    paged_size=page_size,
-                    paged_cookie=cookie
-                )
-                
-                # Process this page's results
-                for entry in self.connection.entries:
-                    entry_dict = {}
-                    for attr in entry.entry_attributes:
-                        values = []
-                        for value in entry[attr].values:
-                            if isinstance(value, bytes):
-                                values.append(value.decode('utf-8'))
-                            else:
-                                values.append(str(value))
-                        entry_dict[attr] = values
-                    all_results.append((str(entry.entry_dn), entry_dict))
-                
-                # Get the cookie for the next page (handle servers without paged controls)
-                controls = self.connection.result.get('controls') if isinstance(self.connection.result, dict) else None
-                paging_control = None
-                cookie = None
-
-                if isinstance(controls, dict):
-                    paging_control = controls.get('1.2.840.113556.1.4.319')
-
-                if paging_control and isinstance(paging_control, dict):
-                    value_dict = paging_control.get('value')
-                    if isinstance(value_dict, dict):
-                        cookie = value_dict.get('cookie')
-                
-                # If no more pages, break
-                if not cookie:
-                    break
-                
-                logger.info(f"Fetched {len(all_results)} results so far, fetching next page...")
-            
-            logger.info(f"LDAP paged search completed: {len(all_results)} total results")
-            
-            return all_results
+            results[:] = self._do_search(connection, base_dn, filter_str, attributes, timer)
+            return True
+
+        success, error_msg = self._execute_with_retry(f"Search {base_dn}", operation, timer=timer)
+        timer.finish(success)
+        if not success:
+            logger.error(f"LDAP search failed: {error_msg}")
+            return None
+
+        logger.info(f"LDAP paged search completed: {len(results)} total results")
+        return results
+
+    def search_sorted_page(self, base_dn, filter_str, attributes=None, sort_attribute="whenCreated",
+                           reverse=False, offset=0, count=50):
+        """One page of a server-side sorted SUBTREE search (sort + virtual list view controls).
+
+        Only ``count`` entries starting at 0-based ``offset`` cross the wire.
+        Returns (entries, total) where total is the server's content count
+        estimate, or None if the search failed or the server rejected the
+        controls (callers fall back to search()).
+        """
+        if attributes is None:
+            attributes = ['*']
+        if time.monotonic() < self._vlv_unsupported_until:
+            return None
+
+        page = []
+        outcome = {}
+        timer = ldap_metrics.start_search(base_dn, filter_str, operation="search_sorted")
+
+        def operation(connection):
+            connection.search(
+                search_base=base_dn,
+                search_filter=filter_str,
+                search_scope=SUBTREE,
+                attributes=attributes,
+                controls=[sort_control([(sort_attribute, reverse)]), vlv_control(offset + 1, count)]
+            )
+            result = connection.result if isinstance(connection.result, dict) else {}
+            # Rejections are answered with a result code, not a broken connection: no retry
+            outcome["code"] = result.get('result')
+            outcome["description"] = result.get('description')
+            outcome["sort"] = decode_sort_response(result)
+            outcome["vlv"] = decode_vlv_response(result)
+            if outcome["code"] == 0 and outcome["vlv"] is not None:
+                page[:] = self._complete_ranges(connection, decode_search_response(connection.response))
+                timer.add_page(len(page))
+            return True
+
+        success, error_msg = self._execute_with_retry(f"Sorted page search {base_dn}", operation, timer=timer)
+        timer.finish(success and outcome["code"] == 0 and outcome["vlv"] is not None and outcome["vlv"]["result"] == 0)
+        if not success:
+            logger.error(f"LDAP sorted page search failed: {error_msg}")
+            return None
+
+        vlv = outcome["vlv"]
+        sort_result = outcome["sort"]
+        if outcome["code"] == 12 or (outcome["code"] == 0 and vlv is None):
+            # unavailableCriticalExtension, or the controls were silently ignored
+            self._vlv_unsupported_until = time.monotonic() + VLV_RETRY_SECONDS
+            self._local.last_error = f"Server-side sort/VLV not supported: {outcome['description']}"
+            logger.warning(f"⚠️ Server-side sort/VLV not supported, using full searches for {VLV_RETRY_SECONDS}s")
+            return None
+        if outcome["code"] != 0 or vlv["result"] != 0 or (sort_result and sort_result[0] != 0):
+            # e.g. unwillingToPerform when the result set exceeds the DC's temp table size
+            self._local.last_error = (f"Sorted page rejected: {outcome['description']} "
+                                      f"(vlv={vlv and vlv['result']}, sort={sort_result and sort_result[0]})")
+            logger.info(f"{self._local.last_error}; falling back to a full search")
+            return None
+
+        total = vlv["content_count"]
+        if offset >= total:
+            # Past the end the server clamps to the last entry instead of returning nothing
+            page = []
+        return page, total
+
+    def resolve_dns(self, dns, attributes=None, object_filter=None, chunk_size=None):
+        """Fetch many entries by DN with chunked OR filters instead of one search per DN.
+
+        Returns ({requested_dn: (dn, attributes)}, [missing_dn, ...]). DNs in a
+        chunk whose search fails are reported as missing (see last_error).
+        """
+        chunk_size = chunk_size or settings.LDAP_RESOLVE_CHUNK_SIZE
+        results = []
+        for _, chunk_filter in chunk_dn_filters(dns, object_filter, chunk_size):
+            chunk_results = self.search(settings.LDAP_BASE_DN, chunk_filter, attributes)
+            if chunk_results:
+                results.extend(chunk_results)
+        return match_resolved_dns(dns, results)
+
+    def iter_attribute_values(self, dn, attribute):
+        """Stream all values of a multi-valued attribute (e.g. member of a large group) in chunks.
+
+        Raises LDAPSearchError on failure (details in last_error).
+        """
+        timer = ldap_metrics.start("search_ranged", dn, attribute, base_scope=True)
+        completed = False
+        try:
+            with self.dedicated_connection() as pooled:
+                timer.server = pooled.connection.server.name
+                yield from self._iter_range_chunks(pooled.connection, dn, attribute, timer=timer)
+            self._local.last_error = None
+            completed = True
+        except GeneratorExit:
+            completed = True
+            raise
+        except OperationCancelled:
+            raise
+        except LDAPSearchError as e:
+            self._local.last_error = str(e)
+            raise
         except Exception as e:
-            logger.error(f"LDAP search failed: {e}")
-            logger.error(f"Error details: {str(e)}")
-            
-            # Try to reconnect once if connection error
-            if "socket" in str(e).lower() or "connection" in str(e).lower():
-                logger.warning("🔄 Connection error detected, attempting to reconnect...")
-                self.disconnect()
-                if self.connect():
-                    logger.info("✅ Reconnected successfully, retrying search...")
-                    # Retry the search once
-                    try:
-                        return self._do_search(base_dn, filter_str, attributes)
-                    except:
-                        pass
-            
+            self._local.last_error = str(e)
+            logger.error(f"Ranged read of {attribute} on {dn} raised exception: {e}")
+            raise LDAPSearchError(self._local.last_error) from e
+        finally:
+            timer.finish(completed)
+
+    def count_attribute_values(self, dn, attribute):
+        """Number of values of a multi-valued attribute (None if the read failed)"""
+        try:
+            return sum(len(chunk) for chunk in self.iter_attribute_values(dn, attribute))
+        except LDAPSearchError:
+            return None
+
+    def cached_entry(self, dn, attributes=None, object_filter=None):
+        """Entry cache lookup only (no LDAP round trip); see read_entry for return values"""
+        return self.entry_cache.get(dn, attributes or ['*'], object_filter)
+
+    def read_entry(self, dn, attributes=None, object_filter=None, use_cache=True):
+        """Read a single object with a BASE-scope search (no paging controls).
+
+        Returns (dn, attributes), or None if the object does not exist, does not
+        match object_filter (e.g. "(objectClass=user)") or the read failed
+        (see last_error). Results are served from / stored in the entry cache.
+        """
+        if attributes is None:
+            attributes = ['*']
+        use_cache = use_cache and EntryCache.cacheable(object_filter)
+
+        if use_cache:
+            cached = self.entry_cache.get(dn, attributes, object_filter)
+            if cached is not None:
+                self._local.last_error = None
+                return cached or None
+
+        # objectClass is always fetched so the cached entry can answer object filters
+        fetch_attributes = list(attributes)
+        if use_cache and '*' not in fetch_attributes and not any(a.lower() == 'objectclass' for a in fetch_attributes):
+            fetch_attributes.append('objectClass')
+
+        found = []
+        timer = ldap_metrics.start_search(dn, object_filter or '(objectClass=*)', base_scope=True)
+
+        def operation(connection):
+            connection.search(
+                search_base=dn,
+                search_filter='(objectClass=*)' if use_cache else (object_filter or '(objectClass=*)'),
+                search_scope=BASE,
+                attributes=fetch_attributes
+            )
+            # noSuchObject (32) is a normal "not found"
+            if not isinstance(connection.result, dict) or connection.result.get('result') not in (0, 32):
+                return False
+            found[:] = self._complete_ranges(connection, decode_search_response(connection.response))
+            timer.add_page(len(found))
+            return True
+
+        success, error_msg = self._execute_with_retry(f"Read entry {dn}", operation, timer=timer)
+        timer.finish(success)
+        if not success:
+            logger.error(f"LDAP read failed: {error_msg}")
             return None
-    
+        if not found:
+            return None
+
+        if use_cache:
+            entry_dn, entry_attrs = found[0]
+            self.entry_cache.put(entry_dn, fetch_attributes, entry_attrs)
+            if entry_dn.lower() != dn.lower():
+                self.entry_cache.put(dn, fetch_attributes, entry_attrs)
+            return self.entry_cache.get(dn, attributes, object_filter, record_stats=False) or None
+        return found[0]
+
+    def invalidate_entry(self, dn, subtree=False):
+        """Forget cached reads of dn (call after changes made outside this connection)"""
+        self.entry_cache.invalidate(dn, subtree=subtree)
+
+    def add_write_listener(self, callback: Callable[[str], None]):
+        """Call callback(dn) after every successful add/modify/delete/rename"""
+        self._write_listeners.append(callback)
+
+    def _notify_write(self, dn):
+        for callback in self._write_listeners:
+            try:
+                callback(dn)
+            except Exception as e:
+                logger.warning(f"Write listener failed for {dn}: {e}")
+
     def add_entry(self, dn, attributes):
         """Add new LDAP entry"""
         # Convert attributes to ldap3 format
@@ -254,19 +1559,24 @@ class LDAPConnection:
             else:
                 ldap_attrs[key] = [values]
 
-        def operation():
-            return self.connection.add(dn, attributes=ldap_attrs)
+        def operation(connection):
+            return connection.add(dn, attributes=ldap_attrs)
 
-        success, error_msg = self._execute_with_retry(f"Add entry {dn}", operation)
+        object_classes = ldap_attrs.get('objectClass') or ldap_attrs.get('objectclass') or ['']
+        timer = ldap_metrics.start_write("add", dn, str(object_classes[-1]))
+        success, error_msg = self._execute_with_retry(f"Add entry {dn}", operation, write=True, timer=timer)
+        timer.finish(success)
+        self.entry_cache.invalidate(dn)
         if success:
+            self._notify_write(dn)
             logger.info(f"Successfully added entry: {dn}")
             return True
         else:
             logger.error(f"Failed to add entry {dn}: {error_msg}")
             return False
-    
-    def modify_entry(self, dn, modifications):
-        """Modify LDAP entry"""
+
+    def modify_entry(self, dn, modifications, controls=None):
+        """Modify LDAP entry (several modifications of one attribute are applied in order)"""
         # Convert modifications to ldap3 format: { attr: [(operation, [values...])] }
         changes = {}
         for mod_type, attr_name, values in modifications:
@@ -280,26 +1590,41 @@ class LDAPConnection:
             if not isinstance(values_list, list):
                 values_list = [values_list]
 
-            changes[attr_name] = [(mod_type, values_list)]
+            changes.setdefault(attr_name, []).append((mod_type, values_list))
 
-        def operation():
-            return self.connection.modify(dn, changes)
+        def operation(connection):
+            return connection.modify(dn, changes, controls=controls)
 
-        success, error_msg = self._execute_with_retry(f"Modify entry {dn}", operation)
+        timer = ldap_metrics.start_write("modify", dn, ",".join(sorted(name.lower() for name in changes)))
+        success, error_msg = self._execute_with_retry(f"Modify entry {dn}", operation, write=True, timer=timer)
+        timer.finish(success)
+        self.entry_cache.invalidate(dn)
+        # Membership changes also change the members' memberOf back-link
+        for attr_name, attr_changes in changes.items():
+            if attr_name.lower() == 'member':
+                for _, values_list in attr_changes:
+                    for member_dn in values_list:
+                        if isinstance(member_dn, str):
+                            self.entry_cache.invalidate(member_dn)
         if success:
+            self._notify_write(dn)
             logger.info(f"Successfully modified entry: {dn}")
             return True
         else:
             logger.error(f"Failed to modify entry {dn}: {error_msg}")
             return False
-    
+
     def delete_entry(self, dn):
         """Delete LDAP entry"""
-        def operation():
-            return self.connection.delete(dn)
+        def operation(connection):
+            return connection.delete(dn)
 
-        success, error_msg = self._execute_with_retry(f"Delete entry {dn}", operation)
+        timer = ldap_metrics.start_write("delete", dn)
+        success, error_msg = self._execute_with_retry(f"Delete entry {dn}", operation, write=True, timer=timer)
+        timer.finish(success)
+        self.entry_cache.invalidate(dn, subtree=True)
         if success:
+            self._notify_write(dn)
             logger.info(f"Successfully deleted entry: {dn}")
             return True
         else:
@@ -308,19 +1633,164 @@ class LDAPConnection:
 
     def rename_entry(self, dn, new_rdn, new_superior=None):
         """Rename or move LDAP entry"""
-        def operation():
-            return self.connection.modify_dn(dn, new_rdn, new_superior=new_superior)
+        def operation(connection):
+            return connection.modify_dn(dn, new_rdn, new_superior=new_superior)
 
-        success, error_msg = self._execute_with_retry(f"Rename entry {dn}", operation)
+        timer = ldap_metrics.start_write("modify_dn", dn, "move" if new_superior else "rename")
+        success, error_msg = self._execute_with_retry(f"Rename entry {dn}", operation, write=True, timer=timer)
+        timer.finish(success)
+        self.entry_cache.invalidate(dn, subtree=True)
         if success:
+            self._notify_write(dn)
             logger.info(f"Successfully renamed entry: {dn} -> {new_rdn}{',' + new_superior if new_superior else ''}")
             return True
         else:
             logger.error(f"Failed to rename entry {dn}: {error_msg}")
             return False
 
+
+class AsyncLDAPConnection:
+    """Awaitable facade over LDAPConnection for use in async route handlers.
+
+    Each call runs on the bounded LDAP executor so the event loop stays
+    responsive. Timeouts follow the LDAPConnection failure convention:
+    search returns None and writes return False, with last_error set.
+    A timed-out search stops at the next page; a write already sent to
+    the server cannot be recalled and may still complete.
+    """
+
+    def __init__(self, ldap: LDAPConnection):
+        self._ldap = ldap
+        self._last_error: ContextVar[Optional[str]] = ContextVar("async_ldap_last_error", default=None)
+
+    @property
+    def last_error(self) -> Optional[str]:
+        """Last LDAP error seen by an operation in the current request"""
+        return self._last_error.get()
+
+    async def _run(self, operation_name: str, method, *args, timeout: float, failure, **kwargs):
+        def call():
+            result = method(*args, **kwargs)
+            return result, self._ldap.last_error
+
+        try:
+            result, last_error = await run_blocking(ldap_executor, call, timeout=timeout)
+        except asyncio.TimeoutError:
+            last_error = f"{operation_name} timed out after {timeout}s"
+            logger.error(f"⏱️ {last_error}")
+            result = failure
+        self._last_error.set(last_error)
+        return result
+
+    async def search(self, base_dn, filter_str, attributes=None):
+        """Paged SUBTREE search (see LDAPConnection.search)"""
+        return await self._run(f"Search {base_dn}", self._ldap.search, base_dn, filter_str, attributes,
+                               timeout=settings.LDAP_SEARCH_TIMEOUT, failure=None)
+
+    async def iter_search_pages(self, base_dn, filter_str, attributes=None, page_size=None):
+        """Async paged search yielding one page at a time (see LDAPConnection.iter_search_pages).
+
+        Each page is fetched on the LDAP executor and is subject to
+        LDAP_SEARCH_TIMEOUT; failures and timeouts raise LDAPSearchError.
+        """
+        pages = self._ldap.iter_search_pages(base_dn, filter_str, attributes, page_size)
+
+        def next_page():
+            try:
+                return next(pages, None), None
+            except LDAPSearchError:
+                return None, self._ldap.last_error or "Unknown error"
+
+        try:
+            while True:
+                try:
+                    page, error = await run_blocking(ldap_executor, next_page, timeout=settings.LDAP_SEARCH_TIMEOUT)
+                except asyncio.TimeoutError:
+                    error = f"Search {base_dn} timed out after {settings.LDAP_SEARCH_TIMEOUT}s"
+                    logger.error(f"⏱️ {error}")
+                    page = None
+                if error:
+                    self._last_error.set(error)
+                    raise LDAPSearchError(error)
+                if page is None:
+                    break
+                yield page
+            self._last_error.set(None)
+        finally:
+            try:
+                await run_blocking(ldap_executor, pages.close)
+            except ValueError:
+                # Page still running after a timeout; it releases its connection once cancelled
+                pass
+
+    async def iter_search(self, base_dn, filter_str, attributes=None, page_size=None):
+        """Async paged search yielding one (dn, attributes) entry at a time"""
+        async for page in self.iter_search_pages(base_dn, filter_str, attributes, page_size):
+            for entry in page:
+                yield entry
+
+    async def read_entry(self, dn, attributes=None, object_filter=None, use_cache=True):
+        """BASE-scope single-object read (see LDAPConnection.read_entry)"""
+        if use_cache and EntryCache.cacheable(object_filter):
+            # Cache hits are answered on the event loop without an executor hop
+            cached = self._ldap.cached_entry(dn, attributes, object_filter)
+            if cached is not None:
+                self._last_error.set(None)
+                return cached or None
+        return await self._run(f"Read entry {dn}", self._ldap.read_entry, dn, attributes, object_filter, use_cache,
+                               timeout=settings.LDAP_SEARCH_TIMEOUT, failure=None)
+
+    def invalidate_entry(self, dn, subtree=False):
+        self._ldap.invalidate_entry(dn, subtree=subtree)
+
+    async def count_attribute_values(self, dn, attribute):
+        """Number of values of a multi-valued attribute (see LDAPConnection.count_attribute_values)"""
+        return await self._run(f"Count {attribute} of {dn}", self._ldap.count_attribute_values, dn, attribute,
+                               timeout=settings.LDAP_SEARCH_TIMEOUT, failure=None)
+
+    async def search_sorted_page(self, base_dn, filter_str, attributes=None, sort_attribute="whenCreated",
+                                 reverse=False, offset=0, count=50):
+        """One server-side sorted page (see LDAPConnection.search_sorted_page)"""
+        return await self._run(f"Sorted page search {base_dn}", self._ldap.search_sorted_page, base_dn, filter_str,
+                               attributes, sort_attribute, reverse, offset, count,
+                               timeout=settings.LDAP_SEARCH_TIMEOUT, failure=None)
+
+    async def resolve_dns(self, dns, attributes=None, object_filter=None, chunk_size=None):
+        """Fetch many entries by DN (see LDAPConnection.resolve_dns), searching chunks concurrently"""
+        dns = list(dns)
+        chunks = chunk_dn_filters(dns, object_filter, chunk_size or settings.LDAP_RESOLVE_CHUNK_SIZE)
+        if not chunks:
+            return {}, []
+        semaphore = asyncio.Semaphore(max(1, settings.LDAP_RESOLVE_CONCURRENCY))
+
+        async def fetch(chunk_filter):
+            async with semaphore:
+                return await self.search(settings.LDAP_BASE_DN, chunk_filter, attributes)
+
+        chunk_results = await asyncio.gather(*(fetch(chunk_filter) for _, chunk_filter in chunks))
+        results = [entry for entries in chunk_results if entries for entry in entries]
+        return match_resolved_dns(dns, results)
+
+    async def add_entry(self, dn, attributes):
+        return await self._run(f"Add entry {dn}", self._ldap.add_entry, dn, attributes,
+                               timeout=settings.LDAP_WRITE_TIMEOUT, failure=False)
+
+    async def modify_entry(self, dn, modifications, controls=None):
+        return await self._run(f"Modify entry {dn}", self._ldap.modify_entry, dn, modifications, controls,
+                               timeout=settings.LDAP_WRITE_TIMEOUT, failure=False)
+
+    async def delete_entry(self, dn):
+        return await self._run(f"Delete entry {dn}", self._ldap.delete_entry, dn,
+                               timeout=settings.LDAP_WRITE_TIMEOUT, failure=False)
+
+    async def rename_entry(self, dn, new_rdn, new_superior=None):
+        return await self._run(f"Rename entry {dn}", self._ldap.rename_entry, dn, new_rdn,
+                               new_superior=new_superior, timeout=settings.LDAP_WRITE_TIMEOUT, failure=False)
+
+
 # Global LDAP connection instance
 ldap_conn = LDAPConnection()
+async_ldap_conn = AsyncLDAPConnection(ldap_conn)
 
 def init_ldap_connection():
     """Initialize LDAP connection"""
@@ -329,3 +1799,7 @@ def init_ldap_connection():
 def get_ldap_connection():
     """Get LDAP connection instance"""
     return ldap_conn
+
+def get_async_ldap_connection():
+    """Get awaitable LDAP connection facade (for async route handlers)"""
+    return async_ldap_conn
@@ -0,0 +1,841 @@
+"""
+Directory Replica
+In-process copy of AD users, groups and OUs, kept current by polling uSNChanged
+
+List and report endpoints read through the replica instead of re-scanning
+the directory on every request. When the replica is not ready (first sync
+still running, DC unreachable for too long) or cannot answer a query, the
+same call goes to LDAP as before.
+"""
+import json
+import logging
+import os
+import secrets
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Response
+from ldap3 import BASE
+
+from app.core.config import settings
+from app.core.database import (
+    LDAPAttributes,
+    LDAPSearchError,
+    async_ldap_conn,
+    decode_search_response,
+    ldap_conn,
+)
+from app.core.executors import ldap_executor, run_blocking
+from app.core.ldap_metrics import ldap_request_source
+
+logger = logging.getLogger(__name__)
+
+REPLICA_FORMAT_VERSION = 1
+SHOW_DELETED_OID = "1.2.840.113556.1.4.417"
+MATCHING_RULE_BIT_AND = "1.2.840.113556.1.4.803"
+MATCHING_RULE_BIT_OR = "1.2.840.113556.1.4.804"
+
+USER_ATTRIBUTES = [
+    "objectClass", "objectCategory", "cn", "sAMAccountName", "mail", "displayName", "title",
+    "department", "company", "physicalDeliveryOfficeName", "description", "userAccountControl",
+    "pwdLastSet", "givenName", "sn", "telephoneNumber", "mobile", "employeeID", "streetAddress",
+    "l", "st", "postalCode", "co", "whenCreated", "whenChanged", "lastLogon", "lastLogonTimestamp",
+    "memberOf", "logonCount", "userPrincipalName", "manager", "accountExpires", "extensionName",
+]
+GROUP_ATTRIBUTES = [
+    "objectClass", "cn", "sAMAccountName", "description", "member", "groupType", "managedBy",
+    "mail", "whenCreated", "whenChanged",
+]
+OU_ATTRIBUTES = [
+    "objectClass", "ou", "name", "description", "whenCreated", "whenChanged",
+]
+
+# kind -> (objectClass value that selects it in a query, sync filter, replicated attributes)
+REPLICA_KINDS: Dict[str, Tuple[str, str, List[str]]] = {
+    "users": ("user", "(objectClass=user)", USER_ATTRIBUTES),
+    "groups": ("group", "(objectClass=group)", GROUP_ATTRIBUTES),
+    "ous": ("organizationalunit", "(objectClass=organizationalUnit)", OU_ATTRIBUTES),
+}
+# Identity and change tracking; fetched on every sync but not served
+TRACKING_ATTRIBUTES = ["objectGUID", "uSNChanged"]
+
+
+class FilterNotSupported(ValueError):
+    """Filter syntax the replica cannot evaluate; the caller falls back to LDAP"""
+
+
+# Filter evaluation (the subset of RFC 4515 the routers build)
+
+def _unescape(value: str) -> str:
+    """Decode RFC 4515 \\XX escapes (UTF-8 byte sequences)"""
+    if "\\" not in value:
+        return value
+    raw = bytearray()
+    index = 0
+    while index < len(value):
+        char = value[index]
+        if char == "\\":
+            try:
+                raw.append(int(value[index + 1:index + 3], 16))
+            except ValueError:
+                raise FilterNotSupported(f"Bad escape in filter value: {value}")
+            index += 3
+        else:
+            raw.extend(char.encode("utf-8"))
+            index += 1
+    return raw.decode("utf-8", errors="replace")
+
+
+def _parse_item(item: str):
+    index = item.find("=")
+    if index <= 0:
+        raise FilterNotSupported(f"Bad filter item: ({item})")
+    attr, value = item[:index], item[index + 1:]
+    op = "="
+    if attr[-1] in "<>~":
+        op, attr = attr[-1], attr[:-1]
+
+    if ":" in attr:
+        # Extensible match; only AD's bitwise rules (e.g. userAccountControl:1.2.840.113556.1.4.803:=2)
+        name, _, rule = attr.partition(":")
+        rule = rule.rstrip(":")
+        try:
+            number = int(_unescape(value))
+        except ValueError:
+            raise FilterNotSupported(f"Bad bitwise filter value: ({item})")
+        if rule == MATCHING_RULE_BIT_AND:
+            return ("bit_and", name.lower(), number)
+        if rule == MATCHING_RULE_BIT_OR:
+            return ("bit_or", name.lower(), number)
+        raise FilterNotSupported(f"Unsupported matching rule: {rule}")
+
+    attr = attr.lower()
+    if op == ">":
+        return ("ge", attr, _unescape(value))
+    if op == "<":
+        return ("le", attr, _unescape(value))
+    if value == "*":
+        return ("present", attr)
+    if "*" in value:
+        parts = [_unescape(part).casefold() for part in value.split("*")]
+        return ("substring", attr, parts[0], parts[1:-1], parts[-1])
+    # Approximate match (~=) is treated as equality, like AD does
+    return ("eq", attr, _unescape(value).casefold())
+
+
+def _parse_node(text: str, pos: int):
+    if pos >= len(text) or text[pos] != "(":
+        raise FilterNotSupported(f"Expected '(' at position {pos}")
+    pos += 1
+    op = text[pos:pos + 1]
+    if op in ("&", "|"):
+        pos += 1
+        children = []
+        while pos < len(text) and text[pos] == "(":
+            child, pos = _parse_node(text, pos)
+            children.append(child)
+        node = ("and" if op == "&" else "or", children)
+    elif op == "!":
+        child, pos = _parse_node(text, pos + 1)
+        node = ("not", child)
+    else:
+        # Literal parentheses in values are escaped (\28 / \29), so the next ')' ends the item
+        end = text.find(")", pos)
+        if end < 0:
+            raise FilterNotSupported("Unbalanced parentheses")
+        node = _parse_item(text[pos:end])
+        pos = end
+    if pos >= len(text) or text[pos] != ")":
+        raise FilterNotSupported(f"Expected ')' at position {pos}")
+    return node, pos + 1
+
+
+def parse_filter(filter_str: str):
+    """Parse an LDAP filter string into nested tuples for match_filter()"""
+    text = filter_str.strip()
+    if not text.startswith("("):
+        text = f"({text})"
+    node, pos = _parse_node(text, 0)
+    if pos != len(text):
+        raise FilterNotSupported("Trailing characters after filter")
+    return node
+
+
+def filter_attributes(node) -> set:
+    """Lowercase attribute names a parsed filter reads"""
+    op = node[0]
+    if op in ("and", "or"):
+        return set().union(*(filter_attributes(child) for child in node[1])) if node[1] else set()
+    if op == "not":
+        return filter_attributes(node[1])
+    return {node[1]}
+
+
+def _values(dn: str, attrs: LDAPAttributes, name: str) -> list:
+    if name == "distinguishedname":
+        return [dn]
+    return attrs.get(name) or []
+
+
+def _as_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def match_filter(node, dn: str, attrs: LDAPAttributes) -> bool:
+    """Evaluate a parsed filter against one entry (string matching is case-insensitive)"""
+    op = node[0]
+    if op == "and":
+        return all(match_filter(child, dn, attrs) for child in node[1])
+    if op == "or":
+        return any(match_filter(child, dn, attrs) for child in node[1])
+    if op == "not":
+        return not match_filter(node[1], dn, attrs)
+
+    values = _values(dn, attrs, node[1])
+    if op == "present":
+        return bool(values)
+    if op == "eq":
+        expected = node[2]
+        for value in values:
+            folded = str(value).casefold()
+            if folded == expected:
+                return True
+            # objectCategory=person matches CN=Person,CN=Schema,... (AD expands the short form)
+            if node[1] == "objectcategory" and "=" not in expected:
+                if folded.split(",", 1)[0].split("=", 1)[-1] == expected:
+                    return True
+        return False
+    if op == "substring":
+        _, _, initial, middle, final = node
+        for value in values:
+            folded = str(value).casefold()
+            if not folded.startswith(initial) or not folded.endswith(final):
+                continue
+            pos = len(initial)
+            end = len(folded) - len(final)
+            for part in middle:
+                found = folded.find(part, pos, end)
+                if found < 0:
+                    break
+                pos = found + len(part)
+            else:
+                if pos <= end:
+                    return True
+        return False
+    if op in ("ge", "le"):
+        bound = node[2]
+        bound_int = _as_int(bound)
+        for value in values:
+            value_int = _as_int(value)
+            if bound_int is not None and value_int is not None:
+                left, right = value_int, bound_int
+            else:
+                left, right = str(value).casefold(), bound.casefold()
+            if (left >= right) if op == "ge" else (left <= right):
+                return True
+        return False
+    if op in ("bit_and", "bit_or"):
+        mask = node[2]
+        for value in values:
+            number = _as_int(value)
+            if number is None:
+                continue
+            if (number & mask == mask) if op == "bit_and" else (number & mask):
+                return True
+        return False
+    raise FilterNotSupported(f"Unknown filter node: {op}")
+
+
+def _query_kind(node) -> Optional[str]:
+    """Replica kind a query is limited to by a top-level (objectClass=...) clause"""
+    clauses = node[1] if node[0] == "and" else [node]
+    classes = {clause[2] for clause in clauses if clause[0] == "eq" and clause[1] == "objectclass"}
+    for kind, (object_class, _, _) in REPLICA_KINDS.items():
+        if object_class in classes:
+            return kind
+    return None
+
+
+def _under_base(dn: str, base_dn: str) -> bool:
+    dn, base_dn = dn.lower(), base_dn.lower()
+    return not base_dn or dn == base_dn or dn.endswith("," + base_dn)
+
+
+class _ResyncRequired(Exception):
+    """Incremental poll is not possible (DC changed or was restored)"""
+
+
+class DirectoryReplica:
+    """In-process copy of users, groups and OUs under LDAP_BASE_DN.
+
+    A full sync records the DC's highestCommittedUSN; each poll then fetches
+    only objects whose uSNChanged is above that mark, plus tombstones (Show
+    Deleted control) for deletions. USNs are local to one DC, so polls stick
+    to the DC that took the full sync; a different DC or a new invocationId
+    (DC restored from backup) forces a full resync.
+
+    Entries are keyed by objectGUID so renames and moves update in place.
+    The store is persisted to REPLICA_PATH so a restart resumes with a poll
+    instead of a full sync.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        poll_interval: float = 30.0,
+        max_staleness: float = 300.0,
+        persist_interval: float = 300.0,
+        full_resync_interval: float = 21600.0
+    ):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_staleness = max_staleness
+        self.persist_interval = persist_interval
+        self.full_resync_interval = full_resync_interval
+
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict[str, Tuple[str, LDAPAttributes]]] = {kind: {} for kind in REPLICA_KINDS}
+        self._dn_index: Dict[str, Tuple[str, str]] = {}  # lowercase DN -> (kind, guid)
+        self._server_url: Optional[str] = None
+        self._invocation_id: Optional[str] = None
+        self._naming_context: Optional[str] = None
+        self._highest_usn = 0
+        self._synced_at: Optional[float] = None  # wall clock of the last successful poll
+        self._full_synced_at: Optional[float] = None
+        self._dirty = False
+        self._persisted_at = 0.0
+        self._tombstones_readable = True
+        self._generation = 0  # Bumped whenever the replicated data changes
+        self._instance = secrets.token_hex(4)  # Tells this process's generations apart from other workers'
+        self.last_error: Optional[str] = None
+        self._stats = {
+            "full_syncs": 0,
+            "polls": 0,
+            "changes": 0,
+            "deletes": 0,
+            "errors": 0,
+            "served": 0,
+            "fallbacks": 0,
+        }
+
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listening = False
+
+    # Lifecycle
+
+    def start(self):
+        """Load the persisted replica (if any) and start the background poller"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.load()
+        if not self._listening:
+            ldap_conn.add_write_listener(self._on_write)
+            self._listening = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll_loop, name="directory-replica", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling and persist unsaved changes"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        if self._dirty:
+            self.persist()
+
+    def _poll_loop(self):
+        ldap_request_source.set("directory-replica")
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                with self._lock:
+                    self._stats["errors"] += 1
+                logger.error(f"❌ Directory replica sync failed: {e}")
+            if self._dirty and time.time() - self._persisted_at >= self.persist_interval:
+                self.persist()
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _on_write(self, dn: str):
+        """Poll right away after this app writes to the directory"""
+        if _under_base(dn, settings.LDAP_BASE_DN):
+            self.request_sync()
+
+    def request_sync(self):
+        """Wake the poller now instead of at the next poll interval"""
+        if self._thread is not None:
+            self._wake.set()
+
+    def member_counts(self) -> Optional[Dict[str, int]]:
+        """{lowercase group DN: member count} without touching LDAP; None while not ready"""
+        if not self.ready:
+            return None
+        with self._lock:
+            return {dn.lower(): len(attrs.get("member") or []) for dn, attrs in self._entries["groups"].values()}
+
+    def locate(self, guid: str) -> Optional[Tuple[str, str]]:
+        """(kind, dn) of the replicated object with this objectGUID (hex), if any"""
+        with self._lock:
+            for kind, entries in self._entries.items():
+                entry = entries.get(guid)
+                if entry is not None:
+                    return kind, entry[0]
+        return None
+
+    # Status
+
+    @property
+    def age_seconds(self) -> Optional[float]:
+        """Seconds since the replica last caught up with the directory"""
+        return None if self._synced_at is None else max(time.time() - self._synced_at, 0.0)
+
+    @property
+    def generation(self) -> int:
+        """Changes whenever replicated data changes (sync, poll with changes, load)"""
+        return self._generation
+
+    @property
+    def version(self) -> Optional[str]:
+        """Token that changes whenever replicated data changes; None while reads fall back to LDAP.
+
+        Process-local: polls apply changes beyond the USN they record, so two
+        workers at the same USN may still differ.
+        """
+        if not self.ready:
+            return None
+        return f"{self._instance}:{self._generation}"
+
+    @property
+    def ready(self) -> bool:
+        age = self.age_seconds
+        return age is not None and age <= self.max_staleness
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {kind: len(entries) for kind, entries in self._entries.items()}
+            stats = dict(self._stats)
+        age = self.age_seconds
+        return {
+            "ready": self.ready,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "server": self._server_url,
+            "highest_usn": self._highest_usn,
+            "entries": counts,
+            "tombstones_readable": self._tombstones_readable,
+            "last_error": self.last_error,
+            **stats,
+        }
+
+    # Sync
+
+    def sync_once(self):
+        """Poll for changes, or take a full sync when a poll is not possible"""
+        full_due = (
+            self._full_synced_at is None
+            or self._server_url is None
+            or time.time() - self._full_synced_at >= self.full_resync_interval
+        )
+        if not full_due:
+            try:
+                self.poll()
+                return
+            except _ResyncRequired as e:
+                logger.warning(f"🔁 Directory replica needs a full resync: {e}")
+        self.full_sync()
+
+    def _read_server_state(self, connection) -> Dict[str, Any]:
+        """highestCommittedUSN, invocationId and naming context of the connected DC"""
+        if not connection.search("", "(objectClass=*)", search_scope=BASE,
+                                 attributes=["highestCommittedUSN", "dsServiceName", "defaultNamingContext"]):
+            raise LDAPSearchError(f"rootDSE read failed: {connection.last_error}")
+        _, root = decode_search_response(connection.response)[0]
+        service_dn = (root.get("dsServiceName") or [None])[0]
+        invocation_id = None
+        if service_dn and connection.search(service_dn, "(objectClass=*)", search_scope=BASE, attributes=["invocationId"]):
+            entries = decode_search_response(connection.response)
+            value = (entries[0][1].get("invocationId") or [None])[0] if entries else None
+            invocation_id = value.hex() if isinstance(value, bytes) else value
+        return {
+            "highest_usn": int((root.get("highestCommittedUSN") or ["0"])[0]),
+            "invocation_id": invocation_id,
+            "naming_context": (root.get("defaultNamingContext") or [settings.LDAP_BASE_DN])[0],
+        }
+
+    @staticmethod
+    def _guid(attrs: LDAPAttributes) -> Optional[str]:
+        value = (attrs.get("objectGUID") or [None])[0]
+        if isinstance(value, bytes):
+            return value.hex()
+        return value or None
+
+    @staticmethod
+    def _stored(attrs: LDAPAttributes) -> LDAPAttributes:
+        """Drop tracking and binary values; everything kept is JSON-serializable"""
+        return LDAPAttributes({
+            name: values for name, values in attrs.items()
+            if name.lower() not in ("objectguid", "usnchanged")
+            and not any(isinstance(value, bytes) for value in values)
+        })
+
+    def full_sync(self):
+        """Copy every replicated object under LDAP_BASE_DN and record the DC's USN"""
+        started = time.monotonic()
+        with ldap_conn.dedicated_connection() as pooled:
+            connection = pooled.connection
+            state = self._read_server_state(connection)
+            entries = {kind: {} for kind in REPLICA_KINDS}
+            for kind, (_, sync_filter, attributes) in REPLICA_KINDS.items():
+                for page in ldap_conn.search_pages_on(connection, settings.LDAP_BASE_DN, sync_filter,
+                                                      attributes + TRACKING_ATTRIBUTES):
+                    for dn, attrs in page:
+                        guid = self._guid(attrs)
+                        if guid:
+                            entries[kind][guid] = (dn, self._stored(attrs))
+            server_url = pooled.pool.name
+
+        with self._lock:
+            self._entries = entries
+            self._dn_index = {
+                dn.lower(): (kind, guid)
+                for kind, kind_entries in entries.items()
+                for guid, (dn, _) in kind_entries.items()
+            }
+            self._server_url = server_url
+            self._invocation_id = state["invocation_id"]
+            self._naming_context = state["naming_context"]
+            self._highest_usn = state["highest_usn"]
+            self._synced_at = self._full_synced_at = time.time()
+            self._tombstones_readable = True
+            self._dirty = True
+            self._generation += 1
+            self._stats["full_syncs"] += 1
+        counts = ", ".join(f"{len(e)} {kind}" for kind, e in entries.items())
+        logger.info(f"✅ Directory replica full sync from {server_url}: {counts} "
+                    f"(USN {state['highest_usn']}, {time.monotonic() - started:.1f}s)")
+
+    def poll(self):
+        """Apply objects changed or deleted since the last recorded USN"""
+        with ExitStack() as stack:
+            try:
+                pooled = stack.enter_context(ldap_conn.dedicated_connection(self._server_url))
+            except LDAPSearchError:
+                raise
+            except Exception as e:
+                raise _ResyncRequired(f"{self._server_url} unavailable ({e})")
+
+            connection = pooled.connection
+            state = self._read_server_state(connection)
+            if state["invocation_id"] != self._invocation_id:
+                raise _ResyncRequired(f"invocationId of {self._server_url} changed")
+            if state["highest_usn"] < self._highest_usn:
+                raise _ResyncRequired(f"USN on {self._server_url} went backwards")
+
+            changed = []
+            deleted = []
+            if state["highest_usn"] > self._highest_usn:
+                low = self._highest_usn + 1
+                # Search the whole naming context so objects moved out of LDAP_BASE_DN are seen too
+                for kind, (_, sync_filter, attributes) in REPLICA_KINDS.items():
+                    for page in ldap_conn.search_pages_on(connection, self._naming_context,
+                                                          f"(&{sync_filter}(uSNChanged>={low}))",
+                                                          attributes + TRACKING_ATTRIBUTES):
+                        changed.extend((kind, dn, attrs) for dn, attrs in page)
+                if self._tombstones_readable:
+                    deleted = self._read_tombstones(connection, low)
+
+        with self._lock:
+            for kind, dn, attrs in changed:
+                guid = self._guid(attrs)
+                if not guid:
+                    continue
+                if _under_base(dn, settings.LDAP_BASE_DN):
+                    self._upsert(kind, guid, dn, self._stored(attrs))
+                else:
+                    self._remove(guid)
+            for guid in deleted:
+                self._remove(guid)
+            self._highest_usn = state["highest_usn"]
+            self._synced_at = time.time()
+            self._stats["polls"] += 1
+            self._stats["changes"] += len(changed)
+            self._stats["deletes"] += len(deleted)
+            if changed or deleted:
+                self._dirty = True
+                self._generation += 1
+        if changed or deleted:
+            logger.info(f"🔄 Directory replica applied {len(changed)} changes, {len(deleted)} deletions "
+                        f"(USN {state['highest_usn']})")
+
+    def _read_tombstones(self, connection, low: int) -> List[str]:
+        """GUIDs of objects deleted since low; disabled if the bind account cannot read tombstones"""
+        try:
+            guids = []
+            for page in ldap_conn.search_pages_on(connection, self._naming_context,
+                                                  f"(&(isDeleted=TRUE)(uSNChanged>={low}))", ["objectGUID"],
+                                                  controls=[(SHOW_DELETED_OID, True, None)]):
+                guids.extend(guid for guid in (self._guid(attrs) for _, attrs in page) if guid)
+            return guids
+        except LDAPSearchError as e:
+            self._tombstones_readable = False
+            logger.warning(f"⚠️ Cannot read deleted objects ({e}); deletions are picked up by the periodic full resync")
+            return []
+
+    # Store maintenance (caller holds the lock)
+
+    def _upsert(self, kind: str, guid: str, dn: str, attrs: LDAPAttributes):
+        entries = self._entries[kind]
+        old = entries.get(guid)
+        old_dn = old[0] if old else None
+        if old_dn and old_dn.lower() != dn.lower():
+            self._dn_index.pop(old_dn.lower(), None)
+            self._relink(kind, old, dn)
+        if kind == "groups":
+            # memberOf is a back-link: adding a member changes the group's USN, not the user's
+            old_members = {m.lower() for m in (old[1].get("member") or [])} if old else set()
+            new_members = {m.lower(): m for m in (attrs.get("member") or [])}
+            for member in old_members - set(new_members):
+                self._edit_link("users", member, "memberOf", dn, add=False)
+            for member in set(new_members) - old_members:
+                self._edit_link("users", new_members[member], "memberOf", dn, add=True)
+        entries[guid] = (dn, attrs)
+        self._dn_index[dn.lower()] = (kind, guid)
+
+    def _remove(self, guid: str):
+        for kind, entries in self._entries.items():
+            old = entries.pop(guid, None)
+            if old is None:
+                continue
+            dn, attrs = old
+            self._dn_index.pop(dn.lower(), None)
+            if kind == "groups":
+                for member in attrs.get("member") or []:
+                    self._edit_link("users", member, "memberOf", dn, add=False)
+            elif kind == "users":
+                for group in attrs.get("memberOf") or []:
+                    self._edit_link("groups", group, "member", dn, add=False)
+            return
+
+    def _relink(self, kind: str, old: Tuple[str, LDAPAttributes], new_dn: str):
+        """After a rename/move, rewrite the DN in linked entries (their USNs do not change)"""
+        old_dn, attrs = old
+        if kind == "users":
+            for group in attrs.get("memberOf") or []:
+                self._edit_link("groups", group, "member", old_dn, add=False)
+                self._edit_link("groups", group, "member", new_dn, add=True)
+        elif kind == "groups":
+            for member in attrs.get("member") or []:
+                self._edit_link("users", member, "memberOf", old_dn, add=False)
+                self._edit_link("users", member, "memberOf", new_dn, add=True)
+
+    def _edit_link(self, kind: str, target_dn: str, attribute: str, value: str, add: bool):
+        located = self._dn_index.get(target_dn.lower())
+        if located is None or located[0] != kind:
+            return
+        target = self._entries[kind].get(located[1])
+        if target is None:
+            return
+        attrs = target[1]
+        values = [v for v in (attrs.get(attribute) or []) if v.lower() != value.lower()]
+        if add:
+            values.append(value)
+        attrs[attribute] = values
+
+    # Persistence
+
+    def _fingerprint(self) -> Dict[str, Any]:
+        return {
+            "version": REPLICA_FORMAT_VERSION,
+            "base_dn": settings.LDAP_BASE_DN,
+            "attributes": {kind: attributes for kind, (_, _, attributes) in REPLICA_KINDS.items()},
+        }
+
+    def persist(self):
+        """Write the replica to REPLICA_PATH (atomically, via a temp file)"""
+        with self._lock:
+            if self._synced_at is None:
+                return
+            data = dict(
+                self._fingerprint(),
+                server_url=self._server_url,
+                invocation_id=self._invocation_id,
+                naming_context=self._naming_context,
+                highest_usn=self._highest_usn,
+                synced_at=self._synced_at,
+                full_synced_at=self._full_synced_at,
+                entries={
+                    kind: {guid: [dn, dict(attrs)] for guid, (dn, attrs) in entries.items()}
+                    for kind, entries in self._entries.items()
+                },
+            )
+            self._dirty = False
+        temp_path = None
+        try:
+            # A temp file of its own, so workers saving at the same time never write into each other's file
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=os.path.dirname(os.path.abspath(self.path)),
+                prefix=os.path.basename(self.path) + ".", suffix=".tmp", delete=False
+            ) as f:
+                temp_path = f.name
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+            self._persisted_at = time.time()
+            logger.info(f"💾 Directory replica saved to {self.path}")
+        except OSError as e:
+            self._dirty = True
+            logger.error(f"❌ Failed to save directory replica: {e}")
+            if temp_path and os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def load(self) -> bool:
+        """Load a persisted replica; ignored if missing or written for other settings"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable directory replica {self.path}: {e}")
+            return False
+        if any(data.get(key) != value for key, value in self._fingerprint().items()):
+            logger.info("Persisted directory replica was written for other settings; starting with a full sync")
+            return False
+
+        entries = {
+            kind: {guid: (dn, LDAPAttributes(attrs)) for guid, (dn, attrs) in data["entries"].get(kind, {}).items()}
+            for kind in REPLICA_KINDS
+        }
+        with self._lock:
+            self._entries = entries
+            self._dn_index = {
+                dn.lower(): (kind, guid)
+                for kind, kind_entries in entries.items()
+                for guid, (dn, _) in kind_entries.items()
+            }
+            self._server_url = data["server_url"]
+            self._invocation_id = data["invocation_id"]
+            self._naming_context = data["naming_context"]
+            self._highest_usn = data["highest_usn"]
+            self._synced_at = data["synced_at"]
+            self._full_synced_at = data["full_synced_at"]
+            self._persisted_at = time.time()
+            self._generation += 1
+        logger.info(f"📂 Loaded directory replica from {self.path} "
+                    f"({sum(len(e) for e in entries.values())} entries, USN {self._highest_usn})")
+        return True
+
+    # Reads
+
+    def query(self, base_dn: str, filter_str: str, attributes=None) -> Optional[List[Tuple[str, LDAPAttributes]]]:
+        """Answer a SUBTREE search from the replica.
+
+        Returns None when the replica cannot answer it: not ready, filter
+        syntax not supported, no (objectClass=user|group|organizationalUnit)
+        clause, or an attribute that is not replicated.
+        """
+        if not self.ready:
+            return None
+        try:
+            node = parse_filter(filter_str)
+        except FilterNotSupported:
+            return None
+        kind = _query_kind(node)
+        if kind is None:
+            return None
+        replicated = {name.lower() for name in REPLICA_KINDS[kind][2]} | {"distinguishedname"}
+        requested = attributes or ["*"]
+        if any(name.lower() not in replicated for name in requested) or not filter_attributes(node) <= replicated:
+            return None
+
+        with self._lock:
+            snapshot = list(self._entries[kind].values())
+        results = []
+        for dn, attrs in snapshot:
+            if not _under_base(dn, base_dn) or not match_filter(node, dn, attrs):
+                continue
+            selected = LDAPAttributes()
+            for name in requested:
+                if name.lower() == "distinguishedname":
+                    selected[name] = [dn]
+                else:
+                    selected[attrs.key_for(name)] = list(attrs.get(name) or [])
+            results.append((dn, selected))
+        return results
+
+    async def _query(self, base_dn, filter_str, attributes):
+        results = None
+        if self.ready:
+            results = await run_blocking(ldap_executor, self.query, base_dn, filter_str, attributes)
+        with self._lock:
+            self._stats["served" if results is not None else "fallbacks"] += 1
+        return results
+
+    async def search(self, base_dn, filter_str, attributes=None):
+        """Same contract as AsyncLDAPConnection.search, answered from the replica when possible"""
+        results = await self._query(base_dn, filter_str, attributes)
+        if results is not None:
+            return results
+        return await async_ldap_conn.search(base_dn, filter_str, attributes)
+
+    async def iter_search_pages(self, base_dn, filter_str, attributes=None, page_size=None):
+        """Same contract as AsyncLDAPConnection.iter_search_pages, answered from the replica when possible"""
+        results = await self._query(base_dn, filter_str, attributes)
+        if results is None:
+            async for page in async_ldap_conn.iter_search_pages(base_dn, filter_str, attributes, page_size):
+                yield page
+            return
+        page_size = page_size or settings.LDAP_SEARCH_PAGE_SIZE
+        for start in range(0, len(results), page_size):
+            yield results[start:start + page_size]
+
+    async def iter_search(self, base_dn, filter_str, attributes=None, page_size=None):
+        """Same contract as AsyncLDAPConnection.iter_search, answered from the replica when possible"""
+        async for page in self.iter_search_pages(base_dn, filter_str, attributes, page_size):
+            for entry in page:
+                yield entry
+
+    def set_freshness_headers(self, response: Response):
+        """X-Data-Source plus, when the replica is in use, how far behind it is"""
+        age = self.age_seconds
+        if self.ready:
+            response.headers["X-Data-Source"] = "replica"
+            response.headers["X-Replica-Age"] = f"{age:.1f}"
+            response.headers["X-Replica-Synced-At"] = datetime.fromtimestamp(self._synced_at, timezone.utc).isoformat()
+        else:
+            response.headers["X-Data-Source"] = "ldap"
+
+
+# Global replica instance
+directory_replica = DirectoryReplica(
+    settings.REPLICA_PATH,
+    poll_interval=settings.REPLICA_POLL_INTERVAL,
+    max_staleness=settings.REPLICA_MAX_STALENESS,
+    persist_interval=settings.REPLICA_PERSIST_INTERVAL,
+    full_resync_interval=settings.REPLICA_FULL_RESYNC_INTERVAL
+)
+
+
+def get_directory_replica():
+    """Get directory replica (reads fall back to LDAP while it is not ready)"""
+    return directory_replica
+
+
+async def replica_freshness(response: Response):
+    """Dependency for endpoints that read through the replica: sets the freshness headers"""
+    directory_replica.set_freshness_headers(response)
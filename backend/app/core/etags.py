@@ -0,0 +1,83 @@
+"""
+ETags
+Strong validators and If-None-Match handling for directory list responses
+
+A validator is computed once, when a result is stored (cached_response),
+when the user dataset is loaded, or from the replica's USN, never per
+request. A request whose If-None-Match matches is answered with
+304 Not Modified before any body is built or serialized.
+"""
+import hashlib
+import json
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.schemas.common import CursorPaginatedResponse
+
+# Authenticated data: browsers may keep it but must revalidate before reuse
+CACHE_CONTROL = "private, no-cache"
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _etag(data: bytes) -> str:
+    return '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+
+def content_etag(value: Any) -> str:
+    """Strong ETag over the JSON content of value (CPU-bound for large lists; run it off the event loop)
+
+    A cursor page gets a weak ETag over its items: its snapshot id and
+    next_cursor differ on every walk, so the same page must still validate.
+    """
+    if isinstance(value, CursorPaginatedResponse):
+        return "W/" + _etag(value.model_dump_json(exclude={"snapshot", "next_cursor"}).encode())
+    if isinstance(value, BaseModel):
+        data = value.model_dump_json().encode()
+    else:
+        data = json.dumps(value, default=_json_default, separators=(",", ":")).encode()
+    return _etag(data)
+
+
+def derived_etag(*parts: Any, weak: bool = False) -> str:
+    """ETag for a response determined by parts (e.g. a data version and the query parameters).
+
+    weak: responses with the same parts are equivalent but not byte-identical (e.g. carry a timestamp).
+    """
+    etag = _etag(json.dumps(parts, default=_json_default, sort_keys=True).encode())
+    return "W/" + etag if weak else etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for this header)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def check_not_modified(request: Optional[Request], etag: Optional[str]) -> Optional[Response]:
+    """Record etag for the response headers; a 304 response if the client already has it"""
+    if request is None or not etag or not settings.ETAGS_ENABLED:
+        return None
+    request.state.etag = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
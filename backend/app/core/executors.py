@@ -0,0 +1,120 @@
+"""
+Bounded executors for blocking directory (LDAP) and storage (SQLite) calls
+
+Route handlers are ``async def`` and share one event loop per worker, so a
+blocking call made directly from a handler stalls every other request.
+These helpers run such calls on bounded thread pools with per-call timeouts.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Separate pools so slow directory scans cannot starve activity/API-key logging
+ldap_executor = ThreadPoolExecutor(
+    max_workers=settings.LDAP_EXECUTOR_WORKERS,
+    thread_name_prefix="ldap-io"
+)
+storage_executor = ThreadPoolExecutor(
+    max_workers=settings.STORAGE_EXECUTOR_WORKERS,
+    thread_name_prefix="storage-io"
+)
+# Login binds get their own threads so a login storm does not queue behind searches (and vice versa)
+auth_executor = ThreadPoolExecutor(
+    max_workers=settings.AUTH_BIND_POOL_SIZE,
+    thread_name_prefix="ldap-auth"
+)
+
+# Set inside the worker thread's context; signalled when the awaiting caller gives up
+_cancel_event: ContextVar[Optional[threading.Event]] = ContextVar("blocking_call_cancel_event", default=None)
+
+
+class OperationCancelled(Exception):
+    """Raised inside a worker when the awaiting caller timed out or was cancelled"""
+
+
+def is_cancelled() -> bool:
+    """True if the caller awaiting the current blocking call has given up"""
+    event = _cancel_event.get()
+    return event is not None and event.is_set()
+
+
+def check_cancelled():
+    """Raise OperationCancelled if the awaiting caller has given up.
+
+    Long-running blocking code (e.g. paged searches) calls this between
+    steps so abandoned work stops instead of running to completion.
+    """
+    if is_cancelled():
+        raise OperationCancelled("Operation cancelled by caller")
+
+
+async def run_blocking(
+    executor: ThreadPoolExecutor,
+    func: Callable[..., Any],
+    *args,
+    timeout: Optional[float] = None,
+    **kwargs
+) -> Any:
+    """Run func(*args, **kwargs) on executor and await the result.
+
+    Raises asyncio.TimeoutError if the call takes longer than timeout seconds.
+    On timeout or cancellation the worker is signalled via check_cancelled().
+    """
+    loop = asyncio.get_running_loop()
+    cancel_event = threading.Event()
+    context = contextvars.copy_context()
+    context.run(_cancel_event.set, cancel_event)
+
+    future = loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs))
+    try:
+        if timeout is None:
+            return await future
+        return await asyncio.wait_for(future, timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        cancel_event.set()
+        raise
+
+
+class AsyncStorageFacade:
+    """Awaitable proxy for a blocking storage manager.
+
+    Every method of the wrapped manager becomes a coroutine that runs on the
+    storage executor:
+
+        await async_activity_log_manager.log_activity(...)
+    """
+
+    def __init__(self, target: Any, timeout: Optional[float] = None):
+        self._target = target
+        self._timeout = settings.STORAGE_TIMEOUT if timeout is None else timeout
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            try:
+                return await run_blocking(storage_executor, attr, *args, timeout=self._timeout, **kwargs)
+            except asyncio.TimeoutError:
+                logger.error(f"⏱️ Storage call {type(self._target).__name__}.{name} timed out after {self._timeout}s")
+                raise
+
+        return call
+
+
+def shutdown_executors():
+    """Stop accepting work and let in-flight calls finish"""
+    ldap_executor.shutdown(wait=False, cancel_futures=True)
+    storage_executor.shutdown(wait=False, cancel_futures=True)
+    auth_executor.shutdown(wait=False, cancel_futures=True)
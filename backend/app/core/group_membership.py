@@ -0,0 +1,149 @@
+"""
+Bulk Group Membership
+Applies many member adds/removes with as few modify operations as possible:
+one modify per group (per chunk of members), groups in parallel, and a result
+for every (group, member) pair
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ldap3 import MODIFY_ADD, MODIFY_DELETE
+
+from app.core.config import settings
+from app.core.ldap_controls import permissive_modify_control
+
+logger = logging.getLogger(__name__)
+
+ADD = "add"
+REMOVE = "remove"
+
+# Single-member failures that mean the membership is already as requested (servers without permissive modify)
+ALREADY_APPLIED_ERRORS = {
+    ADD: ("attributeorvalueexists", "entryalreadyexists"),
+    REMOVE: ("nosuchattribute",),
+}
+# Failures caused by the group or the connection; splitting the batch would not isolate anything
+GROUP_LEVEL_ERRORS = ("insufficientaccessrights", "nosuchobject", "timed out", "unable to")
+
+
+def membership_result(group_dn: str, member_dn: str, action: str, error: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "group_dn": group_dn,
+        "member_dn": member_dn,
+        "action": action,
+        "success": error is None,
+        "error": error,
+    }
+
+
+def plan_membership_changes(changes: Iterable[Tuple[str, str, str]]) -> Tuple["OrderedDict[str, Dict[str, Any]]", List[Dict[str, Any]]]:
+    """Collapse (action, group_dn, member_dn) triples into one add list and one remove list per group.
+
+    DNs are compared case-insensitively and duplicates are dropped. A member
+    both added to and removed from the same group is reported as a conflict
+    instead of being applied. Returns (plan, conflict results).
+    """
+    plan: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    for action, group_dn, member_dn in changes:
+        group = plan.setdefault(group_dn.lower(), {"dn": group_dn, ADD: OrderedDict(), REMOVE: OrderedDict()})
+        group[action].setdefault(member_dn.lower(), member_dn)
+
+    conflicts = []
+    for group in plan.values():
+        for key in [key for key in group[ADD] if key in group[REMOVE]]:
+            member_dn = group[ADD].pop(key)
+            group[REMOVE].pop(key)
+            for action in (ADD, REMOVE):
+                conflicts.append(membership_result(group["dn"], member_dn, action, "Member is both added and removed"))
+    return plan, conflicts
+
+
+class BulkMembershipJob:
+    """Applies a membership plan through an AsyncLDAPConnection.
+
+    Each group gets one modify carrying all its adds and removes (split
+    into chunks of ``chunk_size`` values), sent with AD's permissive modify
+    control so members already in the requested state do not fail the
+    batch. If a batch fails anyway, it is split in halves until the
+    offending members are isolated.
+    """
+
+    def __init__(self, ldap, chunk_size: Optional[int] = None, concurrency: Optional[int] = None):
+        self.ldap = ldap
+        self.chunk_size = max(1, chunk_size or settings.GROUP_BULK_CHUNK_SIZE)
+        self.concurrency = max(1, concurrency or settings.GROUP_BULK_CONCURRENCY)
+        self.modify_operations = 0
+
+    async def run(self, changes: Iterable[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+        """Apply (action, group_dn, member_dn) triples and return one result per distinct pair"""
+        plan, results = plan_membership_changes(changes)
+        if not plan:
+            return results
+
+        # Unknown groups and members fail up front instead of failing (and splitting) batches
+        group_dns = [group["dn"] for group in plan.values()]
+        member_dns = list(OrderedDict(
+            (key, dn) for group in plan.values() for action in (ADD, REMOVE) for key, dn in group[action].items()
+        ).values())
+        found_groups, missing_groups = await self.ldap.resolve_dns(group_dns, ["cn"], object_filter="(objectClass=group)")
+        _, missing_members = await self.ldap.resolve_dns(member_dns, ["objectClass"])
+        missing_groups = {dn.lower() for dn in missing_groups}
+        missing_members = {dn.lower() for dn in missing_members}
+
+        batches = []
+        for key, group in plan.items():
+            pending = []
+            for action in (ADD, REMOVE):
+                for member_key, member_dn in group[action].items():
+                    if key in missing_groups:
+                        results.append(membership_result(group["dn"], member_dn, action, "Group not found"))
+                    elif member_key in missing_members:
+                        results.append(membership_result(group["dn"], member_dn, action, "Member not found"))
+                    else:
+                        pending.append((action, member_dn))
+            if pending:
+                # Modify the group under the DN AD returned (the request may differ in case/spacing)
+                group_dn = found_groups.get(group["dn"], (group["dn"],))[0]
+                batches.append((group_dn, pending))
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def apply_group(group_dn, pending):
+            async with semaphore:
+                group_results = []
+                for start in range(0, len(pending), self.chunk_size):
+                    group_results.extend(await self._apply_batch(group_dn, pending[start:start + self.chunk_size]))
+                return group_results
+
+        for group_results in await asyncio.gather(*(apply_group(group_dn, pending) for group_dn, pending in batches)):
+            results.extend(group_results)
+        return results
+
+    async def _apply_batch(self, group_dn: str, batch: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        adds = [member_dn for action, member_dn in batch if action == ADD]
+        removes = [member_dn for action, member_dn in batch if action == REMOVE]
+        modifications = []
+        if adds:
+            modifications.append((MODIFY_ADD, "member", adds))
+        if removes:
+            modifications.append((MODIFY_DELETE, "member", removes))
+
+        self.modify_operations += 1
+        if await self.ldap.modify_entry(group_dn, modifications, controls=[permissive_modify_control()]):
+            return [membership_result(group_dn, member_dn, action) for action, member_dn in batch]
+
+        error = self.ldap.last_error or "Unknown error"
+        lowered = error.replace(" ", "").lower()
+        if len(batch) == 1:
+            action, member_dn = batch[0]
+            if any(marker in lowered for marker in ALREADY_APPLIED_ERRORS[action]):
+                return [membership_result(group_dn, member_dn, action)]
+            return [membership_result(group_dn, member_dn, action, error)]
+        if any(marker.replace(" ", "") in lowered for marker in GROUP_LEVEL_ERRORS):
+            return [membership_result(group_dn, member_dn, action, error) for action, member_dn in batch]
+
+        logger.warning(f"⚠️ Membership batch of {len(batch)} on {group_dn} failed ({error}), splitting")
+        middle = len(batch) // 2
+        return await self._apply_batch(group_dn, batch[:middle]) + await self._apply_batch(group_dn, batch[middle:])
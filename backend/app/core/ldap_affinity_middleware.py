@@ -0,0 +1,53 @@
+"""
+LDAP Affinity Middleware
+Sets the per-session key used to pin reads to the domain controller that took the session's last write,
+and the route label LDAP metrics are attributed to
+"""
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+import hashlib
+import logging
+import re
+from typing import Callable
+
+from app.core.database import ldap_affinity_key
+from app.core.ldap_metrics import ldap_request_source
+
+logger = logging.getLogger(__name__)
+
+_NUMERIC_SEGMENT = re.compile(r"^\d+$")
+
+
+def route_label(method: str, path: str) -> str:
+    """Method plus path with DN and numeric segments replaced, e.g. GET /api/groups/{dn}/members"""
+    segments = []
+    for segment in path.split("/"):
+        if "=" in segment or "%3d" in segment.lower():
+            segment = "{dn}"
+        elif _NUMERIC_SEGMENT.match(segment):
+            segment = "{id}"
+        segments.append(segment)
+    return f"{method} {'/'.join(segments)}"
+
+
+class LDAPAffinityMiddleware(BaseHTTPMiddleware):
+    """Middleware to scope DC read-your-writes pinning to the caller's session"""
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        # Session = bearer token (JWT or API key); fall back to client IP
+        auth_header = request.headers.get("Authorization", "")
+        if auth_header.startswith("Bearer "):
+            digest = hashlib.sha256(auth_header[7:].encode("utf-8")).hexdigest()[:16]
+            key = f"token:{digest}"
+        elif request.client:
+            key = f"ip:{request.client.host}"
+        else:
+            key = None
+
+        token = ldap_affinity_key.set(key)
+        source_token = ldap_request_source.set(route_label(request.method, request.url.path))
+        try:
+            return await call_next(request)
+        finally:
+            ldap_request_source.reset(source_token)
+            ldap_affinity_key.reset(token)
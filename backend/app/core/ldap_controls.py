@@ -0,0 +1,140 @@
+"""
+LDAP Controls
+BER encoding/decoding for the server-side sort (RFC 2891) and virtual list view
+(draft-ietf-ldapext-ldapv3-vlv) controls, which ldap3 does not ship helpers for,
+plus AD's permissive modify control
+"""
+from typing import Iterable, Optional, Tuple
+
+from ldap3.protocol.controls import build_control
+from pyasn1.codec.ber import decoder
+from pyasn1.type import namedtype, tag, univ
+
+SORT_REQUEST_OID = "1.2.840.113556.1.4.473"
+SORT_RESPONSE_OID = "1.2.840.113556.1.4.474"
+VLV_REQUEST_OID = "2.16.840.1.113730.3.4.9"
+VLV_RESPONSE_OID = "2.16.840.1.113730.3.4.10"
+PERMISSIVE_MODIFY_OID = "1.2.840.113556.1.4.1413"
+
+
+def _context(number: int, constructed: bool = False) -> tag.Tag:
+    return tag.Tag(tag.tagClassContext, tag.tagFormatConstructed if constructed else tag.tagFormatSimple, number)
+
+
+class SortKey(univ.Sequence):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType("attributeType", univ.OctetString()),
+        namedtype.OptionalNamedType("orderingRule", univ.OctetString().subtype(implicitTag=_context(0))),
+        namedtype.DefaultedNamedType("reverseOrder", univ.Boolean(False).subtype(implicitTag=_context(1))),
+    )
+
+
+class SortKeyList(univ.SequenceOf):
+    componentType = SortKey()
+
+
+class SortResult(univ.Sequence):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType("sortResult", univ.Enumerated()),
+        namedtype.OptionalNamedType("attributeType", univ.OctetString().subtype(implicitTag=_context(0))),
+    )
+
+
+class ByOffset(univ.Sequence):
+    tagSet = univ.Sequence.tagSet.tagImplicitly(_context(0, constructed=True))
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType("offset", univ.Integer()),
+        namedtype.NamedType("contentCount", univ.Integer()),
+    )
+
+
+class VLVTarget(univ.Choice):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType("byOffset", ByOffset()),
+        namedtype.NamedType("greaterThanOrEqual", univ.OctetString().subtype(implicitTag=_context(1))),
+    )
+
+
+class VirtualListViewRequest(univ.Sequence):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType("beforeCount", univ.Integer()),
+        namedtype.NamedType("afterCount", univ.Integer()),
+        namedtype.NamedType("target", VLVTarget()),
+        namedtype.OptionalNamedType("contextID", univ.OctetString()),
+    )
+
+
+class VirtualListViewResponse(univ.Sequence):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType("targetPosition", univ.Integer()),
+        namedtype.NamedType("contentCount", univ.Integer()),
+        namedtype.NamedType("virtualListViewResult", univ.Enumerated()),
+        namedtype.OptionalNamedType("contextID", univ.OctetString()),
+    )
+
+
+def sort_control(keys: Iterable[Tuple[str, bool]], criticality: bool = True):
+    """Server-side sort request; keys are (attribute, reverse) pairs in priority order"""
+    key_list = SortKeyList()
+    for index, (attribute, reverse) in enumerate(keys):
+        key = SortKey()
+        key["attributeType"] = attribute
+        if reverse:
+            key["reverseOrder"] = True
+        key_list.setComponentByPosition(index, key)
+    return build_control(SORT_REQUEST_OID, criticality, key_list)
+
+
+def vlv_control(offset: int, count: int, content_count: int = 0, context_id: Optional[bytes] = None, criticality: bool = True):
+    """Virtual list view request for ``count`` entries starting at 1-based position ``offset``.
+
+    content_count 0 tells the server to treat offset as an absolute position.
+    """
+    target = VLVTarget()
+    by_offset = target.getComponentByName("byOffset")
+    by_offset["offset"] = offset
+    by_offset["contentCount"] = content_count
+    request = VirtualListViewRequest()
+    request["beforeCount"] = 0
+    request["afterCount"] = max(count - 1, 0)
+    request["target"] = target
+    if context_id:
+        request["contextID"] = context_id
+    return build_control(VLV_REQUEST_OID, criticality, request)
+
+
+def permissive_modify_control(criticality: bool = False):
+    """AD: adding a value that exists or deleting one that does not succeeds instead of failing the modify"""
+    return build_control(PERMISSIVE_MODIFY_OID, criticality, None)
+
+
+def _response_control_value(result, oid: str) -> Optional[bytes]:
+    controls = result.get("controls") if isinstance(result, dict) else None
+    control = controls.get(oid) if isinstance(controls, dict) else None
+    value = control.get("value") if isinstance(control, dict) else None
+    return bytes(value) if value else None
+
+
+def decode_sort_response(result) -> Optional[Tuple[int, Optional[str]]]:
+    """(sortResult code, offending attribute) from a search result, None if the control is absent"""
+    value = _response_control_value(result, SORT_RESPONSE_OID)
+    if value is None:
+        return None
+    decoded, _ = decoder.decode(value, asn1Spec=SortResult())
+    attribute = decoded["attributeType"]
+    return int(decoded["sortResult"]), str(attribute) if attribute.isValue else None
+
+
+def decode_vlv_response(result) -> Optional[dict]:
+    """Target position, content count, result code and context ID from a search result, None if absent"""
+    value = _response_control_value(result, VLV_RESPONSE_OID)
+    if value is None:
+        return None
+    decoded, _ = decoder.decode(value, asn1Spec=VirtualListViewResponse())
+    context_id = decoded["contextID"]
+    return {
+        "target_position": int(decoded["targetPosition"]),
+        "content_count": int(decoded["contentCount"]),
+        "result": int(decoded["virtualListViewResult"]),
+        "context_id": bytes(context_id) if context_id.isValue else None,
+    }
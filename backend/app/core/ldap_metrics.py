@@ -0,0 +1,303 @@
+"""
+LDAP Metrics
+In-process latency / result-size histograms for every LDAP operation issued by
+app.core.database, labeled so DC load can be traced back to the routes driving it
+"""
+import re
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+# Route (or background job) that issued the current LDAP operations; set per request by middleware
+ldap_request_source: ContextVar[str] = ContextVar("ldap_request_source", default="background")
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+SIZE_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+PAGE_BUCKETS = (1, 2, 5, 10, 50, 100)
+
+OVERFLOW_LABEL = "other"
+LABEL_NAMES = ("operation", "base", "shape", "source", "server")
+
+# (attr=value) / (attr>=value) / (attr<=value) / (attr~=value) / (attr:rule:=value)
+_FILTER_ITEM = re.compile(r"\(([^()=<>~!&|]+?)(=|>=|<=|~=)([^()]*)\)")
+_REPEATED_ITEM = re.compile(r"(\([^()]+\))(?:\1)+")
+_UNESCAPED_COMMA = re.compile(r"(?<!\\),")
+# Values kept verbatim: they define what kind of object is searched for
+_LITERAL_ATTRIBUTES = frozenset(("objectclass", "objectcategory"))
+
+
+@lru_cache(maxsize=2048)
+def normalize_filter(filter_str: Optional[str]) -> str:
+    """Filter with assertion values masked, e.g. (&(objectClass=user)(cn=*jo*)) -> (&(objectClass=user)(cn=*?*)).
+
+    Wildcard positions and presence tests are kept, and runs of identical
+    items (chunked DN lookups) collapse to one item followed by ``+``.
+    """
+    if not filter_str:
+        return ""
+
+    def mask(match):
+        attribute, operator, value = match.groups()
+        if attribute.split(":")[0].strip().lower() in _LITERAL_ATTRIBUTES or value == "*":
+            return match.group(0)
+        masked = "*".join("?" if part else "" for part in value.split("*"))
+        return f"({attribute}{operator}{masked})"
+
+    shape = _FILTER_ITEM.sub(mask, filter_str.strip())
+    return _REPEATED_ITEM.sub(r"\1+", shape)
+
+
+def classify_base(base_dn: Optional[str], base_scope: bool = False) -> str:
+    """Coarse class of a search base / target DN (the DN itself would be unbounded)"""
+    if base_dn is None or base_dn.strip() == "":
+        return "rootdse"
+    lowered = base_dn.replace(" ", "").lower()
+    if "cn=schema,cn=configuration" in lowered:
+        return "schema"
+    if "cn=configuration" in lowered:
+        return "configuration"
+    if lowered == settings.LDAP_BASE_DN.replace(" ", "").lower():
+        return "domain"
+    if base_scope:
+        return "entry"
+    if lowered.startswith("ou="):
+        return "ou"
+    if lowered.startswith("cn="):
+        return "container"
+    return "other"
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative counts are computed on export)"""
+
+    __slots__ = ("bounds", "counts", "count", "total", "minimum", "maximum")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+
+    def observe(self, value: float):
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of observations (max for +Inf)"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return min(self.bounds[i], self.maximum) if i < len(self.bounds) else self.maximum
+        return self.maximum
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        buckets = []
+        running = 0
+        for bound, bucket_count in zip(list(self.bounds) + ["+Inf"], self.counts):
+            running += bucket_count
+            buckets.append((str(bound), running))
+        return buckets
+
+    def summary(self, digits: Optional[int] = None) -> Dict[str, Any]:
+        def rounded(value):
+            return value if value is None or digits is None else round(value, digits)
+        return {
+            "count": self.count,
+            "sum": rounded(self.total),
+            "min": rounded(self.minimum),
+            "max": rounded(self.maximum),
+            "p50": rounded(self.percentile(0.5)),
+            "p95": rounded(self.percentile(0.95)),
+            "p99": rounded(self.percentile(0.99)),
+            "buckets": dict(self.cumulative()),
+        }
+
+
+class _Series:
+    __slots__ = ("latency_ms", "entries", "pages", "errors", "retries")
+
+    def __init__(self):
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.entries = Histogram(SIZE_BUCKETS)
+        self.pages = Histogram(PAGE_BUCKETS)
+        self.errors = 0
+        self.retries = 0
+
+
+class OperationTimer:
+    """One in-flight LDAP operation; the code running it fills in pages/entries/retries/server"""
+
+    __slots__ = ("operation", "base", "shape", "source", "server", "started", "pages", "entries", "retries", "finished")
+
+    def __init__(self, operation: str, base: str, shape: str, source: str):
+        self.operation = operation
+        self.base = base
+        self.shape = shape
+        self.source = source
+        self.server: Optional[str] = None
+        self.started = time.perf_counter()
+        self.pages = 0
+        self.entries = 0
+        self.retries = 0
+        self.finished = False
+
+    def add_page(self, entries: int):
+        self.pages += 1
+        self.entries += entries
+
+    def reset(self):
+        """Forget progress of a failed attempt before retrying"""
+        self.pages = 0
+        self.entries = 0
+
+    def finish(self, success: bool = True):
+        if self.finished:
+            return
+        self.finished = True
+        ldap_metrics.record(self, (time.perf_counter() - self.started) * 1000, success)
+
+
+class LDAPMetrics:
+    """Registry of per-label-set LDAP operation histograms.
+
+    Labels: operation, base (classify_base), shape (normalize_filter for
+    searches, attribute names for modifies), source (route or background
+    job) and server (DC URL). Once max_series label sets exist, new ones
+    are folded into an "other" series so memory stays bounded.
+    """
+
+    def __init__(self, max_series: int = 500):
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], _Series] = {}
+        self._started_at = time.time()
+
+    def start(self, operation: str, base_dn: Optional[str] = None, shape: Optional[str] = None,
+              base_scope: bool = False, source: Optional[str] = None) -> OperationTimer:
+        return OperationTimer(operation, classify_base(base_dn, base_scope), shape or "",
+                              source or ldap_request_source.get())
+
+    def start_search(self, base_dn: Optional[str], filter_str: Optional[str], base_scope: bool = False,
+                     operation: str = "search", source: Optional[str] = None) -> OperationTimer:
+        return self.start(operation, base_dn, normalize_filter(filter_str), base_scope, source)
+
+    def start_write(self, operation: str, dn: str, shape: Optional[str] = None) -> OperationTimer:
+        """Writes are classed by the container the object lives in"""
+        parent = _UNESCAPED_COMMA.split(dn, 1)[1] if _UNESCAPED_COMMA.search(dn) else dn
+        return self.start(operation, parent, shape)
+
+    def record(self, timer: OperationTimer, duration_ms: float, success: bool):
+        if not settings.LDAP_METRICS_ENABLED:
+            return
+        key = (timer.operation, timer.base, timer.shape, timer.source, timer.server or "")
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                if len(self._series) >= self.max_series:
+                    key = (timer.operation, OVERFLOW_LABEL, OVERFLOW_LABEL, OVERFLOW_LABEL, OVERFLOW_LABEL)
+                    series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = _Series()
+            series.latency_ms.observe(duration_ms)
+            series.entries.observe(timer.entries)
+            series.pages.observe(timer.pages)
+            series.retries += timer.retries
+            if not success:
+                series.errors += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._started_at = time.time()
+
+    def snapshot(self, operation: Optional[str] = None, source: Optional[str] = None) -> Dict[str, Any]:
+        """JSON-friendly view, busiest series (by total time) first"""
+        with self._lock:
+            items = [
+                (key, series.latency_ms.summary(digits=3), series.entries.summary(), series.pages.summary(),
+                 series.errors, series.retries)
+                for key, series in self._series.items()
+                if (operation is None or key[0] == operation) and (source is None or key[3] == source)
+            ]
+            started_at = self._started_at
+        items.sort(key=lambda item: item[1]["sum"] or 0, reverse=True)
+        return {
+            "enabled": settings.LDAP_METRICS_ENABLED,
+            "since": started_at,
+            "series_count": len(items),
+            "max_series": self.max_series,
+            "series": [
+                {
+                    **dict(zip(LABEL_NAMES, key)),
+                    "count": latency["count"],
+                    "errors": errors,
+                    "retries": retries,
+                    "latency_ms": latency,
+                    "entries": entries,
+                    "pages": pages,
+                }
+                for key, latency, entries, pages, errors, retries in items
+            ],
+        }
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        def labels(key, extra: str = "") -> str:
+            pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(LABEL_NAMES, key)]
+            if extra:
+                pairs.append(extra)
+            return "{" + ",".join(pairs) + "}"
+
+        with self._lock:
+            series = [(key, s.latency_ms.cumulative(), s.latency_ms.total, s.latency_ms.count,
+                       s.entries.total, s.pages.total, s.errors, s.retries)
+                      for key, s in sorted(self._series.items())]
+
+        lines = [
+            "# HELP ldap_operation_duration_seconds LDAP operation latency",
+            "# TYPE ldap_operation_duration_seconds histogram",
+        ]
+        for key, buckets, total_ms, count, *_ in series:
+            for bound, cumulative in buckets:
+                le = bound if bound == "+Inf" else repr(float(bound) / 1000)
+                bucket_labels = labels(key, 'le="' + le + '"')
+                lines.append(f"ldap_operation_duration_seconds_bucket{bucket_labels} {cumulative}")
+            lines.append(f"ldap_operation_duration_seconds_sum{labels(key)} {total_ms / 1000:.6f}")
+            lines.append(f"ldap_operation_duration_seconds_count{labels(key)} {count}")
+        for name, index, help_text in (
+            ("ldap_operation_entries_total", 4, "Entries returned by LDAP searches"),
+            ("ldap_operation_pages_total", 5, "Result pages fetched by LDAP searches"),
+            ("ldap_operation_errors_total", 6, "Failed LDAP operations"),
+            ("ldap_operation_retries_total", 7, "LDAP operations retried on another connection"),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for row in series:
+                lines.append(f"{name}{labels(row[0])} {int(row[index])}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Global registry
+ldap_metrics = LDAPMetrics(max_series=settings.LDAP_METRICS_MAX_SERIES)
@@ -0,0 +1,171 @@
+"""
+Cursor Pagination
+Keyset pagination over list endpoints with opaque, signed cursor tokens
+
+A walk starts with an empty ``cursor``. The first page takes a snapshot of
+the sorted result list; each following page is sliced from that snapshot by
+the sort key of the last item returned, so pages neither re-scan nor
+re-sort the directory and stay consistent while it changes. If the
+snapshot has expired (or the request landed on another worker) the result
+is rebuilt from live data and the walk continues after the same key, so
+nothing is repeated or skipped.
+"""
+import base64
+import hashlib
+import hmac
+import inspect
+import json
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.core.config import settings
+from app.core.exceptions import ValidationError
+from app.schemas.common import CursorPaginatedResponse
+
+logger = logging.getLogger(__name__)
+
+CURSOR_VERSION = 1
+START_CURSORS = ("", "first")
+
+
+class ResultSnapshots:
+    """Sorted result lists (with their sort keys) kept for in-progress cursor walks"""
+
+    def __init__(self, max_entries: int = 200, ttl: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._snapshots: "OrderedDict[str, Tuple[List[Any], List[tuple], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "hits": 0, "expired": 0, "evictions": 0}
+
+    def put(self, items: List[Any], keys: List[tuple]) -> str:
+        snapshot_id = secrets.token_urlsafe(8)
+        with self._lock:
+            self._snapshots[snapshot_id] = (items, keys, time.monotonic() + self.ttl)
+            self._stats["created"] += 1
+            while len(self._snapshots) > self.max_entries:
+                self._snapshots.popitem(last=False)
+                self._stats["evictions"] += 1
+        return snapshot_id
+
+    def get(self, snapshot_id: str) -> Optional[Tuple[List[Any], List[tuple]]]:
+        with self._lock:
+            snapshot = self._snapshots.get(snapshot_id)
+            if snapshot is None:
+                return None
+            if snapshot[2] <= time.monotonic():
+                del self._snapshots[snapshot_id]
+                self._stats["expired"] += 1
+                return None
+            self._snapshots.move_to_end(snapshot_id)
+            self._stats["hits"] += 1
+            return snapshot[0], snapshot[1]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"snapshots": len(self._snapshots), "max_snapshots": self.max_entries,
+                    "ttl_seconds": self.ttl, **self._stats}
+
+
+def _signature(payload: bytes) -> str:
+    return hmac.new(settings.JWT_SECRET_KEY.encode(), payload, hashlib.sha256).hexdigest()[:24]
+
+
+def encode_cursor(data: Dict[str, Any]) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode()).rstrip(b"=")
+    return f"{payload.decode()}.{_signature(payload)}"
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Cursor contents; raises ValidationError for a malformed or tampered cursor"""
+    try:
+        payload, signature = cursor.rsplit(".", 1)
+        if not hmac.compare_digest(signature, _signature(payload.encode())):
+            raise ValueError("bad signature")
+        data = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        if data.get("v") != CURSOR_VERSION:
+            raise ValueError("unsupported version")
+        if not isinstance(data.get("k"), list):
+            raise ValueError("missing sort key")
+        return data
+    except ValueError as e:
+        raise ValidationError("Invalid pagination cursor", details={"reason": str(e)})
+
+
+def query_fingerprint(endpoint: str, params: Dict[str, Any]) -> str:
+    """Short hash of the endpoint and the parameters that define the result set"""
+    text = json.dumps([endpoint, sorted(params.items())], sort_keys=True, default=str)
+    return hashlib.md5(text.encode()).hexdigest()[:16]
+
+
+def _seek(keys: Sequence[tuple], after: tuple, descending: bool) -> int:
+    """Index of the first key strictly after ``after`` in sort order"""
+    low, high = 0, len(keys)
+    while low < high:
+        middle = (low + high) // 2
+        passed = keys[middle] < after if descending else keys[middle] > after
+        if passed:
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+async def paginate_by_cursor(
+    endpoint: str,
+    params: Dict[str, Any],
+    cursor: str,
+    page_size: int,
+    load: Callable[[], Union[List[Any], Awaitable[List[Any]]]],
+    sort_key: Callable[[Any], tuple],
+    descending: bool = False
+) -> CursorPaginatedResponse:
+    """One page of load()'s results in (sort_key, descending) order, continuing from cursor"""
+    fingerprint = query_fingerprint(endpoint, params)
+    after = None
+    snapshot = None
+    snapshot_id = None
+    if cursor not in START_CURSORS:
+        data = decode_cursor(cursor)
+        if data.get("e") != endpoint or data.get("f") != fingerprint:
+            raise ValidationError("Pagination cursor belongs to a different query; start again without a cursor")
+        after = tuple(data["k"])
+        snapshot_id = data.get("s")
+        snapshot = result_snapshots.get(snapshot_id) if snapshot_id else None
+
+    if snapshot is None:
+        items = load()
+        if inspect.isawaitable(items):
+            items = await items
+        items = sorted(items, key=sort_key, reverse=descending)
+        keys = [tuple(sort_key(item)) for item in items]
+        if snapshot_id:
+            logger.info(f"📸 Cursor snapshot {snapshot_id} for {endpoint} expired, continuing on live data")
+        snapshot_id = result_snapshots.put(items, keys)
+    else:
+        items, keys = snapshot
+
+    start = 0 if after is None else _seek(keys, after, descending)
+    end = start + page_size
+    has_more = end < len(items)
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor({
+            "v": CURSOR_VERSION, "e": endpoint, "f": fingerprint, "s": snapshot_id, "k": list(keys[end - 1]),
+        })
+    return CursorPaginatedResponse(
+        items=items[start:end],
+        total=len(items),
+        page_size=page_size,
+        next_cursor=next_cursor,
+        has_more=has_more,
+        snapshot=snapshot_id
+    )
+
+
+# Global snapshot store (per worker; other workers continue from the cursor's key)
+result_snapshots = ResultSnapshots(settings.CURSOR_SNAPSHOT_MAX, settings.CURSOR_SNAPSHOT_TTL)
@@ -2,7 +2,7 @@
 Permission system for API keys using scope-based access control.
 
 Scopes follow the format: resource:action
-- resource: users, groups, ous, activity, api_keys
+- resource: users, groups, ous, activity, metrics, api_keys
 - action: read, write
 
 Also supports endpoint-based format: METHOD:/api/resource
@@ -58,6 +58,12 @@ AVAILABLE_SCOPES = {
         "description": "สามารถดู Activity Log และสถิติ",
         "category": "activity"
     },
+    "metrics:read": {
+        "name": "metrics:read",
+        "label": "ดู Metrics",
+        "description": "สามารถดูสถานะระบบและ metrics (รวมถึง Prometheus scrape)",
+        "category": "admin"
+    },
     "api_keys:manage": {
         "name": "api_keys:manage",
         "label": "จัดการ API Keys",
@@ -122,6 +128,10 @@ ENDPOINT_SCOPE_MAP = {
     (r"^/api/api-keys", "DELETE"): "api_keys:manage",
     (r"^/api/api-keys", "PATCH"): "api_keys:manage",
     
+    # Health details and metrics endpoints
+    (r"^/api/health/.+", "GET"): "metrics:read",
+    (r"^/api/metrics/", "GET"): "metrics:read",
+    
     # API usage endpoints (admin only)
     (r"^/api/api-usage", "GET"): "api_keys:manage",
     
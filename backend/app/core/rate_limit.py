@@ -1,58 +1,117 @@
-from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import Dict, Tuple, Optional
-import logging
+"""
+Rate Limiting
+GCRA (generic cell rate algorithm) limiter: one timestamp per identifier and
+tier, so checking a request costs the same regardless of traffic
+"""
+import math
 import time
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+import logging
+
+from app.core.config import settings
+from app.core.executors import run_blocking, storage_executor
+from app.core.shared_state import MemoryBackend, SharedStateBackend, shared_state
 
 logger = logging.getLogger(__name__)
 
+TIER_NAMES = {60: "per_minute", 3600: "per_hour"}
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a rate limit check, reported for the most constrained tier"""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_at: float  # Unix time when the tier is back to its full allowance
+    retry_after: float  # Seconds until a rejected request would be allowed (0 if allowed)
+    window_seconds: int
+
+    @property
+    def limit_type(self) -> str:
+        return TIER_NAMES.get(self.window_seconds, f"per_{self.window_seconds}s")
+
+    def headers(self) -> Dict[str, str]:
+        """X-RateLimit-* (and Retry-After when rejected) response headers"""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_at)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
 
 class RateLimiter:
-    """In-memory rate limiter for API keys and IP addresses"""
-    
-    def __init__(self):
-        # Structure: {identifier: {window: [(timestamp, count)]}}
-        self._requests: Dict[str, Dict[str, list]] = defaultdict(lambda: defaultdict(list))
-        self._cleanup_interval = 3600  # Clean up old entries every hour
-        self._last_cleanup = time.time()
-    
-    def _cleanup_old_entries(self):
-        """Remove old entries to prevent memory leak"""
-        current_time = time.time()
-        if current_time - self._last_cleanup < self._cleanup_interval:
-            return
-        
-        cutoff_time = current_time - 86400  # 24 hours ago
-        
-        for identifier in list(self._requests.keys()):
-            for window in list(self._requests[identifier].keys()):
-                self._requests[identifier][window] = [
-                    (ts, count) for ts, count in self._requests[identifier][window]
-                    if ts > cutoff_time
-                ]
-                if not self._requests[identifier][window]:
-                    del self._requests[identifier][window]
-            
-            if not self._requests[identifier]:
-                del self._requests[identifier]
-        
-        self._last_cleanup = current_time
-    
-    def _get_window_key(self, window_seconds: int) -> str:
-        """Get window key for time-based rate limiting"""
-        return f"window_{window_seconds}"
-    
-    def _clean_window(self, identifier: str, window_seconds: int):
-        """Remove old entries from a specific window"""
-        window_key = self._get_window_key(window_seconds)
-        current_time = time.time()
-        cutoff_time = current_time - window_seconds
-        
-        self._requests[identifier][window_key] = [
-            (ts, count) for ts, count in self._requests[identifier][window_key]
-            if ts > cutoff_time
-        ]
-    
+    """Rate limiter for API keys and IP addresses
+
+    Each (identifier, window) tier stores only its theoretical arrival time
+    (TAT). A tier of ``limit`` requests per ``window`` seconds admits one
+    request every ``window / limit`` seconds on average and bursts of up to
+    ``limit`` requests. A request is admitted only if every tier admits it,
+    and only then is it counted against the tiers.
+
+    TATs live in a SharedStateBackend, so with a shared backend every worker
+    process counts against the same limits.
+    """
+
+    KEY_PREFIX = "rate_limit:"
+
+    def __init__(self, backend: Optional[SharedStateBackend] = None):
+        self.backend = backend or MemoryBackend()
+
+    def _evaluate(self, identifier: str, tiers: Sequence[Tuple[int, int]], cost: int, consume: bool,
+                  now: Optional[float] = None) -> RateLimitResult:
+        # Wall-clock time: TATs are compared across processes
+        now = time.time() if now is None else now
+
+        def update(tats: Dict[int, float]):
+            decisions = []
+            for limit, window_seconds in tiers:
+                interval = window_seconds / limit
+                tat = max(tats.get(window_seconds, now), now)
+                new_tat = tat + interval * cost
+                allow_at = new_tat - window_seconds
+                allowed = now >= allow_at
+                # Remaining after this request (if allowed) or right now (if not)
+                used_until = new_tat if allowed and consume else tat
+                remaining = max(0, min(limit, int((now + window_seconds - used_until) / interval + 1e-9)))
+                decisions.append((allowed, limit, remaining, used_until, max(0.0, allow_at - now), window_seconds, new_tat))
+
+            if not (consume and decisions and all(decision[0] for decision in decisions)):
+                return decisions, None, 0.0
+            new_tats = dict(tats)
+            for decision in decisions:
+                new_tats[decision[5]] = decision[6]
+            # A tier whose TAT has passed is indistinguishable from an unused one, so the entry can expire then
+            return decisions, new_tats, max(new_tats.values()) - now
+
+        decisions = self.backend.update_counters(self.KEY_PREFIX + identifier, update)
+        if not decisions:
+            return RateLimitResult(True, 0, 0, now, 0.0, 0)
+        allowed = all(decision[0] for decision in decisions)
+        if allowed:
+            # The tier with the fewest requests left is the one clients should pace against
+            reported = min(decisions, key=lambda decision: (decision[2] / decision[1], decision[2]))
+        else:
+            reported = max((decision for decision in decisions if not decision[0]), key=lambda decision: decision[4])
+        _, limit, remaining, reset_at, retry_after, window_seconds, _ = reported
+        return RateLimitResult(allowed, limit, remaining, reset_at, retry_after if not allowed else 0.0, window_seconds)
+
+    def hit(self, identifier: str, tiers: Sequence[Tuple[int, int]], cost: int = 1) -> RateLimitResult:
+        """Check and count a request against tiers of (limit, window_seconds)"""
+        return self._evaluate(identifier, tiers, cost, consume=True)
+
+    def peek(self, identifier: str, tiers: Sequence[Tuple[int, int]]) -> RateLimitResult:
+        """Current state of the tiers without counting a request"""
+        return self._evaluate(identifier, tiers, 1, consume=False)
+
+    async def hit_async(self, identifier: str, tiers: Sequence[Tuple[int, int]], cost: int = 1) -> RateLimitResult:
+        """hit() for async code: a shared backend's counter update runs on the storage executor"""
+        if not self.backend.blocking:
+            return self.hit(identifier, tiers, cost)
+        return await run_blocking(storage_executor, self.hit, identifier, tiers, cost, timeout=settings.STORAGE_TIMEOUT)
+
     def check_rate_limit(
         self,
         identifier: str,
@@ -61,64 +120,41 @@ class RateLimiter:
     ) -> Tuple[bool, int, int]:
         """
         Check if request is within rate limit
-        
+
         Returns:
             (is_allowed, current_count, limit)
         """
-        self._cleanup_old_entries()
-        
-        window_key = self._get_window_key(window_seconds)
-        current_time = time.time()
-        
-        # Clean old entries from this window
-        self._clean_window(identifier, window_seconds)
-        
-        # Count requests in the window
-        window_start = current_time - window_seconds
-        current_count = sum(
-            count for ts, count in self._requests[identifier][window_key]
-            if ts > window_start
-        )
-        
-        # Check if limit exceeded
-        is_allowed = current_count < limit
-        
-        if is_allowed:
-            # Record this request
-            self._requests[identifier][window_key].append((current_time, 1))
-        
-        return is_allowed, current_count, limit
-    
-    def record_request(self, identifier: str, window_seconds: int):
-        """Record a request (for tracking purposes)"""
-        window_key = self._get_window_key(window_seconds)
-        current_time = time.time()
-        self._requests[identifier][window_key].append((current_time, 1))
-    
-    def get_current_usage(
-        self,
-        identifier: str,
-        window_seconds: int
-    ) -> int:
-        """Get current usage count for a window"""
-        window_key = self._get_window_key(window_seconds)
-        current_time = time.time()
-        window_start = current_time - window_seconds
-        
-        return sum(
-            count for ts, count in self._requests[identifier][window_key]
-            if ts > window_start
-        )
-    
+        result = self.hit(identifier, [(limit, window_seconds)])
+        # current_count is the usage before this request, as with the previous sliding window
+        current_count = limit - result.remaining - (1 if result.allowed else 0)
+        return result.allowed, max(0, current_count), limit
+
     def reset_limit(self, identifier: str):
         """Reset rate limit for an identifier"""
-        if identifier in self._requests:
-            del self._requests[identifier]
-            logger.info(f"✅ Rate limit reset for: {identifier}")
+        self.backend.delete(self.KEY_PREFIX + identifier)
+        logger.info(f"✅ Rate limit reset for: {identifier}")
 
 
-# Global instance
-rate_limiter = RateLimiter()
+# Global instance (shares counters across workers when SHARED_STATE_BACKEND is sqlite/redis)
+rate_limiter = RateLimiter(shared_state)
+
+
+def _usage_info(result: RateLimitResult) -> Dict[str, any]:
+    if not result.allowed:
+        return {
+            "allowed": False,
+            "limit_type": result.limit_type,
+            "current": result.limit - result.remaining,
+            "limit": result.limit,
+            "reset_in": result.retry_after
+        }
+    return {
+        "allowed": True,
+        "limit_type": result.limit_type,
+        "remaining": result.remaining,
+        "limit": result.limit,
+        "reset_at": result.reset_at
+    }
 
 
 def check_api_key_rate_limit(
@@ -128,53 +164,12 @@ def check_api_key_rate_limit(
 ) -> Tuple[bool, Dict[str, any]]:
     """
     Check rate limit for API key
-    
+
     Returns:
         (is_allowed, usage_info)
     """
-    # Check per-minute limit
-    allowed_min, count_min, limit_min = rate_limiter.check_rate_limit(
-        f"api_key_{api_key_id}",
-        rate_limit_per_minute,
-        60  # 1 minute
-    )
-    
-    if not allowed_min:
-        return False, {
-            "allowed": False,
-            "limit_type": "per_minute",
-            "current": count_min,
-            "limit": limit_min,
-            "reset_in": 60 - (time.time() % 60)
-        }
-    
-    # Check per-hour limit
-    allowed_hour, count_hour, limit_hour = rate_limiter.check_rate_limit(
-        f"api_key_{api_key_id}",
-        rate_limit_per_hour,
-        3600  # 1 hour
-    )
-    
-    if not allowed_hour:
-        return False, {
-            "allowed": False,
-            "limit_type": "per_hour",
-            "current": count_hour,
-            "limit": limit_hour,
-            "reset_in": 3600 - (time.time() % 3600)
-        }
-    
-    return True, {
-        "allowed": True,
-        "per_minute": {
-            "current": count_min,
-            "limit": limit_min
-        },
-        "per_hour": {
-            "current": count_hour,
-            "limit": limit_hour
-        }
-    }
+    result = rate_limiter.hit(f"api_key_{api_key_id}", [(rate_limit_per_minute, 60), (rate_limit_per_hour, 3600)])
+    return result.allowed, _usage_info(result)
 
 
 def check_ip_rate_limit(
@@ -184,49 +179,9 @@ def check_ip_rate_limit(
 ) -> Tuple[bool, Dict[str, any]]:
     """
     Check rate limit for IP address
-    
+
     Returns:
         (is_allowed, usage_info)
     """
-    # Check per-minute limit
-    allowed_min, count_min, limit_min = rate_limiter.check_rate_limit(
-        f"ip_{ip_address}",
-        limit_per_minute,
-        60
-    )
-    
-    if not allowed_min:
-        return False, {
-            "allowed": False,
-            "limit_type": "per_minute",
-            "current": count_min,
-            "limit": limit_min
-        }
-    
-    # Check per-hour limit
-    allowed_hour, count_hour, limit_hour = rate_limiter.check_rate_limit(
-        f"ip_{ip_address}",
-        limit_per_hour,
-        3600
-    )
-    
-    if not allowed_hour:
-        return False, {
-            "allowed": False,
-            "limit_type": "per_hour",
-            "current": count_hour,
-            "limit": limit_hour
-        }
-    
-    return True, {
-        "allowed": True,
-        "per_minute": {
-            "current": count_min,
-            "limit": limit_min
-        },
-        "per_hour": {
-            "current": count_hour,
-            "limit": limit_hour
-        }
-    }
-
+    result = rate_limiter.hit(f"ip_{ip_address}", [(limit_per_minute, 60), (limit_per_hour, 3600)])
+    return result.allowed, _usage_info(result)
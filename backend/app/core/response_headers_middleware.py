@@ -1,6 +1,8 @@
 """
 Response Headers Middleware
 Adds standard response headers: X-Request-ID, X-Response-Time
+(X-Cache / Age for responses served by cached_response, ETag for
+conditional list responses)
 """
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -9,6 +11,8 @@ import uuid
 import logging
 from typing import Callable
 
+from app.core.etags import CACHE_CONTROL
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,5 +41,17 @@ class ResponseHeadersMiddleware(BaseHTTPMiddleware):
         response.headers["X-Request-ID"] = request_id
         response.headers["X-Response-Time"] = f"{response_time_ms}ms"
         
+        # Set by cached_response: HIT / STALE / MISS and seconds since the value was computed
+        cache_status = getattr(request.state, "cache_status", None)
+        if cache_status:
+            response.headers["X-Cache"] = cache_status[0]
+            response.headers["Age"] = str(cache_status[1])
+        
+        # Set by check_not_modified: validator of the body being returned (304s carry it already)
+        etag = getattr(request.state, "etag", None)
+        if etag and response.status_code == 200:
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = CACHE_CONTROL
+        
         return response
 
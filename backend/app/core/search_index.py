@@ -0,0 +1,179 @@
+"""
+Search Index
+In-process index over user list fields for substring and typeahead search
+
+Medial-substring LDAP filters (``*text*``) are not index-backed in AD, so
+every keystroke in a search box used to become a full scan on the DC. The
+index is built once per user dataset load:
+
+- contains: bigram/trigram postings, candidates verified against the folded value
+- starts_with: distinct folded values in a sorted array (binary search)
+- ends_with: reversed folded values in a sorted array
+- exact: folded value -> user ids
+"""
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+SEARCH_ATTRIBUTES = (
+    "cn", "sAMAccountName", "mail", "displayName", "title", "department", "physicalDeliveryOfficeName",
+)
+
+NGRAM = 3
+
+# Zero-width characters used as invisible word breaks in Thai text
+_INVISIBLE = dict.fromkeys(map(ord, "\u200b\u200c\u200d\u2060\ufeff"))
+
+
+def _is_latin(char: str) -> bool:
+    return char < "\u0250" or "\u1e00" <= char <= "\u1eff"
+
+
+def fold_text(value: Any) -> str:
+    """Case-, width- and accent-insensitive form of value for matching.
+
+    NFKC unifies compatibility forms (full-width Latin, Thai SARA AM typed
+    as NIKHAHIT + SARA AA). Combining marks are dropped only after Latin
+    letters (é -> e); Thai vowel and tone marks are combining characters
+    too, but they change the word, so they are kept.
+    """
+    if value is None:
+        return ""
+    text = unicodedata.normalize("NFKC", str(value)).translate(_INVISIBLE).casefold()
+    if text.isascii():
+        return " ".join(text.split())
+    kept = []
+    base = ""
+    for char in unicodedata.normalize("NFD", text):
+        if unicodedata.combining(char):
+            if not _is_latin(base):
+                kept.append(char)
+            continue
+        base = char
+        kept.append(char)
+    return " ".join(unicodedata.normalize("NFC", "".join(kept)).split())
+
+
+def ngrams(text: str, n: int = NGRAM) -> Set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class _FieldIndex:
+    """Index of one attribute across all users"""
+
+    def __init__(self, values: Sequence[str]):
+        self.values = values  # folded value per user id
+        by_value: Dict[str, List[int]] = {}
+        for user_id, value in enumerate(values):
+            if value:
+                by_value.setdefault(value, []).append(user_id)
+        self.by_value = by_value
+        # Bigram and trigram postings, computed once per distinct value (departments, titles repeat a lot)
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for value, user_ids in by_value.items():
+            grams = {value[i:i + 2] for i in range(len(value) - 1)}
+            grams.update(value[i:i + NGRAM] for i in range(len(value) - NGRAM + 1))
+            if len(user_ids) == 1:
+                user_id = user_ids[0]
+                for gram in grams:
+                    postings[gram].append(user_id)
+            else:
+                for gram in grams:
+                    postings[gram].extend(user_ids)
+        self.postings = dict(postings)
+        self.sorted = sorted(by_value)
+        self.sorted_reversed = sorted((value[::-1], value) for value in by_value)
+
+    @staticmethod
+    def _prefix_slice(entries: list, prefix: str) -> list:
+        low = bisect_left(entries, prefix)
+        high = bisect_left(entries, prefix + "\U0010ffff")
+        return entries[low:high]
+
+    def _ids(self, values: Iterable[str]) -> Set[int]:
+        ids: Set[int] = set()
+        for value in values:
+            ids.update(self.by_value[value])
+        return ids
+
+    def search(self, term: str, mode: str) -> Set[int]:
+        """User ids whose value matches the (folded, non-empty) term"""
+        if mode == "starts_with":
+            return self._ids(self._prefix_slice(self.sorted, term))
+        if mode == "ends_with":
+            reversed_term = term[::-1]
+            low = bisect_left(self.sorted_reversed, (reversed_term,))
+            high = bisect_left(self.sorted_reversed, (reversed_term + "\U0010ffff",))
+            return self._ids(value for _, value in self.sorted_reversed[low:high])
+        if mode == "exact":
+            return set(self.by_value.get(term, ()))
+        # contains
+        if len(term) == 1:
+            return self._ids(value for value in self.by_value if term in value)
+        if len(term) == 2:
+            return set(self.postings.get(term, ()))
+        postings = sorted((self.postings.get(gram, []) for gram in ngrams(term)), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+        # Shared trigrams do not guarantee the trigrams are adjacent: confirm on the value
+        return {user_id for user_id in candidates if term in self.values[user_id]}
+
+
+class UserSearchIndex:
+    """Search index over a list of formatted user dicts (ids are list positions)"""
+
+    def __init__(self, users: Sequence[Dict[str, Any]], attributes: Sequence[str] = SEARCH_ATTRIBUTES):
+        self.size = len(users)
+        folded: Dict[Any, str] = {}
+        self.fields = {}
+        for attribute in attributes:
+            values = []
+            for user in users:
+                value = user.get(attribute)
+                if value not in folded:
+                    folded[value] = fold_text(value)
+                values.append(folded[value])
+            self.fields[attribute] = _FieldIndex(values)
+
+    def match(self, attribute: str, term: str, mode: str) -> Set[int]:
+        """User ids where attribute matches term in search mode (LDAP-like: empty values never match)"""
+        term = fold_text(term)
+        field = self.fields.get(attribute)
+        if field is None or not term:
+            return set()
+        return field.search(term, mode)
+
+    def search(
+        self,
+        all_of: Sequence[Tuple[str, str]] = (),
+        any_of: Sequence[Tuple[str, str]] = (),
+        mode: str = "contains"
+    ) -> Optional[List[int]]:
+        """Sorted user ids matching every all_of term and at least one any_of term; None without terms"""
+        if not all_of and not any_of:
+            return None
+        matched: Optional[Set[int]] = None
+        # Most selective terms first so later intersections start small
+        for attribute, term in sorted(all_of, key=lambda pair: -len(pair[1])):
+            ids = self.match(attribute, term, mode)
+            matched = ids if matched is None else matched & ids
+            if not matched:
+                return []
+        if any_of:
+            union: Set[int] = set()
+            for attribute, term in any_of:
+                union |= self.match(attribute, term, mode)
+            matched = union if matched is None else matched & union
+        return sorted(matched)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": self.size,
+            "attributes": len(self.fields),
+            "ngrams": sum(len(field.postings) for field in self.fields.values()),
+            "postings": sum(len(posting) for field in self.fields.values() for posting in field.postings.values()),
+        }
@@ -0,0 +1,215 @@
+"""
+Server Info Cache
+Persisted copy of each DC's rootDSE info and the directory schema
+
+ldap3 downloads both on every bind when a Server is created with
+get_info=ALL, which means every pooled connection, every reconnect and every
+login re-reads several MB of schema. Servers are instead created with
+get_info=NONE and the cached info is attached to them; the schema is only
+downloaded again when its version (schemaInfo / objectVersion / uSNChanged of
+the schema container) changes.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from ldap3 import BASE
+from ldap3.protocol.rfc4512 import DsaInfo, SchemaInfo
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SERVER_INFO_FORMAT_VERSION = 1
+# Attributes of the schema container that change whenever the schema does
+SCHEMA_VERSION_ATTRIBUTES = ["schemaInfo", "objectVersion", "uSNChanged", "modifyTimestamp"]
+
+
+class ServerInfoCache:
+    """rootDSE info per server URL and schema per schema version, persisted to ``path``"""
+
+    def __init__(self, path: str, revalidate_interval: float = 3600.0):
+        self.path = path
+        self.revalidate_interval = revalidate_interval
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._servers: Dict[str, Dict[str, Any]] = {}  # url -> {schema_key, info, fetched_at, checked_at}
+        self._schemas: Dict[str, str] = {}  # schema_key -> SchemaInfo JSON
+        # Parsed once and shared by every Server object (parsing the AD schema is not free)
+        self._parsed_info: Dict[str, DsaInfo] = {}
+        self._parsed_schemas: Dict[str, SchemaInfo] = {}
+        self._stats = {"hits": 0, "misses": 0, "revalidations": 0, "schema_downloads": 0, "errors": 0}
+
+    def _load_locked(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable server info cache {self.path}: {e}")
+            return
+        if data.get("version") != SERVER_INFO_FORMAT_VERSION:
+            logger.info("Server info cache was written by another version; fetching from the DC")
+            return
+        self._servers = data.get("servers", {})
+        self._schemas = data.get("schemas", {})
+        logger.info(f"📂 Loaded server info cache from {self.path} "
+                    f"({len(self._servers)} servers, {len(self._schemas)} schemas)")
+
+    def _persist(self):
+        """Write the cache to ``path`` (atomically, via a temp file)"""
+        with self._lock:
+            # Schemas no server refers to any more are dropped
+            used = {record["schema_key"] for record in self._servers.values()}
+            self._schemas = {key: value for key, value in self._schemas.items() if key in used}
+            data = {
+                "version": SERVER_INFO_FORMAT_VERSION,
+                "servers": dict(self._servers),
+                "schemas": dict(self._schemas),
+            }
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+            logger.info(f"💾 Server info cache saved to {self.path}")
+        except OSError as e:
+            logger.warning(f"⚠️ Could not save server info cache {self.path}: {e}")
+
+    def _parsed_locked(self, url: str) -> Optional[tuple]:
+        record = self._servers.get(url)
+        if record is None or record["schema_key"] not in self._schemas:
+            return None
+        key = record["schema_key"]
+        if key not in self._parsed_schemas:
+            self._parsed_schemas[key] = SchemaInfo.from_json(self._schemas[key])
+        if url not in self._parsed_info:
+            self._parsed_info[url] = DsaInfo.from_json(record["info"])
+        return self._parsed_info[url], self._parsed_schemas[key]
+
+    def attach(self, server, url: str) -> bool:
+        """Attach cached rootDSE info and schema to an ldap3 Server (no network); False on a miss"""
+        with self._lock:
+            self._load_locked()
+            try:
+                parsed = self._parsed_locked(url)
+            except Exception as e:
+                logger.warning(f"⚠️ Discarding corrupt server info cache entry for {url}: {e}")
+                self._servers.pop(url, None)
+                parsed = None
+            if parsed is None:
+                self._stats["misses"] += 1
+                return False
+            self._stats["hits"] += 1
+        server.attach_dsa_info(parsed[0])
+        server.attach_schema_info(parsed[1])
+        return True
+
+    def needs_refresh(self, url: str) -> bool:
+        """True if there is no entry for url or it was last checked over revalidate_interval ago"""
+        with self._lock:
+            self._load_locked()
+            record = self._servers.get(url)
+            return record is None or time.time() - record["checked_at"] >= self.revalidate_interval
+
+    @staticmethod
+    def _schema_key(connection, dsa_info: DsaInfo) -> Optional[str]:
+        """Version of the schema the server holds, read from the schema container (one BASE search)"""
+        other = dsa_info.other or {}
+        schema_dn = (other.get("schemaNamingContext") or dsa_info.schema_entry or [None])[0]
+        if not schema_dn:
+            return None
+        if not connection.search(schema_dn, "(objectClass=*)", search_scope=BASE, attributes=SCHEMA_VERSION_ATTRIBUTES):
+            return None
+        if not connection.response:
+            return None
+        raw = connection.response[0].get("raw_attributes", {})
+        parts = []
+        for attribute in SCHEMA_VERSION_ATTRIBUTES:
+            values = raw.get(attribute) or []
+            parts.append(",".join(value.hex() if isinstance(value, bytes) else str(value) for value in values))
+        if not any(parts):
+            return None
+        return f"{schema_dn.lower()}|{'|'.join(parts)}"
+
+    def refresh(self, connection, url: str) -> bool:
+        """Bring the entry for url up to date over a bound connection and attach it to connection.server.
+
+        Reads the rootDSE and the schema version (two small searches); the full
+        schema is only downloaded when that version is not cached yet.
+        """
+        server = connection.server
+        try:
+            server._get_dsa_info(connection)
+            dsa_info = server.info
+            if dsa_info is None:
+                raise ValueError("rootDSE could not be read")
+            schema_key = self._schema_key(connection, dsa_info)
+
+            with self._lock:
+                self._load_locked()
+                record = self._servers.get(url)
+                changed = record is None or schema_key is None or record["schema_key"] != schema_key
+                cached = schema_key is not None and schema_key in self._schemas
+
+            if cached:
+                with self._lock:
+                    if schema_key not in self._parsed_schemas:
+                        self._parsed_schemas[schema_key] = SchemaInfo.from_json(self._schemas[schema_key])
+                    schema = self._parsed_schemas[schema_key]
+                server.attach_schema_info(schema)
+            else:
+                logger.info(f"📥 Downloading directory schema from {url}")
+                server._get_schema_info(connection)
+                schema = server.schema
+                if schema is None:
+                    raise ValueError("schema could not be read")
+                # Unversioned schemas are keyed per server and re-downloaded on every refresh
+                schema_key = schema_key or f"{url}|unversioned"
+                with self._lock:
+                    self._schemas[schema_key] = schema.to_json(indent=None)
+                    self._parsed_schemas[schema_key] = schema
+                    self._stats["schema_downloads"] += 1
+
+            now = time.time()
+            with self._lock:
+                self._servers[url] = {
+                    "schema_key": schema_key,
+                    "info": dsa_info.to_json(indent=None),
+                    "fetched_at": now if changed else (record or {}).get("fetched_at", now),
+                    "checked_at": now,
+                }
+                self._parsed_info[url] = dsa_info
+                self._stats["revalidations"] += 1
+            self._persist()
+            if changed and record is not None:
+                logger.info(f"🔄 Schema of {url} changed; server info cache updated")
+            return True
+        except Exception as e:
+            with self._lock:
+                self._stats["errors"] += 1
+            logger.warning(f"⚠️ Server info refresh for {url} failed: {e}")
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": self.path,
+                "servers": {
+                    url: {"fetched_at": record["fetched_at"], "checked_at": record["checked_at"]}
+                    for url, record in self._servers.items()
+                },
+                "schemas": len(self._schemas),
+                **self._stats,
+            }
+
+
+# Global cache
+server_info_cache = ServerInfoCache(settings.LDAP_SCHEMA_CACHE_PATH, settings.LDAP_SCHEMA_CACHE_REVALIDATE_INTERVAL)
@@ -0,0 +1,475 @@
+"""
+Shared State
+Storage for state that must be the same in every worker process: the endpoint
+response cache and rate-limit counters
+
+- memory: bounded per-process LRU (single worker, the default)
+- sqlite: one WAL-mode SQLite file shared by all workers on the host
+- redis: any Redis-protocol server (needs the optional ``redis`` package)
+"""
+import logging
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# update(counters) -> (result, new counters or None to keep the stored ones, seconds to keep them)
+CounterUpdate = Callable[[Dict[str, float]], Tuple[Any, Optional[Dict[str, float]], float]]
+
+
+class SharedStateBackend:
+    """Key/value store with TTLs plus atomically updated counter maps"""
+
+    name = "base"
+    blocking = True  # Calls do file or network I/O: async code runs them on the storage executor
+
+    def get(self, key: str) -> Optional[Any]:
+        """Stored value, None if missing or expired"""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def delete_matching(self, prefix: str, pattern: Optional[str] = None) -> int:
+        """Delete keys starting with prefix whose remainder contains pattern (all of them if None).
+
+        Returns the number of keys removed.
+        """
+        raise NotImplementedError
+
+    def update_counters(self, key: str, update: CounterUpdate) -> Any:
+        """Read the counter map at key, apply update and store the result atomically across workers"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+    def close(self):
+        pass
+
+
+def approximate_size(value: Any, sample: int = 64) -> int:
+    """Rough in-memory size in bytes of plain data (dicts, lists, strings, numbers, objects).
+
+    Containers with more than ``sample`` items are measured on an evenly
+    spaced sample and scaled up, so sizing a large user list stays cheap.
+    """
+    size = 0
+    seen = set()
+    stack = [(value, 1.0)]
+    while stack:
+        item, weight = stack.pop()
+        size += sys.getsizeof(item) * weight
+        if isinstance(item, (str, bytes, int, float, bool, type(None))):
+            continue
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, dict):
+            children = [child for pair in item.items() for child in pair]
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            children = list(item)
+        elif hasattr(item, "__dict__"):
+            children = [vars(item)]
+        else:
+            continue
+        if len(children) > sample:
+            step = len(children) / sample
+            scale = weight * len(children) / sample
+            stack.extend((children[int(index * step)], scale) for index in range(sample))
+        else:
+            stack.extend((child, weight) for child in children)
+    return int(size)
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size", "namespace")
+
+    def __init__(self, value: Any, expires_at: float, size: int, namespace: str):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.namespace = namespace
+
+
+class MemoryBackend(SharedStateBackend):
+    """Per-process LRU store with TTLs; only correct with a single worker.
+
+    Values are bounded by entry count and approximate size in bytes; the
+    least recently used entries are evicted first and a background thread
+    removes expired ones. Counter maps (rate limits) are tiny and kept
+    apart, so a burst of cached responses can never evict a limit.
+    Hits, misses, evictions and expirations are counted per namespace: the
+    key up to its last ``:`` (``cache:get_users`` for response cache keys).
+    """
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_entries: int = 0, max_bytes: int = 0, sweep_interval: float = 60.0):
+        self.max_entries = max_entries  # 0 = unbounded
+        self.max_bytes = max_bytes  # 0 = unbounded
+        self.sweep_interval = sweep_interval
+        self._values: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._counters: Dict[str, Tuple[Dict[str, float], float]] = {}  # key -> (counters, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, Dict[str, int]] = {}
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        if sweep_interval > 0:
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="shared-state-sweep", daemon=True)
+            self._sweeper.start()
+
+    @staticmethod
+    def namespace_of(key: str) -> str:
+        return key.rsplit(":", 1)[0]
+
+    def _namespace_stats(self, namespace: str) -> Dict[str, int]:
+        stats = self._namespaces.get(namespace)
+        if stats is None:
+            stats = self._namespaces[namespace] = {
+                "entries": 0, "bytes": 0, "hits": 0, "misses": 0, "sets": 0,
+                "evictions": 0, "expirations": 0, "rejected": 0,
+            }
+        return stats
+
+    def _remove_locked(self, key: str, reason: Optional[str] = None) -> Optional[_Entry]:
+        entry = self._values.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+            stats = self._namespace_stats(entry.namespace)
+            stats["entries"] -= 1
+            stats["bytes"] -= entry.size
+            if reason:
+                stats[reason] += 1
+        return entry
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.warning(f"⚠️ Shared state sweep failed: {e}")
+
+    def sweep(self) -> int:
+        """Remove expired values and counters; returns the number removed"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._values.items() if entry.expires_at <= now]
+            for key in expired:
+                self._remove_locked(key, "expirations")
+            expired_counters = [key for key, (_, expires_at) in self._counters.items() if expires_at <= now]
+            for key in expired_counters:
+                del self._counters[key]
+        if expired or expired_counters:
+            logger.debug(f"🧹 Shared state sweep: {len(expired)} values, {len(expired_counters)} counters expired")
+        return len(expired) + len(expired_counters)
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                self._namespace_stats(self.namespace_of(key))["misses"] += 1
+                return None
+            stats = self._namespace_stats(entry.namespace)
+            if entry.expires_at <= now:
+                self._remove_locked(key, "expirations")
+                stats["misses"] += 1
+                return None
+            self._values.move_to_end(key)
+            stats["hits"] += 1
+            return entry.value
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        # Sized outside the lock: walking a large response is the expensive part
+        size = approximate_size(value) if self.max_bytes else 0
+        namespace = self.namespace_of(key)
+        with self._lock:
+            self._remove_locked(key)
+            stats = self._namespace_stats(namespace)
+            if self.max_bytes and size > self.max_bytes:
+                stats["rejected"] += 1
+                return
+            self._values[key] = _Entry(value, time.monotonic() + ttl_seconds, size, namespace)
+            self._bytes += size
+            stats["entries"] += 1
+            stats["bytes"] += size
+            stats["sets"] += 1
+            while self._values and (
+                (self.max_entries and len(self._values) > self.max_entries)
+                or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                self._remove_locked(next(iter(self._values)), "evictions")
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove_locked(key)
+            self._counters.pop(key, None)
+
+    def delete_matching(self, prefix: str, pattern: Optional[str] = None) -> int:
+        with self._lock:
+            keys = [key for key in self._values
+                    if key.startswith(prefix) and (pattern is None or pattern in key[len(prefix):])]
+            for key in keys:
+                self._remove_locked(key)
+            counter_keys = [key for key in self._counters
+                            if key.startswith(prefix) and (pattern is None or pattern in key[len(prefix):])]
+            for key in counter_keys:
+                del self._counters[key]
+            return len(keys) + len(counter_keys)
+
+    def update_counters(self, key: str, update: CounterUpdate) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            stored = self._counters.get(key)
+            counters = dict(stored[0]) if stored is not None and stored[1] > now else {}
+            result, new_counters, ttl_seconds = update(counters)
+            if new_counters is not None:
+                self._counters[key] = (new_counters, now + ttl_seconds)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "rejected": 0}
+            namespaces = {}
+            for namespace, counts in sorted(self._namespaces.items()):
+                for counter in totals:
+                    totals[counter] += counts[counter]
+                lookups = counts["hits"] + counts["misses"]
+                namespaces[namespace] = {
+                    **counts,
+                    "hit_rate": round(counts["hits"] / lookups, 3) if lookups else 0.0,
+                }
+            lookups = totals["hits"] + totals["misses"]
+            return {
+                "backend": self.name,
+                "entries": len(self._values),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "counters": len(self._counters),
+                "sweep_interval_seconds": self.sweep_interval,
+                **totals,
+                "hit_rate": round(totals["hits"] / lookups, 3) if lookups else 0.0,
+                "namespaces": namespaces,
+            }
+
+    def close(self):
+        self._stop.set()
+
+
+class SQLiteBackend(SharedStateBackend):
+    """Shared by every worker on the host through one SQLite file in WAL mode.
+
+    WAL lets readers run concurrently with the single writer; counter updates
+    take the write lock (BEGIN IMMEDIATE) so read-modify-write is atomic
+    across processes. Values are pickled.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, cleanup_interval: float = 60.0, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._cleanup_interval = cleanup_interval
+        self._last_cleanup = 0.0
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS shared_state (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_shared_state_expires ON shared_state(expires_at)")
+        logger.info(f"✅ Shared state backend: SQLite ({path})")
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread (autocommit; transactions are explicit)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _cleanup(self, connection: sqlite3.Connection, now: float):
+        if now - self._last_cleanup < self._cleanup_interval:
+            return
+        self._last_cleanup = now
+        connection.execute("DELETE FROM shared_state WHERE expires_at <= ?", (now,))
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connection().execute(
+            "SELECT value FROM shared_state WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        now = time.time()
+        connection = self._connection()
+        self._cleanup(connection, now)
+        connection.execute(
+            "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl_seconds)
+        )
+
+    def delete(self, key: str):
+        self._connection().execute("DELETE FROM shared_state WHERE key = ?", (key,))
+
+    def delete_matching(self, prefix: str, pattern: Optional[str] = None) -> int:
+        return self._connection().execute(
+            "DELETE FROM shared_state WHERE substr(key, 1, ?) = ? AND instr(substr(key, ? + 1), ?) > 0",
+            (len(prefix), prefix, len(prefix), pattern or "")
+        ).rowcount
+
+    def update_counters(self, key: str, update: CounterUpdate) -> Any:
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT value FROM shared_state WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            counters = pickle.loads(row[0]) if row else {}
+            result, new_counters, ttl_seconds = update(counters)
+            if new_counters is not None:
+                connection.execute(
+                    "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, pickle.dumps(new_counters, protocol=pickle.HIGHEST_PROTOCOL), now + ttl_seconds)
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        total, active = self._connection().execute(
+            "SELECT COUNT(*), SUM(expires_at > ?) FROM shared_state", (time.time(),)
+        ).fetchone()
+        return {"backend": self.name, "path": self.path, "keys": total, "active_keys": active or 0}
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class RedisBackend(SharedStateBackend):
+    """Any Redis-protocol server (Redis, Valkey, KeyDB, ...); keys are namespaced with ``prefix``.
+
+    Counter updates use WATCH/MULTI/EXEC and are retried if another worker
+    changed the key in between.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "adm:", max_retries: int = 20):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SHARED_STATE_BACKEND=redis requires the 'redis' package (pip install redis)") from e
+        self._redis = redis
+        self.client = redis.Redis.from_url(url)
+        self.url = url
+        self.prefix = prefix
+        self.max_retries = max_retries
+        self.client.ping()
+        logger.info(f"✅ Shared state backend: Redis ({url})")
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        self.client.set(self.prefix + key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                        px=max(1, int(ttl_seconds * 1000)))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    @staticmethod
+    def _glob_literal(text: str) -> str:
+        """Escape glob characters so text matches literally in SCAN MATCH"""
+        return "".join(f"\\{c}" if c in "*?[]\\" else c for c in text)
+
+    def delete_matching(self, prefix: str, pattern: Optional[str] = None) -> int:
+        match = self._glob_literal(self.prefix + prefix)
+        match += f"*{self._glob_literal(pattern)}*" if pattern else "*"
+        removed = 0
+        batch = []
+        for key in self.client.scan_iter(match=match, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                removed += self.client.delete(*batch)
+                batch = []
+        if batch:
+            removed += self.client.delete(*batch)
+        return removed
+
+    def update_counters(self, key: str, update: CounterUpdate) -> Any:
+        name = self.prefix + key
+        for _ in range(self.max_retries):
+            with self.client.pipeline() as pipe:
+                try:
+                    pipe.watch(name)
+                    value = pipe.get(name)
+                    counters = pickle.loads(value) if value is not None else {}
+                    result, new_counters, ttl_seconds = update(counters)
+                    if new_counters is None:
+                        pipe.unwatch()
+                        return result
+                    pipe.multi()
+                    pipe.set(name, pickle.dumps(new_counters, protocol=pickle.HIGHEST_PROTOCOL),
+                             px=max(1, int(ttl_seconds * 1000)))
+                    pipe.execute()
+                    return result
+                except self._redis.WatchError:
+                    continue
+        raise RuntimeError(f"Counter update for {key} kept conflicting with other workers")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "url": self.url, "prefix": self.prefix}
+
+    def close(self):
+        self.client.close()
+
+
+def create_backend() -> SharedStateBackend:
+    """Backend selected by SHARED_STATE_BACKEND (falls back to memory if it cannot be set up)"""
+    backend = settings.SHARED_STATE_BACKEND.lower()
+    try:
+        if backend == "sqlite":
+            return SQLiteBackend(settings.SHARED_STATE_PATH)
+        if backend == "redis":
+            return RedisBackend(settings.SHARED_STATE_REDIS_URL, settings.SHARED_STATE_KEY_PREFIX)
+        if backend != "memory":
+            logger.warning(f"⚠️ Unknown SHARED_STATE_BACKEND '{settings.SHARED_STATE_BACKEND}', using memory")
+    except Exception as e:
+        logger.error(f"❌ Shared state backend '{backend}' unavailable, using per-process memory: {e}")
+    return MemoryBackend(
+        max_entries=settings.CACHE_MAX_ENTRIES,
+        max_bytes=settings.CACHE_MAX_MEMORY_MB * 1024 * 1024,
+        sweep_interval=settings.CACHE_SWEEP_INTERVAL,
+    )
+
+
+# Global backend
+shared_state = create_backend()
@@ -0,0 +1,224 @@
+"""
+User Dataset
+One formatted copy of every user, shared by all users-list queries
+
+get_users used to run its own directory search (and keep its own cached
+copy of the result) for every combination of search, OU, page and field
+parameters. The dataset is loaded once per refresh; filtering, OU scoping,
+paging and field selection then run in-process against it, with searches
+answered from a UserSearchIndex built at each load. Each load also hashes
+the data, so list responses get an ETag without being serialized.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.cache import SingleFlight, add_invalidation_listener
+from app.core.etags import content_etag
+from app.core.config import settings
+from app.core.executors import ldap_executor, run_blocking, storage_executor
+from app.core.search_index import UserSearchIndex
+from app.core.shared_state import SharedStateBackend
+
+logger = logging.getLogger(__name__)
+
+# (attribute in the formatted user dict, search text)
+SearchTerm = Tuple[str, str]
+
+# Invalidation generations outlive any dataset; an expired one just causes one extra reload
+GENERATION_TTL = 30 * 86400
+
+
+class UserDataset:
+    """Formatted list-view users, sorted newest first, refreshed in the background.
+
+    The first query, and the first one after invalidate_cache() hits
+    ``cache_name`` (a write or an AD change notification), waits for a load;
+    later ones are answered from memory. Once the data is older than ``ttl``
+    seconds, or ``version()`` reports that the source changed (the directory
+    replica applied changes), a background load replaces it while queries
+    keep using the current copy. A failed load keeps the current copy and is
+    retried after ``retry_interval``.
+
+    With a shared state backend (sqlite/redis), every invalidation also bumps
+    a generation counter there. Other workers read it at most every
+    ``generation_check_interval`` seconds and treat a changed generation as
+    stale data, so a write on one worker reaches all of them within a reload.
+
+    Returned user dicts are shared between requests and must not be modified.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[], Awaitable[List[Dict[str, Any]]]],
+        cache_name: str = "get_users",
+        ttl: float = 300.0,
+        retry_interval: float = 30.0,
+        load_timeout: float = 120.0,
+        version: Optional[Callable[[], Any]] = None,
+        shared: Optional[SharedStateBackend] = None,
+        generation_check_interval: float = 1.0
+    ):
+        self._load = load
+        self.cache_name = cache_name
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self._version = version
+        # A per-process backend has no other workers to tell
+        self._shared = shared if shared is not None and shared.blocking else None
+        self._generation_key = f"generation:{cache_name}"
+        self.generation_check_interval = generation_check_interval
+        self._shared_generation = 0  # Last value read from the shared backend
+        self._loaded_generation = 0
+        self._generation_checked_at = 0.0  # monotonic
+        self._data: Optional[Tuple[List[Dict[str, Any]], List[str], UserSearchIndex]] = None  # (users, lowercase DNs, index)
+        self._loaded_version: Any = None
+        self._etag: Optional[str] = None  # Content hash of the loaded users
+        self._loaded_at = 0.0  # monotonic
+        self._dirty = False
+        self._retry_at = 0.0
+        self._flight = SingleFlight(load_timeout)
+        self._background: Optional[asyncio.Task] = None
+        self._stats = {"loads": 0, "load_errors": 0, "background_loads": 0, "queries": 0}
+        self._last_load_seconds: Optional[float] = None
+        add_invalidation_listener(self._on_invalidate)
+
+    def _on_invalidate(self, pattern: Optional[str]):
+        if pattern is None or pattern in self.cache_name:
+            self.mark_dirty()
+            if self._shared is not None:
+                try:
+                    self._shared.update_counters(
+                        self._generation_key,
+                        lambda counters: (None, {"n": counters.get("n", 0) + 1}, GENERATION_TTL)
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not publish user dataset invalidation to other workers: {e}")
+
+    def _read_generation(self) -> int:
+        return self._shared.update_counters(self._generation_key, lambda counters: (counters.get("n", 0), None, 0))
+
+    async def _check_generation(self, force: bool = False):
+        """Refresh _shared_generation from the shared backend (throttled unless force)"""
+        if self._shared is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._generation_checked_at < self.generation_check_interval:
+            return
+        self._generation_checked_at = now
+        try:
+            self._shared_generation = await run_blocking(
+                storage_executor, self._read_generation, timeout=settings.STORAGE_TIMEOUT
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read the user dataset generation: {e}")
+
+    def mark_dirty(self):
+        """Make the next query wait for a fresh load"""
+        self._dirty = True
+
+    async def _refresh(self):
+        # Cleared before loading so a write that lands during the load is not lost
+        self._dirty = False
+        version = self._version() if self._version else None
+        await self._check_generation(force=True)
+        generation = self._shared_generation
+        started = time.monotonic()
+        try:
+            users = await self._load()
+            # Building the index and hashing are CPU work on every user; keep them off the event loop
+            index = await run_blocking(ldap_executor, UserSearchIndex, users)
+            etag = await run_blocking(ldap_executor, content_etag, users)
+        except Exception:
+            self._dirty = True
+            self._stats["load_errors"] += 1
+            self._retry_at = time.monotonic() + self.retry_interval
+            raise
+        self._data = (users, [(user.get("dn") or "").lower() for user in users], index)
+        self._etag = etag
+        self._loaded_version = version
+        self._loaded_generation = generation
+        self._loaded_at = time.monotonic()
+        self._last_load_seconds = round(self._loaded_at - started, 3)
+        self._stats["loads"] += 1
+        logger.info(f"👥 User dataset loaded: {len(users)} users in {self._last_load_seconds}s")
+
+    async def _background_refresh(self):
+        self._stats["background_loads"] += 1
+        try:
+            await self._flight.do("users", self._refresh)
+        except Exception as e:
+            logger.warning(f"⚠️ User dataset refresh failed, serving the previous copy: {e}")
+
+    def _stale(self) -> bool:
+        if time.monotonic() - self._loaded_at >= self.ttl:
+            return True
+        if self._shared is not None and self._shared_generation != self._loaded_generation:
+            return True
+        return self._version is not None and self._version() != self._loaded_version
+
+    async def _snapshot(self) -> Tuple[List[Dict[str, Any]], List[str], UserSearchIndex]:
+        await self._check_generation()
+        if self._data is None or self._dirty:
+            try:
+                await self._flight.do("users", self._refresh)
+            except Exception:
+                if self._data is None:
+                    raise
+                logger.warning("⚠️ User dataset reload after a write failed, serving the previous copy")
+        elif (self._stale() and time.monotonic() >= self._retry_at
+              and not self._flight.running("users")
+              and (self._background is None or self._background.done())):
+            self._background = asyncio.ensure_future(self._background_refresh())
+        return self._data
+
+    async def query(
+        self,
+        base_dn: Optional[str] = None,
+        all_of: Sequence[SearchTerm] = (),
+        any_of: Sequence[SearchTerm] = (),
+        search_mode: str = "contains"
+    ) -> List[Dict[str, Any]]:
+        """Users under base_dn matching every all_of term and, if given, at least one any_of term.
+
+        Matching is case-, width- and (Latin) accent-insensitive, see fold_text().
+        """
+        users, dns, index = await self._snapshot()
+        self._stats["queries"] += 1
+        ids = index.search(all_of, any_of, search_mode)
+        if not base_dn:
+            return users if ids is None else [users[user_id] for user_id in ids]
+
+        base = base_dn.lower()
+        suffix = "," + base
+        candidates = range(len(users)) if ids is None else ids
+        return [users[user_id] for user_id in candidates if dns[user_id] == base or dns[user_id].endswith(suffix)]
+
+    @property
+    def etag(self) -> Optional[str]:
+        """Content hash of the loaded users (unchanged by a reload that finds the same data).
+
+        Read it right after query(), before awaiting anything, to pair it with that result.
+        """
+        return self._etag
+
+    async def current_etag(self) -> Optional[str]:
+        """etag of the data the next query() will use (loads it first if needed), without running a query"""
+        await self._snapshot()
+        return self._etag
+
+    def stats(self) -> Dict[str, Any]:
+        data = self._data
+        return {
+            "loaded": data is not None,
+            "users": len(data[0]) if data is not None else 0,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if data is not None else None,
+            "ttl_seconds": self.ttl,
+            "dirty": self._dirty,
+            "last_load_seconds": self._last_load_seconds,
+            "etag": self._etag,
+            "shared_generation": self._shared_generation if self._shared is not None else None,
+            "index": data[2].stats() if data is not None else None,
+            **self._stats,
+        }
@@ -1,15 +1,27 @@
-from fastapi import FastAPI, Request, status
+from fastapi import Depends, FastAPI, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
 import uvicorn
 import asyncio
+from typing import Optional
 from dotenv import load_dotenv
 from app.core.config import settings
-from app.core.database import init_ldap_connection
+from app.core.database import init_ldap_connection, ldap_conn
+from app.core.executors import shutdown_executors
+from app.core.directory_replica import directory_replica
+from app.core.change_notifications import change_listener
+from app.core.ldap_metrics import ldap_metrics
+from app.core.server_info_cache import server_info_cache
+from app.core.auth_bind import auth_bind_pool
+from app.core.api_keys import api_key_manager
+from app.core.shared_state import shared_state
+from app.core.cache import cache
+from app.core.pagination import result_snapshots
 from app.core.exceptions import APIException
 from app.routers import auth as auth_router
+from app.routers.auth import verify_token_or_api_key, check_api_key_permission
 from app.routers import users as users_router
 from app.routers import groups as groups_router
 from app.routers import ous as ous_router
@@ -19,6 +31,7 @@ from app.routers import api_keys as api_keys_router
 from app.core.rate_limit_middleware import RateLimitMiddleware
 from app.core.api_logging_middleware import APILoggingMiddleware
 from app.core.response_headers_middleware import ResponseHeadersMiddleware
+from app.core.ldap_affinity_middleware import LDAPAffinityMiddleware
 import logging
 
 # Setup logging
@@ -40,6 +53,12 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"⚠️ LDAP connection failed during startup (server will continue): {e}")
             logger.info("🚀 Application started (LDAP connection will be retried on first use)")
+        if settings.REPLICA_ENABLED:
+            # Background full sync / polling; endpoints read LDAP directly until it is ready
+            directory_replica.start()
+        if settings.LDAP_NOTIFY_ENABLED:
+            # Invalidate caches when objects change outside this app
+            change_listener.start()
     except asyncio.CancelledError:
         # Startup cancelled - this is normal during shutdown
         logger.info("🛑 Startup cancelled (normal shutdown)")
@@ -59,6 +78,12 @@ async def lifespan(app: FastAPI):
     # Shutdown cleanup
     try:
         logger.info("🛑 Application shutting down gracefully...")
+        change_listener.stop()
+        directory_replica.stop()
+        shutdown_executors()
+        ldap_conn.disconnect()
+        auth_bind_pool.close()
+        shared_state.close()
     except asyncio.CancelledError:
         # Already cancelled, ignore
         pass
@@ -159,7 +184,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
     allow_headers=["*", "X-Request-ID"],  # Allow clients to send X-Request-ID
-    expose_headers=["*", "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "X-Request-ID", "X-Response-Time"]
+    expose_headers=["*", "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "Retry-After", "X-Request-ID", "X-Response-Time", "X-Cache", "Age", "ETag"]
 )
 
 # Response Headers Middleware - Add X-Request-ID and X-Response-Time (must be first)
@@ -171,6 +196,9 @@ app.add_middleware(APILoggingMiddleware)
 # Rate Limit Middleware - Add rate limit headers
 app.add_middleware(RateLimitMiddleware)
 
+# LDAP Affinity Middleware - Pin a session's reads to the DC that took its last write
+app.add_middleware(LDAPAffinityMiddleware)
+
 # Routers
 app.include_router(auth_router.router, prefix="/api/auth", tags=["auth"])
 app.include_router(users_router.router, prefix="/api/users", tags=["users"])
@@ -193,7 +221,7 @@ async def root():
 
 @app.get("/api/health")
 async def health_check():
-    """Health check endpoint with system status"""
+    """Health check endpoint (public: up/down only; component details are at /api/health/details)"""
     from datetime import datetime, timezone
     from app.core.database import get_ldap_connection
     
@@ -209,7 +237,7 @@ async def health_check():
     # Check LDAP connection
     try:
         ldap_conn = get_ldap_connection()
-        if ldap_conn and ldap_conn.connection and ldap_conn.connection.bound:
+        if ldap_conn and ldap_conn.is_connected():
             health_status["checks"]["ldap"] = "connected"
         else:
             health_status["checks"]["ldap"] = "disconnected"
@@ -228,6 +256,63 @@ async def health_check():
         content=health_status
     )
 
+@app.get("/api/health/details")
+async def health_details(
+    token_data = Depends(verify_token_or_api_key),
+    _ = Depends(check_api_key_permission)
+):
+    """Pool, cache, replica and shared-state statistics (authenticated; scope metrics:read for API keys)"""
+    checks = {}
+    if ldap_conn.is_connected():
+        checks["ldap_pool"] = ldap_conn.pool_stats()
+        checks["ldap_entry_cache"] = ldap_conn.entry_cache.stats()
+        checks["ldap_server_info"] = server_info_cache.stats()
+    checks["auth_binds"] = auth_bind_pool.stats()
+    if settings.REPLICA_ENABLED:
+        checks["directory_replica"] = directory_replica.stats()
+    if settings.LDAP_NOTIFY_ENABLED:
+        checks["change_notifications"] = change_listener.state
+    checks["api_key_cache"] = api_key_manager.verified_keys.stats()
+    if settings.USER_DATASET_ENABLED:
+        checks["user_dataset"] = users_router.user_dataset.stats()
+    checks["cursor_snapshots"] = result_snapshots.stats()
+    try:
+        checks["shared_state"] = shared_state.stats()
+    except Exception as e:
+        logger.warning(f"Shared state health check failed: {e}")
+        checks["shared_state"] = {"backend": shared_state.name, "error": str(e)}
+    return checks
+
+@app.get("/api/health/change-notifications")
+async def change_notifications_status(
+    token_data = Depends(verify_token_or_api_key),
+    _ = Depends(check_api_key_permission)
+):
+    """Status of the AD change-notification listener (connection, backoff, event counts)"""
+    return change_listener.status()
+
+@app.get("/api/metrics/ldap")
+async def ldap_metrics_report(
+    format: str = Query("json", regex="^(json|prometheus)$"),
+    operation: Optional[str] = None,
+    source: Optional[str] = None,
+    token_data = Depends(verify_token_or_api_key),
+    _ = Depends(check_api_key_permission)
+):
+    """Per-operation LDAP latency/result-size histograms (JSON, or Prometheus text with format=prometheus; scrape with an API key that has metrics:read)"""
+    if format == "prometheus":
+        return PlainTextResponse(ldap_metrics.prometheus(), media_type="text/plain; version=0.0.4")
+    return ldap_metrics.snapshot(operation=operation, source=source)
+
+@app.get("/api/metrics/cache")
+async def cache_metrics_report(
+    namespace: Optional[str] = None,
+    token_data = Depends(verify_token_or_api_key),
+    _ = Depends(check_api_key_permission)
+):
+    """Response cache usage: entries, approximate bytes, and hits/misses/evictions per endpoint namespace"""
+    return cache.stats(namespace=namespace)
+
 if __name__ == "__main__":
     uvicorn.run(
         "app.main:app",
@@ -3,7 +3,7 @@ from typing import List, Optional
 import logging
 
 from app.routers.auth import verify_token
-from app.core.activity_log import activity_log_manager
+from app.core.activity_log import async_activity_log_manager
 from app.schemas.activity_logs import (
     EventLogData, ActivityLogResponse, ActivityLogListResponse, 
     StatsResponse, EventLogResponse, ActionTypeResponse
@@ -40,7 +40,7 @@ async def get_activity_logs(
     """
     logger.info(f"📋 Fetching activity logs: page={page}, page_size={page_size}")
     
-    result = activity_log_manager.get_activities(
+    result = await async_activity_log_manager.get_activities(
         page=page,
         page_size=page_size,
         user_id=user_id,
@@ -67,7 +67,7 @@ async def get_recent_activities(
     """
     logger.info(f"📋 Fetching {limit} recent activities")
     
-    result = activity_log_manager.get_activities(page=1, page_size=limit)
+    result = await async_activity_log_manager.get_activities(page=1, page_size=limit)
     
     return result['items']
 
@@ -91,7 +91,7 @@ async def get_activity_stats(
     """
     logger.info(f"📊 Fetching activity stats for last {days} days")
     
-    stats = activity_log_manager.get_stats(days=days)
+    stats = await async_activity_log_manager.get_stats(days=days)
     
     logger.info(f"✅ Stats: {stats['total_actions']} total actions")
     return stats
@@ -147,7 +147,7 @@ async def log_from_event(event_data: EventLogData, token_data = Depends(verify_t
         logger.info(f"   Action: {event_data.action_type}")
         
         # Log to activity database
-        result = activity_log_manager.log_activity(
+        result = await async_activity_log_manager.log_activity(
             user_id=event_data.subject_username,
             user_display_name=event_data.subject_username,
             action_type=event_data.action_type,
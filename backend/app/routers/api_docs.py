@@ -235,7 +235,8 @@ X-RateLimit-Reset: 1704067200"""
             "headers": [
                 "X-RateLimit-Limit: Maximum requests allowed",
                 "X-RateLimit-Remaining: Requests remaining",
-                "X-RateLimit-Reset: Unix timestamp when limit resets"
+                "X-RateLimit-Reset: Unix timestamp when limit resets",
+                "Retry-After: Seconds to wait before retrying (429 responses)"
             ]
         }
     }
@@ -6,7 +6,7 @@ from fastapi import APIRouter, Depends, status, Query
 from typing import Optional, List
 import logging
 
-from app.core.api_keys import api_key_manager
+from app.core.api_keys import async_api_key_manager
 from app.routers.auth import verify_token, TokenData
 from app.core.exceptions import NotFoundError, InternalServerError, ValidationError
 from app.schemas.api_keys import (
@@ -33,7 +33,7 @@ async def create_api_key(
         username = token_data.username
         
         # Create API key
-        result = api_key_manager.create_api_key(
+        result = await async_api_key_manager.create_api_key(
             name=key_data.name,
             created_by=username,
             permissions=key_data.permissions,
@@ -80,7 +80,7 @@ async def list_api_keys(
         username = token_data.username
         
         # For now, return all keys (can add admin check later)
-        keys = api_key_manager.get_api_keys()
+        keys = await async_api_key_manager.get_api_keys()
         
         # Convert to response models
         return [
@@ -113,7 +113,7 @@ async def get_api_key(
 ):
     """Get API key by ID"""
     try:
-        key = api_key_manager.get_api_key(key_id)
+        key = await async_api_key_manager.get_api_key(key_id)
         
         if not key:
             raise NotFoundError(f"API key not found: {key_id}")
@@ -149,12 +149,12 @@ async def update_api_key(
     """Update API key"""
     try:
         # Check if key exists
-        existing_key = api_key_manager.get_api_key(key_id)
+        existing_key = await async_api_key_manager.get_api_key(key_id)
         if not existing_key:
             raise NotFoundError(f"API key not found: {key_id}")
         
         # Update key
-        success = api_key_manager.update_api_key(
+        success = await async_api_key_manager.update_api_key(
             key_id=key_id,
             name=key_data.name,
             permissions=key_data.permissions,
@@ -169,7 +169,7 @@ async def update_api_key(
             raise InternalServerError("Failed to update API key")
         
         # Get updated key
-        updated_key = api_key_manager.get_api_key(key_id)
+        updated_key = await async_api_key_manager.get_api_key(key_id)
         
         return APIKeyResponse(
             id=updated_key["id"],
@@ -201,12 +201,12 @@ async def delete_api_key(
     """Delete API key"""
     try:
         # Check if key exists
-        existing_key = api_key_manager.get_api_key(key_id)
+        existing_key = await async_api_key_manager.get_api_key(key_id)
         if not existing_key:
             raise NotFoundError(f"API key not found: {key_id}")
         
         # Delete key
-        success = api_key_manager.delete_api_key(key_id)
+        success = await async_api_key_manager.delete_api_key(key_id)
         
         if not success:
             raise InternalServerError("Failed to delete API key")
@@ -233,12 +233,12 @@ async def rotate_api_key(
     """
     try:
         # Check if key exists
-        existing_key = api_key_manager.get_api_key(key_id)
+        existing_key = await async_api_key_manager.get_api_key(key_id)
         if not existing_key:
             raise NotFoundError(f"API key not found: {key_id}")
         
         # Regenerate the key (updates key_hash and key_prefix in place)
-        new_api_key, new_key_hash = api_key_manager.regenerate_api_key(key_id)
+        new_api_key, new_key_hash = await async_api_key_manager.regenerate_api_key(key_id)
         
         # Update description to note the rotation
         from datetime import datetime, timezone
@@ -248,7 +248,7 @@ async def rotate_api_key(
             rotation_description = f"{existing_key['description']} | {rotation_description}"
         
         # Update the key metadata (reset expiration, update description)
-        api_key_manager.update_api_key(
+        await async_api_key_manager.update_api_key(
             key_id=key_id,
             expires_at=None,  # Reset expiration
             description=rotation_description,
@@ -256,7 +256,7 @@ async def rotate_api_key(
         )
         
         # Get updated key info
-        updated_key = api_key_manager.get_api_key(key_id)
+        updated_key = await async_api_key_manager.get_api_key(key_id)
         
         # Build response
         key_response = APIKeyResponse(
@@ -299,12 +299,12 @@ async def get_api_key_stats(
     """Get usage statistics for an API key"""
     try:
         # Check if key exists
-        existing_key = api_key_manager.get_api_key(key_id)
+        existing_key = await async_api_key_manager.get_api_key(key_id)
         if not existing_key:
             raise NotFoundError(f"API key not found: {key_id}")
         
         # Get stats
-        stats = api_key_manager.get_usage_stats(key_id, days=days)
+        stats = await async_api_key_manager.get_usage_stats(key_id, days=days)
         
         return APIKeyUsageStats(
             total_requests=stats["total_requests"],
@@ -336,12 +336,12 @@ async def get_api_key_logs(
     """Get request logs for an API key"""
     try:
         # Check if key exists
-        existing_key = api_key_manager.get_api_key(key_id)
+        existing_key = await async_api_key_manager.get_api_key(key_id)
         if not existing_key:
             raise NotFoundError(f"API key not found: {key_id}")
         
         # Get logs
-        logs = api_key_manager.get_request_logs(
+        logs = await async_api_key_manager.get_request_logs(
             api_key_id=key_id,
             endpoint=endpoint,
             method=method,
@@ -401,7 +401,7 @@ async def get_all_logs(
     """Get all request logs (across all API keys)"""
     try:
         # Get logs without api_key_id filter
-        logs = api_key_manager.get_request_logs(
+        logs = await async_api_key_manager.get_request_logs(
             api_key_id=api_key_id,
             endpoint=endpoint,
             method=method,
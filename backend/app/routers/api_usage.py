@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, status, Query
 from typing import Optional
 import logging
 
-from app.core.api_usage import api_usage_logger
+from app.core.api_usage import async_api_usage_logger
 from app.routers.auth import verify_token, TokenData
 from app.core.exceptions import InternalServerError
 
@@ -18,7 +18,7 @@ async def get_usage_stats(
 ):
     """Get API usage statistics"""
     try:
-        stats = api_usage_logger.get_statistics(days=days, api_key_id=api_key_id)
+        stats = await async_api_usage_logger.get_statistics(days=days, api_key_id=api_key_id)
         return stats
     except Exception as e:
         logger.error(f"Error getting usage stats: {e}")
@@ -33,7 +33,7 @@ async def get_usage_by_key(
 ):
     """Get usage statistics for a specific API key"""
     try:
-        stats = api_usage_logger.get_usage_by_key(api_key_id=key_id, days=days)
+        stats = await async_api_usage_logger.get_usage_by_key(api_key_id=key_id, days=days)
         return stats
     except Exception as e:
         logger.error(f"Error getting usage by key: {e}")
@@ -48,7 +48,7 @@ async def get_endpoint_stats(
 ):
     """Get statistics by endpoint"""
     try:
-        stats = api_usage_logger.get_endpoint_stats(endpoint=endpoint, days=days)
+        stats = await async_api_usage_logger.get_endpoint_stats(endpoint=endpoint, days=days)
         return stats
     except Exception as e:
         logger.error(f"Error getting endpoint stats: {e}")
@@ -2,12 +2,12 @@ from fastapi import APIRouter, Depends, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi import Request as FastAPIRequest
 from typing import Optional
-from ldap3 import Server, Connection, ALL
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 import logging
 
 from app.core.config import settings
+from app.core.auth_bind import auth_bind_pool
 from app.core.database import get_ldap_connection
 from app.core.exceptions import UnauthorizedError, ForbiddenError
 from app.schemas.auth import LoginRequest, LoginResponse, TokenData, TokenVerifyResponse
@@ -155,26 +155,10 @@ def get_client_ip(request: Request) -> Optional[str]:
 async def login(login_data: LoginRequest, request: Request):
     """Authenticate user with LDAP"""
     try:
-        # Create LDAP connection for user authentication
-        server = Server(settings.LDAP_URL, get_info=ALL)
-        # Try binding with UPN (username@domain) first, then fallback to CN=username,... format
-        user_dn_candidates = [
-            f"{login_data.username}@{settings.LDAP_BASE_DN.replace('DC=', '').replace(',DC=', '.')}",
-            f"CN={login_data.username},CN=Users,{settings.LDAP_BASE_DN}"
-        ]
-
-        user_conn = None
-        last_error = None
-        for user_dn in user_dn_candidates:
-            try:
-                user_conn = Connection(server, user=user_dn, password=login_data.password, auto_bind=True)
-                break
-            except Exception as e:
-                last_error = e
-
-        if not user_conn:
-            logger.error(f"LDAP bind failed for user {login_data.username}: {last_error}")
-            from app.core.exceptions import UnauthorizedError
+        # Pooled rebind; tries the DN format (UPN or CN=...,CN=Users) that worked last time first
+        user_dn = await auth_bind_pool.authenticate(login_data.username, login_data.password)
+        if not user_dn:
+            logger.error(f"LDAP bind failed for user {login_data.username}")
             raise UnauthorizedError("Invalid username or password")
         
         # If successful, create JWT token
@@ -184,22 +168,6 @@ async def login(login_data: LoginRequest, request: Request):
             data={"sub": login_data.username}, expires_delta=access_token_expires_delta
         )
 
-        # Return the DN used for the authenticated user
-        user_dn = None
-        try:
-            # Connection.user may be a tuple or string depending on ldap3; fallback to candidate DN
-            if hasattr(user_conn, 'user') and user_conn.user:
-                user_dn = user_conn.user
-            else:
-                user_dn = f"CN={login_data.username},CN=Users,{settings.LDAP_BASE_DN}"
-        except Exception:
-            user_dn = f"CN={login_data.username},CN=Users,{settings.LDAP_BASE_DN}"
-
-        try:
-            user_conn.unbind()
-        except Exception:
-            pass
-
         return LoginResponse(
             access_token=access_token,
             token_type="bearer",
@@ -1,24 +1,28 @@
 from fastapi import APIRouter, Depends, Query, Request, status
 from typing import List, Optional, Dict, Any, Union
 from ldap3 import MODIFY_REPLACE, MODIFY_ADD, MODIFY_DELETE
+import asyncio
 import logging
 import json
-import time
 from pathlib import Path
 
 from app.core.config import settings
-from app.core.database import get_ldap_connection
+from app.core.database import get_async_ldap_connection
+from app.core.directory_replica import get_directory_replica, replica_freshness
+from app.core.group_membership import ADD, REMOVE, BulkMembershipJob
 from app.core.exceptions import NotFoundError, InternalServerError, ValidationError
 from app.routers.auth import verify_token, verify_token_or_api_key, get_client_ip, check_api_key_permission
-from app.core.activity_log import activity_log_manager
-from app.core.cache import cached_response, invalidate_cache
+from app.core.activity_log import async_activity_log_manager
+from app.core.cache import cached_response, invalidate_cache_async
 from app.core.responses import create_paginated_response
-from app.schemas.common import PaginatedResponse
+from app.core.pagination import paginate_by_cursor
+from app.schemas.common import CursorPaginatedResponse, PaginatedResponse
 from datetime import datetime, timedelta, timezone
 from app.schemas.groups import (
     GroupCreate, GroupUpdate, GroupResponse, GroupMemberAdd, GroupMemberRemove,
     GroupMemberResponse, GroupCreateResponse, GroupUpdateResponse, GroupDeleteResponse,
-    GroupMemberAddResponse, GroupMemberRemoveResponse, CategorizedGroupsResponse
+    GroupMemberAddResponse, GroupMemberRemoveResponse, CategorizedGroupsResponse,
+    BulkMembershipRequest, BulkMembershipResponse
 )
 from app.schemas.ous import DefaultGroupsByOUResponse
 
@@ -42,13 +46,17 @@ PSO_ATTRIBUTES = [
     "msDS-PSOAppliesTo"  # Groups/users this PSO applies to
 ]
 
+# Members of this group get accountExpires = pwdLastSet + 90 days
+PSO_90_DAYS_GROUP = "PSO-OU-90Days"
+
 # Helper functions
-def format_group_data(entry: tuple) -> Dict[str, Any]:
+def format_group_data(entry: tuple, member_count: Optional[int] = None) -> Dict[str, Any]:
     """Format LDAP group entry data for response with permissions info"""
     dn, attrs = entry
     
     members = attrs.get("member", [])
-    member_count = len(members)
+    if member_count is None:
+        member_count = len(members)
     
     # Parse groupType (AD stores as integer)
     # https://docs.microsoft.com/en-us/windows/win32/adschema/a-grouptype
@@ -153,10 +161,64 @@ def format_user_data(entry: tuple) -> Dict[str, Any]:
         "isEnabled": not is_disabled
     }
 
+async def sync_pso_account_expires(ldap_conn, user_dn: str, user_label: str, added: bool):
+    """Keep accountExpires in step with PSO-OU-90Days membership.
+
+    Added: expire 90 days after pwdLastSet. Removed: reset to 0 (never expires).
+    Failures are logged, never raised.
+    """
+    try:
+        if not added:
+            # Reset accountExpires to 0 (never expires)
+            user_modifications = [(MODIFY_REPLACE, "accountExpires", ["0"])]
+            if await ldap_conn.modify_entry(user_dn, user_modifications):
+                logger.info(f"✅ Reset accountExpires (never expires) for user {user_label} after removing from {PSO_90_DAYS_GROUP}")
+            else:
+                logger.warning(f"⚠️ Failed to reset accountExpires for user {user_label}: {ldap_conn.last_error or 'Unknown error'}")
+            return
+
+        # Get user's pwdLastSet (password last set date)
+        user_pwd_entry = await ldap_conn.read_entry(
+            user_dn,
+            ["pwdLastSet"],
+            object_filter="(objectClass=user)"
+        )
+        
+        if not user_pwd_entry:
+            logger.warning(f"⚠️ Could not fetch user data for {user_label}, skipping accountExpires update")
+            return
+        
+        pwd_last_set_raw = user_pwd_entry[1].get("pwdLastSet", [None])[0]
+        if not pwd_last_set_raw or pwd_last_set_raw == "0":
+            logger.warning(f"⚠️ User {user_label} has no pwdLastSet (password never set), skipping accountExpires update")
+            return
+        
+        # Import helper functions from users router
+        from app.routers.users import ad_timestamp_to_datetime, datetime_to_filetime
+        
+        # Parse pwdLastSet to datetime
+        pwd_last_set_dt = ad_timestamp_to_datetime(pwd_last_set_raw)
+        if not pwd_last_set_dt:
+            logger.warning(f"⚠️ Could not parse pwdLastSet for user {user_label}, skipping accountExpires update")
+            return
+        
+        # Calculate expiration: pwdLastSet + 90 days, in Windows FILETIME format
+        expiry_date = pwd_last_set_dt + timedelta(days=90)
+        filetime_str = datetime_to_filetime(expiry_date)
+        
+        # Update accountExpires attribute
+        user_modifications = [(MODIFY_REPLACE, "accountExpires", [filetime_str])]
+        if await ldap_conn.modify_entry(user_dn, user_modifications):
+            logger.info(f"✅ Updated accountExpires to {expiry_date.strftime('%Y-%m-%d')} (90 days from pwdLastSet {pwd_last_set_dt.strftime('%Y-%m-%d')}) for user {user_label}")
+        else:
+            logger.warning(f"⚠️ Failed to update accountExpires for user {user_label}: {ldap_conn.last_error or 'Unknown error'}")
+    except Exception as exp_error:
+        logger.error(f"Error updating accountExpires for user {user_label}: {exp_error}")
+
 # Routes
 @router.get(
     "",
-    response_model=Union[PaginatedResponse[GroupResponse], List[GroupResponse]],
+    response_model=Union[CursorPaginatedResponse[GroupResponse], PaginatedResponse[GroupResponse], List[GroupResponse]],
     summary="Get all groups",
     description="Retrieve a paginated list of groups from Active Directory with search capabilities",
     tags=["groups"]
@@ -169,9 +231,11 @@ async def get_groups(
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=50, ge=1, le=50000),  # Increased to 50000
     format: Optional[str] = Query("paginated", regex="^(paginated|simple)$"),  # Backward compatibility
+    include_members: bool = Query(True, description="Include member DNs; false returns memberCount only"),
+    cursor: Optional[str] = Query(None, description="Keyset pagination: empty to start, then the next_cursor of the previous page (ordered by cn)"),
 ):
     """Get all groups from Active Directory with real-time data"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         # Use centralized LDAP escape function from security module
@@ -183,26 +247,51 @@ async def get_groups(
         else:
             filter_str = "(objectClass=group)"
 
-        logger.info(f"🔍 Searching groups with filter: {filter_str}")
-        
-        results = ldap_conn.search(
-            settings.LDAP_BASE_DN,
-            filter_str,
-            ["cn", "description", "member", "groupType", "managedBy", "distinguishedName"]
-        )
-        
-        if results is None:
-            raise InternalServerError("Failed to search groups")
-        
-        logger.info(f"✅ LDAP returned {len(results)} groups from AD")
-        
-        groups_all = [format_group_data(entry) for entry in results]
-        
-        logger.info(f"📊 Formatted {len(groups_all)} groups (page_size={page_size})")
+        async def load_groups():
+            logger.info(f"🔍 Searching groups with filter: {filter_str}")
+            
+            # Member counts come from the replica when it is ready, so member DNs need not be downloaded
+            member_counts = None if include_members else get_directory_replica().member_counts()
+            attributes = ["cn", "description", "groupType", "managedBy", "distinguishedName"]
+            if member_counts is None:
+                attributes.append("member")
+            
+            results = await ldap_conn.search(
+                settings.LDAP_BASE_DN,
+                filter_str,
+                attributes
+            )
+            
+            if results is None:
+                raise InternalServerError("Failed to search groups")
+            
+            logger.info(f"✅ LDAP returned {len(results)} groups from AD")
+            
+            groups_all = []
+            for entry in results:
+                if member_counts is not None:
+                    group = format_group_data(entry, member_count=member_counts.get(entry[0].lower(), 0))
+                else:
+                    group = format_group_data(entry)
+                if not include_members:
+                    group["member"] = []
+                groups_all.append(group)
+            
+            logger.info(f"📊 Formatted {len(groups_all)} groups (page_size={page_size})")
+            
+            # Log unique parent OUs for debugging
+            unique_ous = set([g['parentOU'] for g in groups_all])
+            logger.info(f"📁 Found {len(unique_ous)} unique containers: {sorted(unique_ous)}")
+            
+            return groups_all
         
-        # Log unique parent OUs for debugging
-        unique_ous = set([g['parentOU'] for g in groups_all])
-        logger.info(f"📁 Found {len(unique_ous)} unique containers: {sorted(unique_ous)}")
+        if cursor is not None:
+            # Keyset pagination: later pages are sliced from the first page's snapshot
+            return await paginate_by_cursor(
+                "get_groups", {"q": q, "include_members": include_members}, cursor, page_size,
+                load_groups, lambda group: ((group.get("cn") or "").casefold(), (group.get("dn") or "").lower())
+            )
+        groups_all = await load_groups()
         
         total_groups = len(groups_all)
         
@@ -223,6 +312,8 @@ async def get_groups(
             page_size=page_size
         )
         
+    except ValidationError:
+        raise
     except Exception as e:
         logger.error(f"Error getting groups: {e}")
         raise InternalServerError("Failed to retrieve groups")
@@ -230,12 +321,12 @@ async def get_groups(
 @router.get("/categorized", response_model=CategorizedGroupsResponse)
 async def get_categorized_groups(token_data = Depends(verify_token)):
     """Get groups organized by category for user creation form"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         filter_str = "(objectClass=group)"
         
-        results = ldap_conn.search(
+        results = await ldap_conn.search(
             settings.LDAP_BASE_DN,
             filter_str,
             ["cn", "description", "member", "groupType", "managedBy", "distinguishedName"]
@@ -331,19 +422,19 @@ async def get_group(
     _ = Depends(check_api_key_permission)
 ):
     """Get specific group by DN"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
-        results = ldap_conn.search(
+        entry = await ldap_conn.read_entry(
             dn,
-            "(objectClass=group)",
-            ["*"]
+            ["*"],
+            object_filter="(objectClass=group)"
         )
         
-        if not results:
+        if not entry:
             raise NotFoundError("Group", dn)
         
-        return format_group_data(results[0])
+        return format_group_data(entry)
         
     except Exception as e:
         logger.error(f"Error getting group {dn}: {e}")
@@ -356,7 +447,7 @@ async def create_group(
     _ = Depends(check_api_key_permission)
 ):
     """Create new group in Active Directory with full AD support"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         # Determine container for group
@@ -421,15 +512,15 @@ async def create_group(
         logger.info(f"   Attributes: {list(group_attrs.keys())}")
 
         # Create group
-        if not ldap_conn.add_entry(group_dn, group_attrs):
-            error_msg = ldap_conn.connection.last_error if ldap_conn.connection else "Unknown error"
+        if not await ldap_conn.add_entry(group_dn, group_attrs):
+            error_msg = ldap_conn.last_error or "Unknown error"
             logger.error(f"❌ Failed to create group: {error_msg}")
             raise InternalServerError(f"Failed to create group: {error_msg}")
         
         logger.info(f"✅ Group created successfully: {group_dn}")
         
         # ⚡ Invalidate cache after creation
-        invalidate_cache("get_groups")
+        await invalidate_cache_async("get_groups")
         
         return GroupCreateResponse(
             success=True,
@@ -458,7 +549,7 @@ async def update_group(
     _ = Depends(check_api_key_permission)
 ):
     """Update group in Active Directory"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         modifications = []
@@ -469,11 +560,11 @@ async def update_group(
         if not modifications:
             raise ValidationError("No fields to update")
 
-        if not ldap_conn.modify_entry(dn, modifications):
+        if not await ldap_conn.modify_entry(dn, modifications):
             raise InternalServerError("Failed to update group")
         
         # ⚡ Invalidate cache after update
-        invalidate_cache("get_groups")
+        await invalidate_cache_async("get_groups")
         
         return GroupUpdateResponse(
             success=True,
@@ -493,14 +584,14 @@ async def delete_group(
     _ = Depends(check_api_key_permission)
 ):
     """Delete group from Active Directory"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
-        if not ldap_conn.delete_entry(dn):
+        if not await ldap_conn.delete_entry(dn):
             raise InternalServerError("Failed to delete group")
         
         # ⚡ Invalidate cache after deletion
-        invalidate_cache("get_groups")
+        await invalidate_cache_async("get_groups")
         
         return {
             "success": True,
@@ -521,40 +612,41 @@ async def get_group_members(
     _ = Depends(check_api_key_permission)
 ):
     """Get all members of a specific group"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         # First get the group to find its members
-        group_results = ldap_conn.search(
+        group_entry = await ldap_conn.read_entry(
             group_dn,
-            "(objectClass=group)",
-            ["member"]
+            ["member"],
+            object_filter="(objectClass=group)"
         )
         
-        if not group_results:
+        if not group_entry:
             raise NotFoundError("Group", dn)
         
-        group_entry = group_results[0]
         member_dns = group_entry[1].get("member", [])
         
         if not member_dns:
             return []
         
-        # Get detailed information for each member
+        # Get detailed information for all members in batched searches
+        resolved, _ = await ldap_conn.resolve_dns(
+            member_dns,
+            ["cn", "sAMAccountName", "displayName", "mail", "department", "userAccountControl"],
+            object_filter="(objectClass=user)"
+        )
+        
         members = []
         for member_dn in member_dns:
+            user_entry = resolved.get(member_dn)
+            if not user_entry:
+                continue
             try:
-                user_results = ldap_conn.search(
-                    member_dn,
-                    "(objectClass=user)",
-                    ["cn", "sAMAccountName", "displayName", "mail", "department", "userAccountControl"]
-                )
-                
-                if user_results:
-                    members.append(format_user_data(user_results[0]))
+                members.append(format_user_data(user_entry))
             except Exception as e:
-                logger.warning(f"Could not fetch details for member {member_dn}: {e}")
-                # Add basic info if detailed fetch fails
+                logger.warning(f"Could not format details for member {member_dn}: {e}")
+                # Add basic info if formatting fails
                 members.append({
                     "dn": member_dn,
                     "cn": member_dn.split(',')[0].replace('CN=', ''),
@@ -579,24 +671,24 @@ async def add_group_member(
     _ = Depends(check_api_key_permission)
 ):
     """Add a user to a group and verify memberOf is updated in AD"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         logger.info(f"Adding user to group: {member_data.user_dn} -> {group_dn}")
         
         # Verify that the user exists and get current memberOf
-        user_results = ldap_conn.search(
+        user_entry = await ldap_conn.read_entry(
             member_data.user_dn,
-            "(objectClass=user)",
-            ["cn", "sAMAccountName", "memberOf"]
+            ["cn", "sAMAccountName", "memberOf"],
+            object_filter="(objectClass=user)"
         )
         
-        if not user_results:
+        if not user_entry:
             raise NotFoundError("User", member_data.user_dn)
         
-        user_cn = user_results[0][1].get("cn", ["Unknown"])[0]
-        user_sam = user_results[0][1].get("sAMAccountName", ["Unknown"])[0]
-        old_member_of = user_results[0][1].get("memberOf", [])
+        user_cn = user_entry[1].get("cn", ["Unknown"])[0]
+        user_sam = user_entry[1].get("sAMAccountName", ["Unknown"])[0]
+        old_member_of = user_entry[1].get("memberOf", [])
         
         logger.info(f"User before: {user_sam} is member of {len(old_member_of)} groups")
         
@@ -617,24 +709,24 @@ async def add_group_member(
         # Add user to group by modifying the group's member attribute
         modifications = [(MODIFY_ADD, "member", [member_data.user_dn])]
         
-        if not ldap_conn.modify_entry(group_dn, modifications):
-            error_msg = ldap_conn.connection.last_error if ldap_conn.connection else "Unknown error"
+        if not await ldap_conn.modify_entry(group_dn, modifications):
+            error_msg = ldap_conn.last_error or "Unknown error"
             
             # Check if error is due to entry already existing (race condition or AD replication delay)
             if "entryAlreadyExists" in error_msg or "entry already exists" in error_msg.lower():
                 logger.info(f"User {user_sam} appears to already be a member (entryAlreadyExists). Verifying...")
                 
                 # Verify current membership status
-                time.sleep(0.3)  # Brief wait for AD replication
+                await asyncio.sleep(0.3)  # Brief wait for AD replication
                 
-                user_results_check = ldap_conn.search(
+                user_entry_check = await ldap_conn.read_entry(
                     member_data.user_dn,
-                    "(objectClass=user)",
-                    ["memberOf"]
+                    ["memberOf"],
+                    object_filter="(objectClass=user)"
                 )
                 
-                if user_results_check:
-                    current_member_of = user_results_check[0][1].get("memberOf", [])
+                if user_entry_check:
+                    current_member_of = user_entry_check[1].get("memberOf", [])
                     if group_dn in current_member_of:
                         logger.info(f"Verified: User {user_sam} is already a member. Returning success.")
                         group_cn = group_dn.split(',')[0].replace('CN=', '')
@@ -655,16 +747,16 @@ async def add_group_member(
         logger.info(f"Successfully modified group {group_dn}")
         
         # Verify that memberOf was updated in AD (check after modification)
-        time.sleep(0.5)  # Wait for AD to update memberOf attribute
+        await asyncio.sleep(0.5)  # Wait for AD to update memberOf attribute
         
-        user_results_after = ldap_conn.search(
+        user_entry_after = await ldap_conn.read_entry(
             member_data.user_dn,
-            "(objectClass=user)",
-            ["memberOf"]
+            ["memberOf"],
+            object_filter="(objectClass=user)"
         )
         
-        if user_results_after:
-            new_member_of = user_results_after[0][1].get("memberOf", [])
+        if user_entry_after:
+            new_member_of = user_entry_after[1].get("memberOf", [])
             logger.info(f"User after: {user_sam} is now member of {len(new_member_of)} groups")
             
             # Check if the group DN is in memberOf
@@ -673,52 +765,14 @@ async def add_group_member(
                 
                 # ⚡ Auto-update accountExpires for PSO-OU-90Days group
                 group_cn = group_dn.split(',')[0].replace('CN=', '')
-                if group_cn == "PSO-OU-90Days":
-                    try:
-                        # Get user's pwdLastSet (password last set date)
-                        user_pwd_results = ldap_conn.search(
-                            member_data.user_dn,
-                            "(objectClass=user)",
-                            ["pwdLastSet"]
-                        )
-                        
-                        if user_pwd_results:
-                            pwd_last_set_raw = user_pwd_results[0][1].get("pwdLastSet", [None])[0]
-                            
-                            if pwd_last_set_raw and pwd_last_set_raw != "0":
-                                # Import helper functions from users router
-                                from app.routers.users import ad_timestamp_to_datetime, datetime_to_filetime
-                                
-                                # Parse pwdLastSet to datetime
-                                pwd_last_set_dt = ad_timestamp_to_datetime(pwd_last_set_raw)
-                                
-                                if pwd_last_set_dt:
-                                    # Calculate expiration: pwdLastSet + 90 days
-                                    expiry_date = pwd_last_set_dt + timedelta(days=90)
-                                    
-                                    # Convert to Windows FILETIME format
-                                    filetime_str = datetime_to_filetime(expiry_date)
-                                    
-                                    # Update accountExpires attribute
-                                    user_modifications = [(MODIFY_REPLACE, "accountExpires", [filetime_str])]
-                                    if ldap_conn.modify_entry(member_data.user_dn, user_modifications):
-                                        logger.info(f"✅ Updated accountExpires to {expiry_date.strftime('%Y-%m-%d')} (90 days from pwdLastSet {pwd_last_set_dt.strftime('%Y-%m-%d')}) for user {user_sam}")
-                                    else:
-                                        logger.warning(f"⚠️ Failed to update accountExpires for user {user_sam}: {ldap_conn.connection.last_error if ldap_conn.connection else 'Unknown error'}")
-                                else:
-                                    logger.warning(f"⚠️ Could not parse pwdLastSet for user {user_sam}, skipping accountExpires update")
-                            else:
-                                logger.warning(f"⚠️ User {user_sam} has no pwdLastSet (password never set), skipping accountExpires update")
-                        else:
-                            logger.warning(f"⚠️ Could not fetch user data for {user_sam}, skipping accountExpires update")
-                    except Exception as exp_error:
-                        logger.error(f"Error updating accountExpires for user {user_sam}: {exp_error}")
+                if group_cn == PSO_90_DAYS_GROUP:
+                    await sync_pso_account_expires(ldap_conn, member_data.user_dn, user_sam, added=True)
             else:
                 logger.warning(f"Warning: memberOf not yet updated (may take a moment for AD replication)")
         
         # Log activity
         group_cn = group_dn.split(',')[0].replace('CN=', '')
-        activity_log_manager.log_activity(
+        await async_activity_log_manager.log_activity(
             user_id=token_data.username,
             action_type="group_member_add",
             target_type="group",
@@ -735,7 +789,7 @@ async def add_group_member(
             user_dn=member_data.user_dn,
             user_cn=user_cn,
             groups_before=len(old_member_of),
-            groups_after=len(new_member_of) if user_results_after else len(old_member_of)
+            groups_after=len(new_member_of) if user_entry_after else len(old_member_of)
         )
         
     except (NotFoundError, InternalServerError, ValidationError):
@@ -753,50 +807,49 @@ async def remove_group_member(
     _ = Depends(check_api_key_permission)
 ):
     """Remove a user from a group and verify memberOf is updated in AD"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         logger.info(f"Removing user from group: {member_data.user_dn} -> {group_dn}")
         
         # Get current memberOf before removal
-        user_results = ldap_conn.search(
+        user_entry = await ldap_conn.read_entry(
             member_data.user_dn,
-            "(objectClass=user)",
-            ["cn", "sAMAccountName", "memberOf"]
+            ["cn", "sAMAccountName", "memberOf"],
+            object_filter="(objectClass=user)"
         )
         
         user_cn = "Unknown"
         user_sam = "Unknown"
         old_member_of = []
         
-        if user_results:
-            user_cn = user_results[0][1].get("cn", ["Unknown"])[0]
-            user_sam = user_results[0][1].get("sAMAccountName", ["Unknown"])[0]
-            old_member_of = user_results[0][1].get("memberOf", [])
+        if user_entry:
+            user_cn = user_entry[1].get("cn", ["Unknown"])[0]
+            user_sam = user_entry[1].get("sAMAccountName", ["Unknown"])[0]
+            old_member_of = user_entry[1].get("memberOf", [])
             logger.info(f"User before: {user_sam} is member of {len(old_member_of)} groups")
         
         # Remove user from group by modifying the group's member attribute
         modifications = [(MODIFY_DELETE, "member", [member_data.user_dn])]
         
-        if not ldap_conn.modify_entry(group_dn, modifications):
-            error_msg = ldap_conn.connection.last_error if ldap_conn.connection else "Unknown error"
+        if not await ldap_conn.modify_entry(group_dn, modifications):
+            error_msg = ldap_conn.last_error or "Unknown error"
             logger.error(f"Failed to remove member: {error_msg}")
             raise InternalServerError(f"Failed to remove member from group: {error_msg}")
         
         logger.info(f"Successfully removed from group {group_dn}")
         
         # Verify that memberOf was updated in AD
-        import time
-        time.sleep(0.5)  # Wait for AD to update memberOf attribute
+        await asyncio.sleep(0.5)  # Wait for AD to update memberOf attribute
         
-        user_results_after = ldap_conn.search(
+        user_entry_after = await ldap_conn.read_entry(
             member_data.user_dn,
-            "(objectClass=user)",
-            ["memberOf"]
+            ["memberOf"],
+            object_filter="(objectClass=user)"
         )
         
-        if user_results_after:
-            new_member_of = user_results_after[0][1].get("memberOf", [])
+        if user_entry_after:
+            new_member_of = user_entry_after[1].get("memberOf", [])
             logger.info(f"User after: {user_sam} is now member of {len(new_member_of)} groups")
             
             # Check if the group DN is NOT in memberOf
@@ -805,22 +858,14 @@ async def remove_group_member(
                 
                 # ⚡ Reset accountExpires when removed from PSO-OU-90Days group
                 group_cn = group_dn.split(',')[0].replace('CN=', '')
-                if group_cn == "PSO-OU-90Days":
-                    try:
-                        # Reset accountExpires to 0 (never expires)
-                        user_modifications = [(MODIFY_REPLACE, "accountExpires", ["0"])]
-                        if ldap_conn.modify_entry(member_data.user_dn, user_modifications):
-                            logger.info(f"✅ Reset accountExpires (never expires) for user {user_sam} after removing from PSO-OU-90Days")
-                        else:
-                            logger.warning(f"⚠️ Failed to reset accountExpires for user {user_sam}: {ldap_conn.connection.last_error if ldap_conn.connection else 'Unknown error'}")
-                    except Exception as exp_error:
-                        logger.error(f"Error resetting accountExpires for user {user_sam}: {exp_error}")
+                if group_cn == PSO_90_DAYS_GROUP:
+                    await sync_pso_account_expires(ldap_conn, member_data.user_dn, user_sam, added=False)
             else:
                 logger.warning(f"Warning: memberOf still shows group (may take a moment for AD replication)")
         
         # Log activity
         group_cn = group_dn.split(',')[0].replace('CN=', '')
-        activity_log_manager.log_activity(
+        await async_activity_log_manager.log_activity(
             user_id=token_data.username,
             action_type="group_member_remove",
             target_type="group",
@@ -837,42 +882,123 @@ async def remove_group_member(
             "user_dn": member_data.user_dn,
             "user_cn": user_cn,
             "groups_before": len(old_member_of),
-            "groups_after": len(new_member_of) if user_results_after else len(old_member_of)
+            "groups_after": len(new_member_of) if user_entry_after else len(old_member_of)
         }
         
     except Exception as e:
         logger.error(f"Error removing member from group {group_dn}: {e}")
         raise InternalServerError("Failed to remove member from group")
 
+@router.post("/members/bulk", response_model=BulkMembershipResponse)
+async def bulk_update_group_members(
+    membership: BulkMembershipRequest,
+    request: Request,
+    token_data = Depends(verify_token_or_api_key),
+    _ = Depends(check_api_key_permission)
+):
+    """Add and remove many members across many groups in one call
+
+    Each entry in add/remove pairs every DN in group_dns with every DN in
+    member_dns. Changes are coalesced into one modify per group, groups are
+    updated in parallel, and every (group, member) pair gets its own result.
+    """
+    ldap_conn = get_async_ldap_connection()
+    
+    changes = [
+        (action, group_dn.strip(), member_dn.strip())
+        for action, operations in ((ADD, membership.add), (REMOVE, membership.remove))
+        for operation in operations
+        for group_dn in operation.group_dns
+        for member_dn in operation.member_dns
+    ]
+    if not changes:
+        raise ValidationError("No membership changes requested")
+    if len(changes) > settings.GROUP_BULK_MAX_CHANGES:
+        raise ValidationError(f"Too many membership changes ({len(changes)}); the limit is {settings.GROUP_BULK_MAX_CHANGES} per request")
+    
+    try:
+        logger.info(f"👥 Bulk membership update: {len(changes)} changes")
+        job = BulkMembershipJob(ldap_conn)
+        results = await job.run(changes)
+        
+        succeeded = [result for result in results if result["success"]]
+        failed = len(results) - len(succeeded)
+        logger.info(f"📊 Bulk membership: {len(succeeded)} succeeded, {failed} failed, {job.modify_operations} modify operations")
+        
+        if succeeded:
+            await invalidate_cache_async("get_groups")
+            await invalidate_cache_async("get_users")
+        
+        # ⚡ Keep accountExpires in step with PSO-OU-90Days membership
+        for result in succeeded:
+            if result["group_dn"].split(',')[0].replace('CN=', '') == PSO_90_DAYS_GROUP:
+                await sync_pso_account_expires(ldap_conn, result["member_dn"], result["member_dn"], added=result["action"] == ADD)
+        
+        # Log activity (one entry per group)
+        by_group: Dict[str, Dict[str, List[str]]] = {}
+        for result in results:
+            group_log = by_group.setdefault(result["group_dn"], {"added": [], "removed": [], "failed": []})
+            if not result["success"]:
+                group_log["failed"].append(result["member_dn"])
+            elif result["action"] == ADD:
+                group_log["added"].append(result["member_dn"])
+            else:
+                group_log["removed"].append(result["member_dn"])
+        for group_dn, details in by_group.items():
+            await async_activity_log_manager.log_activity(
+                user_id=token_data.username,
+                action_type="group_member_bulk",
+                target_type="group",
+                target_id=group_dn,
+                target_name=group_dn.split(',')[0].replace('CN=', ''),
+                details=details,
+                ip_address=get_client_ip(request),
+                status="failed" if details["failed"] else "success"
+            )
+        
+        return BulkMembershipResponse(
+            success=failed == 0,
+            message=f"{len(succeeded)} membership changes applied, {failed} failed",
+            succeeded=len(succeeded),
+            failed=failed,
+            modify_operations=job.modify_operations,
+            results=results
+        )
+        
+    except Exception as e:
+        logger.error(f"Error applying bulk membership changes: {e}")
+        raise InternalServerError("Failed to apply bulk membership changes")
+
 @router.get("/{group_dn}/available-users", response_model=List[GroupMemberResponse])
 async def get_available_users_for_group(
     group_dn: str, 
     token_data = Depends(verify_token_or_api_key),
-    _ = Depends(check_api_key_permission)
+    _ = Depends(check_api_key_permission),
+    _replica = Depends(replica_freshness)
 ):
     """Get users that can be added to the group (not already members)"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
+    directory = get_directory_replica()
     
     try:
         logger.info(f"👥 Getting available users for group: {group_dn}")
         
         # First get current group members
-        group_results = ldap_conn.search(
+        group_entry = await ldap_conn.read_entry(
             group_dn,
-            "(objectClass=group)",
-            ["member"]
+            ["member"],
+            object_filter="(objectClass=group)"
         )
         
-        if not group_results:
+        if not group_entry:
             raise NotFoundError("Group", dn)
         
-        group_entry = group_results[0]
         current_member_dns = set(group_entry[1].get("member", []))
         logger.info(f"  Current members: {len(current_member_dns)}")
         
-        # Get all users (force fresh query, no cache)
+        # Get all users (replica when fresh; the app's own writes trigger an immediate poll)
         # Search in ALL possible locations (CN=Users, OUs, etc.)
-        user_results = ldap_conn.search(
+        user_results = await directory.search(
             settings.LDAP_BASE_DN,
             "(objectClass=user)",
             ["cn", "sAMAccountName", "displayName", "mail", "department", "userAccountControl"]
@@ -921,7 +1047,7 @@ async def get_available_users_for_group(
 @router.get("/pso/{group_name}")
 async def get_pso_settings(group_name: str, token_data = Depends(verify_token)):
     """Get Password Settings Object (PSO) configuration for a specific group"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         # Search for PSO object in AD
@@ -933,7 +1059,7 @@ async def get_pso_settings(group_name: str, token_data = Depends(verify_token)):
         
         logger.info(f"Searching for PSO: {group_name} in {pso_base}")
         
-        pso_results = ldap_conn.search(
+        pso_results = await ldap_conn.search(
             pso_base,
             pso_filter,
             PSO_ATTRIBUTES
@@ -942,7 +1068,7 @@ async def get_pso_settings(group_name: str, token_data = Depends(verify_token)):
         if not pso_results or len(pso_results) == 0:
             # Try searching in entire domain if not found in default location
             logger.info(f"PSO not found in default location, searching entire domain...")
-            pso_results = ldap_conn.search(
+            pso_results = await ldap_conn.search(
                 settings.LDAP_BASE_DN,
                 pso_filter,
                 PSO_ATTRIBUTES
@@ -959,8 +1085,17 @@ async def get_pso_settings(group_name: str, token_data = Depends(verify_token)):
             value = attrs.get(name, [default])[0] if attrs.get(name) else default
             return value
         
+        def interval_seconds(value):
+            """AD interval attributes are negative 100-nanosecond counts"""
+            if not value or value == "0":
+                return value
+            try:
+                return str(abs(int(value)) // 10_000_000)
+            except (ValueError, TypeError):
+                return value
+        
         # Convert msDS-MaximumPasswordAge from negative seconds to days
-        max_age_seconds = get_attr("msDS-MaximumPasswordAge")
+        max_age_seconds = interval_seconds(get_attr("msDS-MaximumPasswordAge"))
         max_age_days = None
         if max_age_seconds and max_age_seconds != "0":
             try:
@@ -970,7 +1105,7 @@ async def get_pso_settings(group_name: str, token_data = Depends(verify_token)):
                 pass
         
         # Convert msDS-MinimumPasswordAge from negative seconds to days
-        min_age_seconds = get_attr("msDS-MinimumPasswordAge")
+        min_age_seconds = interval_seconds(get_attr("msDS-MinimumPasswordAge"))
         min_age_days = None
         if min_age_seconds and min_age_seconds != "0":
             try:
@@ -979,7 +1114,7 @@ async def get_pso_settings(group_name: str, token_data = Depends(verify_token)):
                 pass
         
         # Convert lockout duration and observation window from negative seconds to minutes
-        lockout_duration_seconds = get_attr("msDS-LockoutDuration")
+        lockout_duration_seconds = interval_seconds(get_attr("msDS-LockoutDuration"))
         lockout_duration_minutes = None
         if lockout_duration_seconds and lockout_duration_seconds != "0":
             try:
@@ -987,7 +1122,7 @@ async def get_pso_settings(group_name: str, token_data = Depends(verify_token)):
             except (ValueError, TypeError):
                 pass
         
-        lockout_window_seconds = get_attr("msDS-LockoutObservationWindow")
+        lockout_window_seconds = interval_seconds(get_attr("msDS-LockoutObservationWindow"))
         lockout_window_minutes = None
         if lockout_window_seconds and lockout_window_seconds != "0":
             try:
@@ -1011,8 +1146,8 @@ async def get_pso_settings(group_name: str, token_data = Depends(verify_token)):
                 },
                 "minimumPasswordLength": get_attr("msDS-MinimumPasswordLength", 0),
                 "passwordHistoryLength": get_attr("msDS-PasswordHistoryLength", 0),
-                "passwordComplexityEnabled": bool(get_attr("msDS-PasswordComplexityEnabled", False)),
-                "passwordReversibleEncryptionEnabled": bool(get_attr("msDS-PasswordReversibleEncryptionEnabled", False))
+                "passwordComplexityEnabled": str(get_attr("msDS-PasswordComplexityEnabled", "")).upper() == "TRUE",
+                "passwordReversibleEncryptionEnabled": str(get_attr("msDS-PasswordReversibleEncryptionEnabled", "")).upper() == "TRUE"
             },
             "lockoutPolicy": {
                 "lockoutThreshold": get_attr("msDS-LockoutThreshold", 0),
@@ -1040,13 +1175,13 @@ async def get_pso_settings(group_name: str, token_data = Depends(verify_token)):
 @router.post("/pso/{group_name}/sync-account-expires")
 async def sync_account_expires_for_pso_group(group_name: str, token_data = Depends(verify_token)):
     """Update accountExpires for all users in PSO group based on their pwdLastSet + 90 days"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         from app.routers.users import ad_timestamp_to_datetime, datetime_to_filetime
         
         # Find the group DN
-        group_results = ldap_conn.search(
+        group_results = await ldap_conn.search(
             settings.LDAP_BASE_DN,
             f"(&(objectClass=group)(cn={group_name}))",
             ["member", "cn"]
@@ -1073,20 +1208,17 @@ async def sync_account_expires_for_pso_group(group_name: str, token_data = Depen
         failed_count = 0
         skipped_count = 0
         
-        for member_dn in members:
+        # Get every member's pwdLastSet in batched searches
+        resolved, missing = await ldap_conn.resolve_dns(
+            members,
+            ["pwdLastSet", "sAMAccountName"],
+            object_filter="(objectClass=user)"
+        )
+        skipped_count += len(missing)
+        
+        for member_dn, user_entry in resolved.items():
             try:
-                # Get user's pwdLastSet
-                user_results = ldap_conn.search(
-                    member_dn,
-                    "(objectClass=user)",
-                    ["pwdLastSet", "sAMAccountName"]
-                )
-                
-                if not user_results:
-                    skipped_count += 1
-                    continue
-                
-                user_attrs = user_results[0][1]
+                user_attrs = user_entry[1]
                 user_sam = user_attrs.get("sAMAccountName", ["Unknown"])[0]
                 pwd_last_set_raw = user_attrs.get("pwdLastSet", [None])[0]
                 
@@ -1108,7 +1240,7 @@ async def sync_account_expires_for_pso_group(group_name: str, token_data = Depen
                 
                 # Update accountExpires
                 user_modifications = [(MODIFY_REPLACE, "accountExpires", [filetime_str])]
-                if ldap_conn.modify_entry(member_dn, user_modifications):
+                if await ldap_conn.modify_entry(member_dn, user_modifications):
                     logger.info(f"✅ Updated accountExpires for {user_sam}: {expiry_date.strftime('%Y-%m-%d')}")
                     updated_count += 1
                 else:
@@ -4,13 +4,14 @@ from ldap3 import MODIFY_REPLACE
 import logging
 
 from app.core.config import settings
-from app.core.database import get_ldap_connection
+from app.core.database import get_async_ldap_connection
 from app.core.exceptions import NotFoundError, InternalServerError, ValidationError
 from app.routers.auth import verify_token, verify_token_or_api_key, get_client_ip
-from app.core.activity_log import activity_log_manager
-from app.core.cache import cached_response, invalidate_cache
+from app.core.activity_log import async_activity_log_manager
+from app.core.cache import cached_response, invalidate_cache_async
 from app.core.responses import create_paginated_response
-from app.schemas.common import PaginatedResponse
+from app.core.pagination import paginate_by_cursor
+from app.schemas.common import CursorPaginatedResponse, PaginatedResponse
 from app.core.ldap_security import ldap_escape
 from app.schemas.ous import (
     OUCreate, OUUpdate, OUResponse, OUCreateResponse, OUUpdateResponse,
@@ -34,7 +35,7 @@ def format_ou_data(entry: tuple) -> Dict[str, Any]:
 # Routes
 @router.get(
     "",
-    response_model=Union[PaginatedResponse[OUResponse], List[OUResponse]],
+    response_model=Union[CursorPaginatedResponse[OUResponse], PaginatedResponse[OUResponse], List[OUResponse]],
     summary="Get all OUs",
     description="Retrieve a paginated list of Organizational Units from Active Directory with search capabilities",
     tags=["ous"]
@@ -46,9 +47,10 @@ async def get_ous(
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=50, ge=1, le=50000),  # Increased to support large OU lists
     format: Optional[str] = Query("paginated", regex="^(paginated|simple)$"),  # Backward compatibility
+    cursor: Optional[str] = Query(None, description="Keyset pagination: empty to start, then the next_cursor of the previous page (ordered by name)"),
 ):
     """Get all Organizational Units from Active Directory"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         if q:
@@ -57,16 +59,25 @@ async def get_ous(
         else:
             filter_str = "(objectClass=organizationalUnit)"
 
-        results = ldap_conn.search(
-            settings.LDAP_BASE_DN,
-            filter_str,
-            ["ou", "description"]
-        )
-        
-        if results is None:
-            raise InternalServerError("Failed to search OUs")
+        async def load_ous():
+            results = await ldap_conn.search(
+                settings.LDAP_BASE_DN,
+                filter_str,
+                ["ou", "description"]
+            )
+            
+            if results is None:
+                raise InternalServerError("Failed to search OUs")
+            
+            return [format_ou_data(entry) for entry in results]
         
-        ous_all = [format_ou_data(entry) for entry in results]
+        if cursor is not None:
+            # Keyset pagination: later pages are sliced from the first page's snapshot
+            return await paginate_by_cursor(
+                "get_ous", {"q": q}, cursor, page_size,
+                load_ous, lambda ou: ((ou.get("name") or "").casefold(), (ou.get("dn") or "").lower())
+            )
+        ous_all = await load_ous()
         total_ous = len(ous_all)
         
         # Backward compatibility: Return simple array if format=simple or page_size >= 1000
@@ -86,6 +97,8 @@ async def get_ous(
             page_size=page_size
         )
         
+    except ValidationError:
+        raise
     except Exception as e:
         logger.error(f"Error getting OUs: {e}")
         raise InternalServerError("Failed to retrieve OUs")
@@ -93,12 +106,12 @@ async def get_ous(
 @router.get("/user-ous", response_model=List[Dict[str, Any]])
 async def get_user_ous(token_data = Depends(verify_token)):
     """Get OUs suitable for creating users (excludes Computers, Groups, Wifi, etc.)"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         filter_str = "(objectClass=organizationalUnit)"
         
-        results = ldap_conn.search(
+        results = await ldap_conn.search(
             settings.LDAP_BASE_DN,
             filter_str,
             ["ou", "description"]
@@ -179,13 +192,13 @@ async def get_suggested_groups_for_ou(
     Analyze users in an OU and suggest groups based on what majority of users have.
     Returns groups where >= threshold% of users are members.
     """
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         logger.info(f"🔍 Analyzing groups for OU: {dn} (threshold: {threshold*100}%)")
         
         # Step 1: Get all users in this OU (search in subtree - SUBTREE is default in wrapper)
-        user_results = ldap_conn.search(
+        user_results = await ldap_conn.search(
             dn,
             "(objectClass=user)",
             ["cn", "sAMAccountName", "memberOf"]
@@ -221,33 +234,36 @@ async def get_suggested_groups_for_ou(
         # Step 3: Calculate percentages and filter by threshold
         suggested_groups = []
         
-        for group_dn, count in group_counts.items():
+        # Get details for all groups above the threshold in batched searches
+        qualifying = {
+            group_dn: count for group_dn, count in group_counts.items()
+            if count / total_users >= threshold
+        }
+        resolved, missing = await ldap_conn.resolve_dns(
+            list(qualifying),
+            ["cn", "description"],
+            object_filter="(objectClass=group)"
+        )
+        if missing:
+            logger.warning(f"Could not fetch details for {len(missing)} groups: {missing[:5]}")
+        
+        for group_dn, count in qualifying.items():
+            group_entry = resolved.get(group_dn)
+            if not group_entry:
+                continue
             percentage = count / total_users
+            group_attrs = group_entry[1]
+            cn = group_attrs.get("cn", ["Unknown"])[0] if group_attrs.get("cn") else "Unknown"
+            description = group_attrs.get("description", [""])[0] if group_attrs.get("description") else ""
             
-            if percentage >= threshold:
-                # Get group details
-                try:
-                    group_results = ldap_conn.search(
-                        group_dn,
-                        "(objectClass=group)",
-                        ["cn", "description"]
-                    )
-                    
-                    if group_results:
-                        group_attrs = group_results[0][1]
-                        cn = group_attrs.get("cn", ["Unknown"])[0]
-                        description = group_attrs.get("description", [""])[0]
-                        
-                        suggested_groups.append({
-                            "dn": group_dn,
-                            "cn": cn,
-                            "description": description,
-                            "userCount": count,
-                            "totalUsers": total_users,
-                            "percentage": round(percentage * 100, 1)
-                        })
-                except Exception as e:
-                    logger.warning(f"Could not fetch details for group {group_dn}: {e}")
+            suggested_groups.append({
+                "dn": group_dn,
+                "cn": cn,
+                "description": description,
+                "userCount": count,
+                "totalUsers": total_users,
+                "percentage": round(percentage * 100, 1)
+            })
         
         # Step 4: Sort by percentage (highest first)
         suggested_groups.sort(key=lambda x: x["percentage"], reverse=True)
@@ -268,19 +284,19 @@ async def get_suggested_groups_for_ou(
 @router.get("/{dn}", response_model=OUResponse)
 async def get_ou(dn: str, token_data = Depends(verify_token)):
     """Get specific OU by DN"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
-        results = ldap_conn.search(
+        entry = await ldap_conn.read_entry(
             dn,
-            "(objectClass=organizationalUnit)",
-            ["*"]
+            ["*"],
+            object_filter="(objectClass=organizationalUnit)"
         )
         
-        if not results:
+        if not entry:
             raise NotFoundError("OU", dn)
         
-        return format_ou_data(results[0])
+        return format_ou_data(entry)
         
     except Exception as e:
         logger.error(f"Error getting OU {dn}: {e}")
@@ -289,7 +305,7 @@ async def get_ou(dn: str, token_data = Depends(verify_token)):
 @router.post("", response_model=OUCreateResponse, status_code=status.HTTP_201_CREATED)
 async def create_ou(ou_data: OUCreate, request: Request, token_data = Depends(verify_token)):
     """Create new Organizational Unit in Active Directory"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         # Prepare OU DN
@@ -305,14 +321,14 @@ async def create_ou(ou_data: OUCreate, request: Request, token_data = Depends(ve
             ou_attrs["description"] = [ou_data.description]
 
         # Create OU
-        if not ldap_conn.add_entry(ou_dn, ou_attrs):
+        if not await ldap_conn.add_entry(ou_dn, ou_attrs):
             raise InternalServerError("Failed to create OU")
         
         # ⚡ Invalidate cache after creation
-        invalidate_cache("get_ous")
+        await invalidate_cache_async("get_ous")
         
         # Log activity
-        activity_log_manager.log_activity(
+        await async_activity_log_manager.log_activity(
             user_id=token_data.username,
             action_type="ou_create",
             target_type="ou",
@@ -342,7 +358,7 @@ async def create_ou(ou_data: OUCreate, request: Request, token_data = Depends(ve
 @router.put("/{dn}", response_model=OUUpdateResponse)
 async def update_ou(dn: str, ou_data: OUUpdate, request: Request, token_data = Depends(verify_token)):
     """Update Organizational Unit in Active Directory"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         modifications = []
@@ -353,15 +369,15 @@ async def update_ou(dn: str, ou_data: OUUpdate, request: Request, token_data = D
         if not modifications:
             raise ValidationError("No fields to update")
 
-        if not ldap_conn.modify_entry(dn, modifications):
+        if not await ldap_conn.modify_entry(dn, modifications):
             raise InternalServerError("Failed to update OU")
         
         # ⚡ Invalidate cache after update
-        invalidate_cache("get_ous")
+        await invalidate_cache_async("get_ous")
         
         # Log activity
         ou_name = dn.split(',')[0].replace('OU=', '')
-        activity_log_manager.log_activity(
+        await async_activity_log_manager.log_activity(
             user_id=token_data.username,
             action_type="ou_update",
             target_type="ou",
@@ -386,19 +402,19 @@ async def update_ou(dn: str, ou_data: OUUpdate, request: Request, token_data = D
 @router.delete("/{dn}", response_model=OUDeleteResponse)
 async def delete_ou(dn: str, request: Request, token_data = Depends(verify_token)):
     """Delete Organizational Unit from Active Directory"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         ou_name = dn.split(',')[0].replace('OU=', '')
         
-        if not ldap_conn.delete_entry(dn):
+        if not await ldap_conn.delete_entry(dn):
             raise InternalServerError("Failed to delete OU")
         
         # ⚡ Invalidate cache after deletion
-        invalidate_cache("get_ous")
+        await invalidate_cache_async("get_ous")
         
         # Log activity
-        activity_log_manager.log_activity(
+        await async_activity_log_manager.log_activity(
             user_id=token_data.username,
             action_type="ou_delete",
             target_type="ou",
@@ -8,15 +8,23 @@ import re
 import platform
 import subprocess
 import base64
+import heapq
 
 from app.core.config import settings
-from app.core.database import get_ldap_connection
+from app.core.database import get_ldap_connection, get_async_ldap_connection, LDAPSearchError
+from app.core.executors import ldap_executor, run_blocking
+from app.core.directory_replica import directory_replica, get_directory_replica, replica_freshness
+from app.core.group_membership import ADD, BulkMembershipJob
 from app.core.exceptions import NotFoundError, InternalServerError, ValidationError
 from app.routers.auth import verify_token, verify_token_or_api_key, get_client_ip, check_api_key_permission
-from app.core.cache import cached_response, invalidate_cache
-from app.core.activity_log import activity_log_manager
+from app.core.cache import cached_response, invalidate_cache_async
+from app.core.user_dataset import UserDataset
+from app.core.shared_state import shared_state
+from app.core.activity_log import async_activity_log_manager
 from app.core.responses import create_paginated_response
-from app.schemas.common import PaginatedResponse
+from app.core.pagination import START_CURSORS, paginate_by_cursor
+from app.core.etags import check_not_modified, derived_etag
+from app.schemas.common import CursorPaginatedResponse, PaginatedResponse
 from app.core.ldap_security import ldap_escape, sanitize_dn, validate_search_filter
 from app.schemas.users import (
     UserCreate, UserUpdate, UserResponse, UserStatsResponse, LoginInsightEntry,
@@ -148,6 +156,11 @@ def parse_when_created(value: Optional[str]) -> Optional[datetime]:
         logger.debug(f"Failed to parse whenCreated '{value}': {exc}")
     return None
 
+def format_when_created(value: Optional[str]) -> Optional[str]:
+    """whenCreated as "YYYY-MM-DD HH:MM:SS+00:00" (the form ldap3 used to decode it to; sorts as text)"""
+    dt = parse_when_created(value)
+    return str(dt.astimezone(timezone.utc)) if dt else None
+
 def parse_logon_count(value: Optional[str]) -> int:
     if not value:
         return 0
@@ -178,6 +191,14 @@ def is_likely_system_account(username: Optional[str], display_name: Optional[str
 
     return False
 
+def is_system_account_entry(attrs) -> bool:
+    """is_likely_system_account() applied to raw LDAP attributes"""
+    return is_likely_system_account(
+        (attrs.get("sAMAccountName") or [None])[0],
+        (attrs.get("displayName") or attrs.get("cn") or [None])[0],
+        (attrs.get("mail") or [None])[0]
+    )
+
 def build_login_insight_entry(entry: tuple) -> LoginInsightEntry:
     dn, attrs = entry
     username = (attrs.get("sAMAccountName") or [None])[0]
@@ -233,38 +254,16 @@ def format_user_data(entry: tuple, full_details: bool = True) -> Dict[str, Any]:
                     logger.debug(f"  {attr_name} = {attr_value}")
     
     def get_attr(attr_name: str, default: str = "") -> str:
-        """Helper to get first value from attribute"""
-        # Try exact match first
-        if attr_name in attrs:
-            attr_values = attrs.get(attr_name)
-            if attr_values and len(attr_values) > 0:
-                result = attr_values[0]
-                # Handle bytes encoding
-                if isinstance(result, bytes):
-                    try:
-                        result = result.decode('utf-8', errors='ignore')
-                    except:
-                        result = str(result)
-                # Return if not empty
-                if result and str(result).strip():
-                    return str(result).strip()
-        
-        # Try case-insensitive match (LDAP attributes are case-insensitive)
-        attr_name_lower = attr_name.lower()
-        for key in attrs.keys():
-            if key.lower() == attr_name_lower:
-                attr_values = attrs.get(key)
-                if attr_values and len(attr_values) > 0:
-                    result = attr_values[0]
-                    # Handle bytes encoding
-                    if isinstance(result, bytes):
-                        try:
-                            result = result.decode('utf-8', errors='ignore')
-                        except:
-                            result = str(result)
-                    # Return if not empty
-                    if result and str(result).strip():
-                        return str(result).strip()
+        """Helper to get first value from attribute (search results map names case-insensitively)"""
+        attr_values = attrs.get(attr_name)
+        if attr_values:
+            result = attr_values[0]
+            # Binary attributes are returned as bytes
+            if isinstance(result, bytes):
+                result = result.decode('utf-8', errors='ignore')
+            # Return if not empty
+            if result and str(result).strip():
+                return str(result).strip()
         
         return default
     
@@ -428,7 +427,7 @@ def format_user_data(entry: tuple, full_details: bool = True) -> Dict[str, Any]:
             "postalCode": get_attr("postalCode") or None,
             "co": get_attr("co") or None,
             "memberOf": attrs.get("memberOf", []),
-            "whenCreated": get_attr("whenCreated") or None,
+            "whenCreated": format_when_created(get_attr("whenCreated") or None),
             "whenChanged": when_changed_dt.isoformat() if when_changed_dt else None,
             "lastLogon": last_logon_dt.isoformat() if last_logon_dt else None,
             "pwdLastSet": pwd_last_set_dt.isoformat() if pwd_last_set_dt else None,
@@ -439,7 +438,7 @@ def format_user_data(entry: tuple, full_details: bool = True) -> Dict[str, Any]:
         # Note: accountExpires is already in result (line 278) - no need to add again
         result.update({
             "memberOf": attrs.get("memberOf", []),  # Include for group count/display
-            "whenCreated": get_attr("whenCreated") or None,  # keep for sorting/filtering
+            "whenCreated": format_when_created(get_attr("whenCreated") or None),  # keep for sorting/filtering
             "whenChanged": when_changed_dt.isoformat() if when_changed_dt else None,  # Include for display
             "lastLogon": last_logon_dt.isoformat() if last_logon_dt else None,  # Include for display
             "pwdLastSet": pwd_last_set_dt.isoformat() if pwd_last_set_dt else None,  # Include for display
@@ -450,15 +449,110 @@ def format_user_data(entry: tuple, full_details: bool = True) -> Dict[str, Any]:
     
     return result
 
+# Attributes fetched for the users list view
+USER_LIST_ATTRIBUTES = [
+    "cn", "sAMAccountName", "mail", "displayName", "title", "department", "company",
+    "physicalDeliveryOfficeName", "description", "userAccountControl", "pwdLastSet", "givenName",
+    "sn", "telephoneNumber", "mobile", "employeeID", "streetAddress", "l", "st", "postalCode",
+    "co", "whenCreated", "whenChanged", "lastLogon", "lastLogonTimestamp", "memberOf",
+    "logonCount", "userPrincipalName", "manager", "accountExpires", "extensionName",
+]
+
+# List-view field -> LDAP attribute it is built from (fields not listed are always returned)
+USER_LIST_FIELD_SOURCES = {
+    "cn": "cn", "sAMAccountName": "sAMAccountName", "mail": "mail", "displayName": "displayName",
+    "department": "department", "company": "company", "title": "title", "description": "description",
+    "physicalDeliveryOfficeName": "physicalDeliveryOfficeName", "userPrincipalName": "userPrincipalName",
+    "manager": "manager", "accountExpires": "accountExpires", "extensionName": "extensionName",
+    "memberOf": "memberOf", "whenCreated": "whenCreated", "whenChanged": "whenChanged",
+    "lastLogon": "lastLogon", "pwdLastSet": "pwdLastSet", "logonCount": "logonCount",
+    "employeeID": "employeeID", "userAccountControl": "userAccountControl", "isEnabled": "userAccountControl",
+    "passwordMustChange": "userAccountControl", "userCannotChangePassword": "userAccountControl",
+    "passwordNeverExpires": "userAccountControl", "storePasswordReversible": "userAccountControl",
+}
+
+def project_user_fields(users: List[Dict[str, Any]], attributes: List[str]) -> List[Dict[str, Any]]:
+    """List-view users with only the given LDAP attributes filled in (others get their empty value)"""
+    empty = format_user_data(("", {}), full_details=False)
+    selected = set(attributes)
+    dropped = [key for key, source in USER_LIST_FIELD_SOURCES.items() if source not in selected]
+    projected = []
+    for user in users:
+        user = dict(user)
+        for key in dropped:
+            user[key] = empty[key]
+        projected.append(user)
+    return projected
+
+def paginate_user_list(users_all: List[Dict[str, Any]], page: Optional[int], page_size: Optional[int], format: Optional[str]):
+    """All users, or one page of them, in the shape get_users returns"""
+    total_users = len(users_all)
+    
+    # If page or page_size is not provided, return all users
+    if page is None or page_size is None:
+        logger.info(f"🚀 Returning ALL {total_users} users (no pagination specified)")
+        return users_all
+    
+    # Backward compatibility: Return simple array if format=simple or page_size >= 1000
+    if format == "simple" or page_size >= 1000:
+        logger.info(f"🚀 Returning ALL {total_users} users to frontend (simple format)")
+        return users_all
+    
+    # Return paginated response
+    start = (page - 1) * page_size
+    end = start + page_size
+    paginated_items = users_all[start:end]
+    
+    return create_paginated_response(
+        items=paginated_items,
+        total=total_users,
+        page=page,
+        page_size=page_size
+    )
+
+def user_sort_key(user: Dict[str, Any]) -> tuple:
+    """List order (newest first when reversed); the DN makes it total for keyset pagination"""
+    return (user.get("whenCreated") or "", (user.get("dn") or "").lower())
+
+def build_user_list(results: List[tuple]) -> List[Dict[str, Any]]:
+    """Format, drop system accounts and sort newest first (CPU-bound: seconds for tens of thousands of users)"""
+    users = [format_user_data(entry, full_details=False) for entry in results if not is_system_account_entry(entry[1])]
+    users.sort(key=user_sort_key, reverse=True)
+    return users
+
+async def load_user_list() -> List[Dict[str, Any]]:
+    """Every list-view user under LDAP_BASE_DN, newest first (one directory or replica read)"""
+    results = await get_directory_replica().search(
+        settings.LDAP_BASE_DN,
+        "(&(objectClass=user)(!(sAMAccountName=*$)))",
+        USER_LIST_ATTRIBUTES
+    )
+    if results is None:
+        raise LDAPSearchError("Failed to search users")
+    return await run_blocking(ldap_executor, build_user_list, results)
+
+# ⚡ One in-memory copy of all users answers every get_users filter/page/fields combination
+user_dataset = UserDataset(
+    load_user_list,
+    cache_name="get_users",
+    ttl=settings.USER_DATASET_TTL,
+    retry_interval=settings.CACHE_REFRESH_RETRY_INTERVAL,
+    version=lambda: directory_replica.generation if directory_replica.ready else None,
+    shared=shared_state
+)
+
+# The dataset already answers every combination; per-query response caching is only needed without it
+users_list_cache = (lambda func: func) if settings.USER_DATASET_ENABLED else cached_response(ttl_seconds=600)
+
 # Routes
 @router.get(
     "/",
-    response_model=Union[PaginatedResponse[UserResponse], List[UserResponse]],
+    response_model=Union[CursorPaginatedResponse[UserResponse], PaginatedResponse[UserResponse], List[UserResponse]],
     summary="Get all users",
     description="Retrieve a paginated list of users from Active Directory with advanced search and filtering capabilities. Use 'fields' parameter to select specific attributes for better performance. If page and page_size are not provided, returns all users.",
     tags=["users"]
 )
-@cached_response(ttl_seconds=600)  # ⚡ Cache for 10 minutes (เพิ่มความเร็ว)
+@users_list_cache  # ⚡ Cache for 10 minutes when the user dataset is off (เพิ่มความเร็ว)
 async def get_users(
     q: Optional[str] = None,
     department: Optional[str] = None,
@@ -467,6 +561,7 @@ async def get_users(
     page_size: Optional[int] = Query(None, ge=1, le=50000),
     format: Optional[str] = Query("paginated", regex="^(paginated|simple)$"),  # Backward compatibility
     fields: Optional[str] = Query(None, description="Comma-separated list of fields to return (e.g., 'cn,mail,displayName'). If not specified, returns all fields."),
+    cursor: Optional[str] = Query(None, description="Keyset pagination: empty to start, then the next_cursor of the previous page (page_size items per page, default 50)"),
     # Advanced search parameters
     search_mode: Optional[str] = Query("contains", regex="^(contains|starts_with|exact|ends_with)$"),
     search_name: Optional[str] = None,
@@ -476,8 +571,10 @@ async def get_users(
     search_title: Optional[str] = None,
     search_department: Optional[str] = None,
     search_office: Optional[str] = None,
+    request: Request = None,
     token_data = Depends(verify_token_or_api_key),
-    _ = Depends(check_api_key_permission)
+    _ = Depends(check_api_key_permission),
+    _replica = Depends(replica_freshness)
 ):
     """Get all users from Active Directory with advanced search support
     
@@ -492,6 +589,8 @@ async def get_users(
     Pagination:
     - If page and page_size are not provided, returns all users (no pagination)
     - If page_size >= 1000 or format=simple, returns all users in simple array format
+    - cursor (takes precedence): pass an empty cursor for the first page, then next_cursor; pages come
+      from a snapshot taken on the first page, ordered by (whenCreated, dn) newest first
     
     Search Modes:
     - contains: *text* (default)
@@ -506,7 +605,14 @@ async def get_users(
     
     Performance: Use 'fields' parameter to reduce response size and improve query performance
     """
-    ldap_conn = get_ldap_connection()
+    directory = get_directory_replica()
+    # Parameters that define the result set; a cursor is only valid for the query that issued it
+    cursor_params = {
+        "q": q, "department": department, "ou": ou, "fields": fields, "search_mode": search_mode,
+        "search_name": search_name, "search_username": search_username, "search_email": search_email,
+        "search_display_name": search_display_name, "search_title": search_title,
+        "search_department": search_department, "search_office": search_office,
+    }
     
     try:
         # Use centralized LDAP escape function from security module
@@ -593,39 +699,7 @@ async def get_users(
             logger.info(f"🔍 Searching users with filter: {filter_str} (mode: {search_mode})")
         
         # Define all available attributes
-        all_attributes = [
-            "cn",
-            "sAMAccountName",
-            "mail",
-            "displayName",
-            "title",
-            "department",
-            "company",
-            "physicalDeliveryOfficeName",
-            "description",
-            "userAccountControl",
-            "pwdLastSet",
-            "givenName",
-            "sn",
-            "telephoneNumber",
-            "mobile",
-            "employeeID",
-            "streetAddress",
-            "l",
-            "st",
-            "postalCode",
-            "co",
-            "whenCreated",
-            "whenChanged",
-            "lastLogon",
-            "lastLogonTimestamp",
-            "memberOf",
-            "logonCount",
-            "userPrincipalName",
-            "manager",
-            "accountExpires",
-            "extensionName"
-        ]
+        all_attributes = USER_LIST_ATTRIBUTES
         
         # ⚡ PERFORMANCE: Field selection - only fetch requested fields
         if fields:
@@ -700,9 +774,102 @@ async def get_users(
             logger.warning(f"Invalid search filter: {e}")
             raise ValidationError(f"Invalid search filter: {str(e)}")
         
+        # ⚡ PERFORMANCE: Filter, scope, page and project the in-memory user dataset instead of searching AD
+        if settings.USER_DATASET_ENABLED:
+            field_terms = [
+                (attribute, value) for attribute, value in (
+                    ("cn", search_name),
+                    ("sAMAccountName", search_username),
+                    ("mail", search_email),
+                    ("displayName", search_display_name),
+                    ("title", search_title),
+                    ("department", search_department),
+                    ("physicalDeliveryOfficeName", search_office),
+                ) if value
+            ]
+            any_of = []
+            if q and not field_terms:
+                any_of = [(attribute, q) for attribute in ("cn", "sAMAccountName", "mail", "displayName")]
+            all_of = field_terms + ([("department", department)] if department else [])
+            
+            async def load_matching_users():
+                matched = await user_dataset.query(
+                    search_base if ou else None,
+                    all_of=all_of,
+                    any_of=any_of,
+                    search_mode=search_mode
+                )
+                return project_user_fields(matched, attributes_to_fetch) if fields else matched
+            
+            if cursor is not None and cursor not in START_CURSORS:
+                # Keyset pagination: later pages are sliced from the first page's snapshot
+                result = await paginate_by_cursor("get_users", cursor_params, cursor, page_size or 50,
+                                                  load_matching_users, user_sort_key, descending=True)
+                # A snapshot never changes, so its id, the cursor and the page size determine the page
+                etag = derived_etag("get_users", result.snapshot, cursor, page_size)
+                return check_not_modified(request, etag) or result
+            
+            # The dataset content and the parameters determine the response: answer If-None-Match before querying
+            dataset_etag = await user_dataset.current_etag()
+            if cursor is not None:
+                # First page of a walk: a new snapshot id every time, so the ETag is weak and keyed on the data
+                not_modified = check_not_modified(
+                    request, derived_etag("get_users", dataset_etag, cursor_params, page_size, weak=True)
+                )
+                if not_modified is not None:
+                    return not_modified
+                result = await paginate_by_cursor("get_users", cursor_params, cursor, page_size or 50,
+                                                  load_matching_users, user_sort_key, descending=True)
+                if user_dataset.etag != dataset_etag:
+                    check_not_modified(request, derived_etag("get_users", user_dataset.etag, cursor_params, page_size, weak=True))
+                return result
+
+            not_modified = check_not_modified(
+                request, derived_etag("get_users", dataset_etag, cursor_params, page, page_size, format)
+            )
+            if not_modified is not None:
+                return not_modified
+            users_all = await load_matching_users()
+            if user_dataset.etag != dataset_etag:
+                # Reloaded in between: the header must describe the data this body was built from
+                check_not_modified(request, derived_etag("get_users", user_dataset.etag, cursor_params, page, page_size, format))
+            logger.info(f"✅ User dataset matched {len(users_all)} users")
+            return paginate_user_list(users_all, page, page_size, format)
+        
+        # ⚡ PERFORMANCE: For one page of the list, let AD sort by whenCreated and return just that page
+        # (server-side sort + VLV) instead of pulling every user. The replica already holds everything
+        # in memory, and DCs that reject the controls fall through to the full search below.
+        paginated = page is not None and page_size is not None and format != "simple" and page_size < 1000
+        if paginated and settings.LDAP_VLV_ENABLED and not directory.ready:
+            sorted_page = await get_async_ldap_connection().search_sorted_page(
+                search_base,
+                filter_str,
+                attributes_to_fetch,
+                sort_attribute="whenCreated",
+                reverse=True,
+                offset=(page - 1) * page_size,
+                count=page_size
+            )
+            if sorted_page is not None:
+                entries, total_estimate = sorted_page
+                # System accounts are dropped after paging, so a page can come back slightly short
+                # and the total is AD's content count estimate
+                paginated_items = [
+                    format_user_data(entry, full_details=False)
+                    for entry in entries
+                    if not is_system_account_entry(entry[1])
+                ]
+                logger.info(f"🚀 Returning page {page} ({len(paginated_items)} users) of ~{total_estimate} via server-side sort/VLV")
+                return create_paginated_response(
+                    items=paginated_items,
+                    total=total_estimate,
+                    page=page,
+                    page_size=page_size
+                )
+
         # Use OU DN as search base if provided (searches in OU and all sub-OUs)
-        # The ldap_conn.search() wrapper already uses SUBTREE scope by default
-        results = ldap_conn.search(
+        # The await directory.search() wrapper already uses SUBTREE scope by default
+        results = await directory.search(
             search_base,
             filter_str,
             attributes_to_fetch
@@ -749,14 +916,8 @@ async def get_users(
         dept_num_count = 0
         for entry in results:
             dn, attrs = entry
-            username = (attrs.get("sAMAccountName") or [None])[0]
-            display_name = (attrs.get("displayName") or attrs.get("cn") or [None])[0]
-            email = (attrs.get("mail") or [None])[0]
-            # Skip computer accounts (username ending with $)
-            if username and username.endswith("$"):
-                continue
-            # Additional safety check using is_likely_system_account
-            if is_likely_system_account(username, display_name, email):
+            # Skip computer accounts (username ending with $) and other likely system accounts
+            if is_system_account_entry(attrs):
                 continue
             
             # Check if extensionName exists in raw attributes
@@ -772,53 +933,41 @@ async def get_users(
         users_all.sort(key=lambda u: u.get('whenCreated') or '', reverse=True)
         logger.info(f"📊 Formatted and sorted {len(users_all)} users by creation date (newest first)")
         
-        total_users = len(users_all)
-        
-        # If page or page_size is not provided, return all users
-        if page is None or page_size is None:
-            logger.info(f"🚀 Returning ALL {total_users} users (no pagination specified)")
-            return users_all
-        
-        # Backward compatibility: Return simple array if format=simple or page_size >= 1000
-        if format == "simple" or page_size >= 1000:
-            logger.info(f"🚀 Returning ALL {total_users} users to frontend (simple format)")
-            return users_all
-        
-        # Return paginated response
-        start = (page - 1) * page_size
-        end = start + page_size
-        paginated_items = users_all[start:end]
-        
-        return create_paginated_response(
-            items=paginated_items,
-            total=total_users,
-            page=page,
-            page_size=page_size
-        )
+        if cursor is not None:
+            return await paginate_by_cursor("get_users", cursor_params, cursor, page_size or 50,
+                                            lambda: users_all, user_sort_key, descending=True)
+        return paginate_user_list(users_all, page, page_size, format)
         
+    except ValidationError:
+        raise
     except Exception as e:
         logger.error(f"Error getting users: {e}")
         raise InternalServerError("Failed to retrieve users")
 
 
 @router.get("/stats", response_model=UserStatsResponse)
-async def get_user_stats(token: str = Depends(verify_token)):
-    """Return real-time user counts from Active Directory"""
-    ldap_conn = get_ldap_connection()
+async def get_user_stats(request: Request, token: str = Depends(verify_token), _replica = Depends(replica_freshness)):
+    """Return real-time user counts from Active Directory
+
+    The ETag is weak: it validates the counts, while every body carries its own fetched_at.
+    """
+    directory = get_directory_replica()
+    # Counts only change with the replicated data: a matching If-None-Match skips the scan
+    version = directory.version
+    if version is not None:
+        not_modified = check_not_modified(request, derived_etag("get_user_stats", version, weak=True))
+        if not_modified is not None:
+            return not_modified
     try:
-        results = ldap_conn.search(
+        total_users = 0
+        disabled_users = 0
+
+        async for _, attrs in directory.iter_search(
             settings.LDAP_BASE_DN,
             "(&(objectCategory=person)(objectClass=user)(!(sAMAccountName=*$)))",
             ["userAccountControl"]
-        )
-
-        if results is None:
-            raise InternalServerError("Failed to search users")
-
-        total_users = len(results)
-        disabled_users = 0
-
-        for _, attrs in results:
+        ):
+            total_users += 1
             uac_values = attrs.get("userAccountControl", [])
             is_disabled = False
             for value in uac_values:
@@ -833,12 +982,20 @@ async def get_user_stats(token: str = Depends(verify_token)):
 
         enabled_users = max(total_users - disabled_users, 0)
 
+        if version is None:
+            # Read from LDAP: the counts themselves are the validator (fetched_at differs, hence weak)
+            not_modified = check_not_modified(request, derived_etag("get_user_stats", total_users, disabled_users, weak=True))
+            if not_modified is not None:
+                return not_modified
+
         return UserStatsResponse(
             total_users=total_users,
             enabled_users=enabled_users,
             disabled_users=disabled_users,
             fetched_at=datetime.now().astimezone()
         )
+    except LDAPSearchError:
+        raise InternalServerError("Failed to search users")
     except (NotFoundError, InternalServerError, ValidationError):
         raise
     except Exception as e:
@@ -849,12 +1006,15 @@ async def get_user_stats(token: str = Depends(verify_token)):
 @router.get("/login-insights/recent", response_model=List[LoginInsightEntry])
 async def get_recent_logins(
     limit: int = Query(10, ge=1, le=100),
-    token_data = Depends(verify_token_or_api_key)
+    token_data = Depends(verify_token_or_api_key),
+    _replica = Depends(replica_freshness)
 ):
     """Return top N users with the most recent logins"""
-    ldap_conn = get_ldap_connection()
+    directory = get_directory_replica()
     try:
-        results = ldap_conn.search(
+        # Keep only the running top N while streaming pages
+        insights: List[LoginInsightEntry] = []
+        async for page in directory.iter_search_pages(
             settings.LDAP_BASE_DN,
             "(&(objectCategory=person)(objectClass=user))",
             [
@@ -868,26 +1028,19 @@ async def get_recent_logins(
                 "logonCount",
                 "whenCreated"
             ]
-        )
-
-        if results is None:
-            raise InternalServerError("Failed to search users")
-
-        insights: List[LoginInsightEntry] = []
-        for entry in results:
-            record = build_login_insight_entry(entry)
-            if is_likely_system_account(record.username, record.display_name, record.email):
-                continue
-            if not record.last_login:
-                continue
-            insights.append(record)
-
-        insights.sort(
-            key=lambda item: item.last_login or datetime.min.replace(tzinfo=timezone.utc),
-            reverse=True
-        )
+        ):
+            for entry in page:
+                record = build_login_insight_entry(entry)
+                if is_likely_system_account(record.username, record.display_name, record.email):
+                    continue
+                if not record.last_login:
+                    continue
+                insights.append(record)
+            insights = heapq.nlargest(limit, insights, key=lambda item: item.last_login)
 
-        return insights[:limit]
+        return insights
+    except LDAPSearchError:
+        raise InternalServerError("Failed to search users")
     except (NotFoundError, InternalServerError, ValidationError):
         raise
     except Exception as e:
@@ -898,12 +1051,15 @@ async def get_recent_logins(
 @router.get("/login-insights/never", response_model=List[LoginInsightEntry])
 async def get_users_single_login(
     limit: int = Query(10, ge=1, le=100),
-    token_data = Depends(verify_token_or_api_key)
+    token_data = Depends(verify_token_or_api_key),
+    _replica = Depends(replica_freshness)
 ):
     """Return top N users who have logged in only once (first login with no subsequent logins)"""
-    ldap_conn = get_ldap_connection()
+    directory = get_directory_replica()
     try:
-        results = ldap_conn.search(
+        # Keep only the running top N while streaming pages
+        insights: List[LoginInsightEntry] = []
+        async for page in directory.iter_search_pages(
             settings.LDAP_BASE_DN,
             "(&(objectCategory=person)(objectClass=user))",
             [
@@ -917,28 +1073,21 @@ async def get_users_single_login(
                 "logonCount",
                 "whenCreated"
             ]
-        )
-
-        if results is None:
-            raise InternalServerError("Failed to search users")
-
-        insights: List[LoginInsightEntry] = []
-        for entry in results:
-            record = build_login_insight_entry(entry)
-            if is_likely_system_account(record.username, record.display_name, record.email):
-                continue
-
-            if record.logon_count <= 1 and record.last_login:
-                # Treat the only recorded login as both first/last login
-                record.first_login = record.last_login
-                insights.append(record)
+        ):
+            for entry in page:
+                record = build_login_insight_entry(entry)
+                if is_likely_system_account(record.username, record.display_name, record.email):
+                    continue
 
-        insights.sort(
-            key=lambda item: item.last_login or datetime.max.replace(tzinfo=timezone.utc),
-            reverse=False
-        )
+                if record.logon_count <= 1 and record.last_login:
+                    # Treat the only recorded login as both first/last login
+                    record.first_login = record.last_login
+                    insights.append(record)
+            insights = heapq.nsmallest(limit, insights, key=lambda item: item.last_login)
 
-        return insights[:limit]
+        return insights
+    except LDAPSearchError:
+        raise InternalServerError("Failed to search users")
     except (NotFoundError, InternalServerError, ValidationError):
         raise
     except Exception as e:
@@ -947,12 +1096,12 @@ async def get_users_single_login(
 
 
 @router.get("/departments", response_model=List[str])
-async def get_departments(token: str = Depends(verify_token)):
+async def get_departments(token: str = Depends(verify_token), _replica = Depends(replica_freshness)):
     """Return unique list of departments found in AD users"""
-    ldap_conn = get_ldap_connection()
+    directory = get_directory_replica()
     try:
         # Optimized: Only fetch users with department attribute (exclude computer accounts)
-        results = ldap_conn.search(
+        results = await directory.search(
             settings.LDAP_BASE_DN,
             "(&(objectClass=user)(!(sAMAccountName=*$))(department=*))",
             ["department"]
@@ -983,14 +1132,14 @@ async def get_departments(token: str = Depends(verify_token)):
 
 
 @router.get("/groups", response_model=List[Dict[str, str]])
-async def get_groups(token: str = Depends(verify_token)):
+async def get_groups(token: str = Depends(verify_token), _replica = Depends(replica_freshness)):
     """Return list of groups (cn and dn) from AD"""
-    ldap_conn = get_ldap_connection()
+    directory = get_directory_replica()
     try:
-        results = ldap_conn.search(
+        results = await directory.search(
             settings.LDAP_BASE_DN,
             "(objectClass=group)",
-            ["cn", "member"]
+            ["cn"]
         )
 
         if results is None:
@@ -1013,10 +1162,10 @@ async def get_groups(token: str = Depends(verify_token)):
 @router.get("/groups/members", response_model=List[UserResponse])
 async def get_group_members(group_dn: str, token: str = Depends(verify_token)):
     """Return members of a given group DN"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     try:
         # Search the group to get member attribute values (DNs)
-        results = ldap_conn.search(
+        results = await ldap_conn.search(
             group_dn,
             "(objectClass=group)",
             ["member"]
@@ -1027,21 +1176,18 @@ async def get_group_members(group_dn: str, token: str = Depends(verify_token)):
 
         dn, attrs = results[0]
         members = attrs.get("member", [])
-        user_entries = []
-        # For each member DN, fetch user attributes
-        for member_dn in members:
-            user_res = ldap_conn.search(
-                member_dn,
-                "(objectClass=user)",
-                ["cn", "sAMAccountName", "mail", "displayName", "givenName", "sn", 
-                 "title", "telephoneNumber", "mobile", "department", "company", 
-                 "employeeID", "physicalDeliveryOfficeName", "streetAddress", "l", 
-                 "st", "postalCode", "co", "description",
-                 "userAccountControl", "memberOf", "whenCreated", "whenChanged", 
-                 "lastLogon", "pwdLastSet"]
-            )
-            if user_res:
-                user_entries.append(format_user_data(user_res[0]))
+        # Fetch user attributes for all member DNs in batched searches
+        resolved, _ = await ldap_conn.resolve_dns(
+            members,
+            ["cn", "sAMAccountName", "mail", "displayName", "givenName", "sn", 
+             "title", "telephoneNumber", "mobile", "department", "company", 
+             "employeeID", "physicalDeliveryOfficeName", "streetAddress", "l", 
+             "st", "postalCode", "co", "description",
+             "userAccountControl", "memberOf", "whenCreated", "whenChanged", 
+             "lastLogon", "pwdLastSet"],
+            object_filter="(objectClass=user)"
+        )
+        user_entries = [format_user_data(resolved[member_dn]) for member_dn in members if member_dn in resolved]
 
         return user_entries
     except Exception as e:
@@ -1068,26 +1214,26 @@ async def get_user(
     except ValueError as e:
         raise ValidationError(f"Invalid DN format: {str(e)}")
     
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         # Fetch all attributes for single user view
-        results = ldap_conn.search(
+        entry = await ldap_conn.read_entry(
             dn,
-            "(objectClass=user)",
             ["cn", "sAMAccountName", "mail", "displayName", "givenName", "sn", 
              "title", "telephoneNumber", "mobile", "department", "company", 
              "employeeID", "extensionName", "physicalDeliveryOfficeName", "streetAddress", "l", 
              "st", "postalCode", "co", "description",
              "userAccountControl", "memberOf", "whenCreated", "whenChanged", 
              "lastLogon", "lastLogonTimestamp", "pwdLastSet", "logonCount",
-             "userPrincipalName", "manager", "accountExpires"]
+             "userPrincipalName", "manager", "accountExpires"],
+            object_filter="(objectClass=user)"
         )
         
-        if not results:
+        if not entry:
             raise NotFoundError("User", dn)
         
-        return format_user_data(results[0], full_details=True)
+        return format_user_data(entry, full_details=True)
         
     except Exception as e:
         logger.error(f"Error getting user {dn}: {e}")
@@ -1117,7 +1263,7 @@ async def create_user(
     logger.info(f"   ou: {user_data.ou}")
     logger.info(f"   groups: {len(user_data.groups) if user_data.groups else 0}")
     
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         # Determine OU for user creation
@@ -1204,7 +1350,7 @@ async def create_user(
             user_attrs["description"] = [user_data.description]
         
         # Create user
-        if not ldap_conn.add_entry(user_dn, user_attrs):
+        if not await ldap_conn.add_entry(user_dn, user_attrs):
             raise InternalServerError("Failed to create user")
         
         logger.info(f"✅ User entry created (disabled): {user_dn}")
@@ -1219,7 +1365,7 @@ async def create_user(
             logger.info(f"🔑 Method 1: Setting password via LDAP...")
             password_mod = [(MODIFY_REPLACE, "unicodePwd", [f'"{user_data.password}"'.encode("utf-16le")])]
             
-            if ldap_conn.modify_entry(user_dn, password_mod):
+            if await ldap_conn.modify_entry(user_dn, password_mod):
                 logger.info(f"✅ Password set via LDAP")
                 password_set_success = True
                 password_method = "LDAP"
@@ -1233,7 +1379,7 @@ async def create_user(
         if not password_set_success and platform.system() == "Windows":
             logger.info(f"🔑 Method 2: Setting password via PowerShell ADSI...")
             try:
-                if set_password_via_powershell(user_dn, user_data.password):
+                if await run_blocking(ldap_executor, set_password_via_powershell, user_dn, user_data.password):
                     password_set_success = True
                     password_method = "PowerShell ADSI"
                     logger.info(f"✅ Password set via PowerShell ADSI")
@@ -1245,7 +1391,7 @@ async def create_user(
             try:
                 final_uac = 512  # Normal account, enabled
                 enable_mod = [(MODIFY_REPLACE, "userAccountControl", [str(final_uac)])]
-                if ldap_conn.modify_entry(user_dn, enable_mod):
+                if await ldap_conn.modify_entry(user_dn, enable_mod):
                     account_enabled = True
                     logger.info(f"✅ Account enabled for {user_dn}")
                 else:
@@ -1262,21 +1408,17 @@ async def create_user(
         if user_data.groups and len(user_data.groups) > 0:
             logger.info(f"👥 Assigning user to {len(user_data.groups)} groups...")
             
-            for group_dn in user_data.groups:
-                try:
-                    # Add user DN to group's member attribute
-                    group_mod = [(ldap3.MODIFY_ADD, "member", [user_dn])]
-                    
-                    if ldap_conn.modify_entry(group_dn, group_mod):
-                        groups_assigned.append(group_dn)
-                        logger.info(f"  ✅ Added to group: {group_dn}")
-                    else:
-                        groups_failed.append(group_dn)
-                        logger.warning(f"  ⚠️ Failed to add to group: {group_dn}")
-                        
-                except Exception as group_error:
-                    groups_failed.append(group_dn)
-                    logger.warning(f"  ⚠️ Error adding to group {group_dn}: {group_error}")
+            # One modify per group, all groups in parallel
+            results = await BulkMembershipJob(ldap_conn).run(
+                (ADD, group_dn, user_dn) for group_dn in user_data.groups
+            )
+            for result in results:
+                if result["success"]:
+                    groups_assigned.append(result["group_dn"])
+                    logger.info(f"  ✅ Added to group: {result['group_dn']}")
+                else:
+                    groups_failed.append(result["group_dn"])
+                    logger.warning(f"  ⚠️ Failed to add to group {result['group_dn']}: {result['error']}")
             
             logger.info(f"📊 Group assignment: {len(groups_assigned)} successful, {len(groups_failed)} failed")
         
@@ -1301,13 +1443,13 @@ async def create_user(
             response_message += f". Failed to assign to {len(groups_failed)} group(s)"
         
         # Invalidate cache after user creation
-        invalidate_cache("get_users")
-        invalidate_cache("/api/users")
-        invalidate_cache("/api/users")
-        invalidate_cache("/api/users")
+        await invalidate_cache_async("get_users")
+        await invalidate_cache_async("/api/users")
+        await invalidate_cache_async("/api/users")
+        await invalidate_cache_async("/api/users")
         
         # Log activity
-        activity_log_manager.log_activity(
+        await async_activity_log_manager.log_activity(
             user_id=token_data.username,
             action_type="user_create",
             target_type="user",
@@ -1363,7 +1505,7 @@ async def update_user(
     _ = Depends(check_api_key_permission)
 ):
     """Update user in Active Directory"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         logger.info(f"📝 Updating user: {dn}")
@@ -1372,9 +1514,9 @@ async def update_user(
         # Get current user data BEFORE modification (for logging changes)
         old_data = {}
         try:
-            current_user = ldap_conn.search(dn, "(objectClass=user)", ["*"])
-            if current_user and len(current_user) > 0:
-                old_attrs = current_user[0][1]
+            current_user = await ldap_conn.read_entry(dn, ["*"], object_filter="(objectClass=user)")
+            if current_user:
+                old_attrs = current_user[1]
                 user_dict = user_data.dict(exclude_unset=True)
                 for field in user_dict.keys():
                     field_value = old_attrs.get(field, [])
@@ -1399,9 +1541,9 @@ async def update_user(
         # Handle account options update (if any provided)
         if account_options:
             # Get current userAccountControl
-            current_user_result = ldap_conn.search(dn, "(objectClass=user)", ["userAccountControl"])
-            if current_user_result and len(current_user_result) > 0:
-                current_uac = int(current_user_result[0][1].get("userAccountControl", ["0"])[0])
+            current_user_result = await ldap_conn.read_entry(dn, ["userAccountControl"], object_filter="(objectClass=user)")
+            if current_user_result:
+                current_uac = int(current_user_result[1].get("userAccountControl", ["0"])[0])
                 
                 # Parse current account options
                 current_options = parse_account_options(current_uac)
@@ -1459,7 +1601,7 @@ async def update_user(
                     new_rdn = f"CN={new_cn_stripped}"
                     parent_dn = ','.join(dn.split(',')[1:])
                     logger.info(f"🔄 Renaming DN from {dn} to {new_rdn},{parent_dn}")
-                    if not ldap_conn.rename_entry(dn, new_rdn, new_superior=parent_dn):
+                    if not await ldap_conn.rename_entry(dn, new_rdn, new_superior=parent_dn):
                         raise InternalServerError("Failed to rename user (CN change)")
                     changes.append({
                         "field": "cn",
@@ -1513,9 +1655,9 @@ async def update_user(
             sam_account_name = None
             try:
                 # Get current user to extract sAMAccountName
-                current_user = ldap_conn.search(dn, "(objectClass=user)", ["sAMAccountName"])
-                if current_user and len(current_user) > 0:
-                    attrs = current_user[0][1]
+                current_user = await ldap_conn.read_entry(dn, ["sAMAccountName"], object_filter="(objectClass=user)")
+                if current_user:
+                    attrs = current_user[1]
                     sam_account_name = attrs.get("sAMAccountName", [None])[0]
             except Exception as e:
                 logger.warning(f"Could not extract sAMAccountName: {e}")
@@ -1526,7 +1668,7 @@ async def update_user(
                 encoded_password = f'"{password_value}"'.encode("utf-16le")
                 password_mod = [(MODIFY_REPLACE, "unicodePwd", [encoded_password])]
                 
-                if ldap_conn.modify_entry(dn, password_mod):
+                if await ldap_conn.modify_entry(dn, password_mod):
                     logger.info(f"✅ Password set via LDAP")
                     password_reset_success = True
                     changes.append({
@@ -1544,8 +1686,10 @@ async def update_user(
             if not password_reset_success and platform.system() == "Windows":
                 logger.info(f"🔑 Method 2: Setting password via PowerShell ADSI")
                 try:
-                    if set_password_via_powershell(dn, password_value):
+                    if await run_blocking(ldap_executor, set_password_via_powershell, dn, password_value):
                         password_reset_success = True
+                        # Changed outside our LDAP connection: drop cached reads (pwdLastSet)
+                        ldap_conn.invalidate_entry(dn)
                         logger.info(f"✅ Password set via PowerShell ADSI successfully")
                         changes.append({
                             "field": "password",
@@ -1567,37 +1711,37 @@ async def update_user(
         if modifications:
             logger.info(f"📤 Applying {len(modifications)} modifications to {dn}")
             
-            if not ldap_conn.modify_entry(dn, modifications):
-                logger.error(f"❌ Failed to modify entry: {ldap_conn.connection.last_error if ldap_conn.connection else 'Unknown error'}")
-                raise InternalServerError(f"Failed to update user: {ldap_conn.connection.last_error if ldap_conn.connection else 'Unknown error'}")
+            if not await ldap_conn.modify_entry(dn, modifications):
+                logger.error(f"❌ Failed to modify entry: {ldap_conn.last_error or 'Unknown error'}")
+                raise InternalServerError(f"Failed to update user: {ldap_conn.last_error or 'Unknown error'}")
             
             logger.info(f"✅ User updated successfully: {dn}")
         
         # Fetch updated user details to return in response (for frontend sync)
         refreshed_user = None
         try:
-            refreshed_result = ldap_conn.search(
+            refreshed_result = await ldap_conn.read_entry(
                 dn,
-                "(objectClass=user)",
                 ["cn", "sAMAccountName", "mail", "displayName", "givenName", "sn",
                  "title", "telephoneNumber", "mobile", "department", "company",
                  "employeeID", "physicalDeliveryOfficeName", "streetAddress", "l",
                  "st", "postalCode", "co", "description",
                  "userAccountControl", "memberOf", "whenCreated", "whenChanged",
-                 "lastLogon", "pwdLastSet"]
+                 "lastLogon", "pwdLastSet"],
+                object_filter="(objectClass=user)"
             )
             if refreshed_result:
-                refreshed_user = format_user_data(refreshed_result[0], full_details=True)
+                refreshed_user = format_user_data(refreshed_result, full_details=True)
         except Exception as fetch_error:
             logger.warning(f"⚠️ Could not fetch refreshed user data: {fetch_error}")
             refreshed_user = None
         
         # Invalidate cache after user update
-        invalidate_cache("get_users")
+        await invalidate_cache_async("get_users")
         
         # Log activity with detailed changes
         action_type = "password_reset" if password_changed else "user_update"
-        activity_log_manager.log_activity(
+        await async_activity_log_manager.log_activity(
             user_id=token_data.username,
             action_type=action_type,
             target_type="user",
@@ -1642,16 +1786,16 @@ async def toggle_user_status(
     _ = Depends(check_api_key_permission)
 ):
     """Enable/Disable user account"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         # Get current user account control
-        results = ldap_conn.search(dn, "(objectClass=user)", ["userAccountControl"])
+        entry = await ldap_conn.read_entry(dn, ["userAccountControl"], object_filter="(objectClass=user)")
         
-        if not results:
+        if not entry:
             raise NotFoundError("User", dn)
         
-        current_uac = int(results[0][1].get("userAccountControl", ["0"])[0])
+        current_uac = int(entry[1].get("userAccountControl", ["0"])[0])
         is_disabled = is_account_disabled(current_uac)
         
         # Toggle status
@@ -1662,14 +1806,14 @@ async def toggle_user_status(
         
         modifications = [(MODIFY_REPLACE, "userAccountControl", [str(new_uac)])]
         
-        if not ldap_conn.modify_entry(dn, modifications):
+        if not await ldap_conn.modify_entry(dn, modifications):
             raise InternalServerError("Failed to toggle user status")
         
         # Invalidate cache after status toggle
-        invalidate_cache("get_users")
+        await invalidate_cache_async("get_users")
         
         # Log activity
-        activity_log_manager.log_activity(
+        await async_activity_log_manager.log_activity(
             user_id=token_data.username,
             action_type="user_status_change",
             target_type="user",
@@ -1707,19 +1851,19 @@ async def delete_user(
     _ = Depends(check_api_key_permission)
 ):
     """Delete user from Active Directory"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         user_name = dn.split(',')[0].replace('CN=', '')
         
-        if not ldap_conn.delete_entry(dn):
+        if not await ldap_conn.delete_entry(dn):
             raise InternalServerError("Failed to delete user")
         
         # Invalidate cache after user deletion
-        invalidate_cache("get_users")
+        await invalidate_cache_async("get_users")
         
         # Log activity
-        activity_log_manager.log_activity(
+        await async_activity_log_manager.log_activity(
             user_id=token_data.username,
             action_type="user_delete",
             target_type="user",
@@ -1744,19 +1888,19 @@ async def delete_user(
 @router.get("/{dn}/password-expiry", response_model=PasswordExpiryResponse)
 async def get_password_expiry(dn: str, token_data = Depends(verify_token)):
     """Get password expiry information for a user"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
-        results = ldap_conn.search(
+        entry = await ldap_conn.read_entry(
             dn,
-            "(objectClass=user)",
-            ["pwdLastSet", "userAccountControl"]
+            ["pwdLastSet", "userAccountControl"],
+            object_filter="(objectClass=user)"
         )
         
-        if not results:
+        if not entry:
             raise NotFoundError("User", dn)
         
-        _, attrs = results[0]
+        _, attrs = entry
         pwd_last_set = attrs.get("pwdLastSet", [None])[0]
         
         # Mock data for now - AD password policies would need to be queried separately
@@ -1882,7 +2026,7 @@ def get_last_login_ip_from_eventlog(username: str) -> Optional[str]:
 @router.get("/{dn}/login-history", response_model=List[Dict[str, Any]])
 async def get_login_history(dn: str, token_data = Depends(verify_token)):
     """Get login history for a user"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     def convert_filetime_to_datetime(value):
         """Convert LDAP timestamp (FILETIME or ISO string) to datetime"""
@@ -1902,9 +2046,8 @@ async def get_login_history(dn: str, token_data = Depends(verify_token)):
             return default
     
     try:
-        results = ldap_conn.search(
+        entry = await ldap_conn.read_entry(
             dn,
-            "(objectClass=user)",
             [
                 "lastLogon", 
                 "lastLogonTimestamp", 
@@ -1913,10 +2056,11 @@ async def get_login_history(dn: str, token_data = Depends(verify_token)):
                 "userWorkstations",
                 "sAMAccountName",
                 "cn"
-            ]
+            ],
+            object_filter="(objectClass=user)"
         )
         
-        if not results or len(results) == 0:
+        if not entry:
             # Return friendly message instead of 404
             return [{
                 "id": 1,
@@ -1927,9 +2071,9 @@ async def get_login_history(dn: str, token_data = Depends(verify_token)):
                 "note": "ไม่พบข้อมูลผู้ใช้ในระบบ AD"
             }]
         
-        # Safety check: ensure results[0] exists and is a tuple
-        if len(results) == 0 or not isinstance(results[0], tuple) or len(results[0]) < 2:
-            logger.warning(f"Invalid LDAP result format for {dn}: {results}")
+        # Safety check: ensure entry is a (dn, attrs) tuple
+        if not isinstance(entry, tuple) or len(entry) < 2:
+            logger.warning(f"Invalid LDAP result format for {dn}: {entry}")
             return [{
                 "id": 1,
                 "loginTime": datetime.now().isoformat(),
@@ -1939,7 +2083,7 @@ async def get_login_history(dn: str, token_data = Depends(verify_token)):
                 "note": "ไม่พบข้อมูลผู้ใช้ในระบบ AD (รูปแบบข้อมูลไม่ถูกต้อง)"
             }]
         
-        _, attrs = results[0]
+        _, attrs = entry
         
         login_history = []
         
@@ -2016,19 +2160,19 @@ async def get_login_history(dn: str, token_data = Depends(verify_token)):
 @router.get("/{dn}/groups", response_model=List[Dict[str, Any]])
 async def get_user_groups(dn: str, token_data = Depends(verify_token)):
     """Get groups that a user is a member of"""
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
-        results = ldap_conn.search(
+        entry = await ldap_conn.read_entry(
             dn,
-            "(objectClass=user)",
-            ["memberOf"]
+            ["memberOf"],
+            object_filter="(objectClass=user)"
         )
         
-        if not results:
+        if not entry:
             raise NotFoundError("User", dn)
         
-        _, attrs = results[0]
+        _, attrs = entry
         member_of = attrs.get("memberOf", [])
         
         groups = []
@@ -2057,7 +2201,7 @@ async def get_user_permissions(dn: str, token_data = Depends(verify_token)):
     """Get permissions for a user based on AD groups"""
     from urllib.parse import unquote
     
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         # URL decode the DN to handle special characters
@@ -2067,16 +2211,16 @@ async def get_user_permissions(dn: str, token_data = Depends(verify_token)):
             logger.warning(f"Failed to URL decode DN, using original: {decode_error}")
             decoded_dn = dn
         
-        results = ldap_conn.search(
+        entry = await ldap_conn.read_entry(
             decoded_dn,
-            "(objectClass=user)",
-            ["memberOf"]
+            ["memberOf"],
+            object_filter="(objectClass=user)"
         )
         
-        if not results:
+        if not entry:
             raise NotFoundError("User", decoded_dn)
         
-        _, attrs = results[0]
+        _, attrs = entry
         member_of = attrs.get("memberOf", [])
         
         permissions = []
@@ -2116,7 +2260,7 @@ async def debug_user_attributes(
     """Debug endpoint to check raw LDAP attributes for a user"""
     from urllib.parse import unquote
     
-    ldap_conn = get_ldap_connection()
+    ldap_conn = get_async_ldap_connection()
     
     try:
         # URL decode the DN to handle special characters
@@ -2127,7 +2271,7 @@ async def debug_user_attributes(
             decoded_dn = dn
         
         # Try to search for the user by DN first
-        results = ldap_conn.search(
+        results = await ldap_conn.search(
             decoded_dn,
             "(objectClass=user)",
             ["*"]  # Get all attributes
@@ -2141,7 +2285,7 @@ async def debug_user_attributes(
                 cn_value = cn_match.group(1)
                 # Try searching by CN
                 search_filter = f"(&(objectClass=user)(cn={cn_value}))"
-                results = ldap_conn.search(
+                results = await ldap_conn.search(
                     settings.LDAP_BASE_DN,
                     search_filter,
                     ["*"]
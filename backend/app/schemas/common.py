@@ -60,3 +60,24 @@ class PaginatedResponse(BaseModel, Generic[T]):
             }
         }
 
+
+class CursorPaginatedResponse(BaseModel, Generic[T]):
+    """Keyset-paginated response; pass next_cursor back as ``cursor`` for the following page"""
+    items: list[T]
+    total: int
+    page_size: int
+    next_cursor: Optional[str] = None
+    has_more: bool
+    snapshot: str  # Result snapshot the pages are read from (changes if the walk had to restart from live data)
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [],
+                "total": 0,
+                "page_size": 50,
+                "next_cursor": None,
+                "has_more": False,
+                "snapshot": "k3Jd9sQx2Lw"
+            }
+        }
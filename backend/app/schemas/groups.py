@@ -1,7 +1,7 @@
 """
 Group management schemas
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 class GroupCreate(BaseModel):
@@ -41,6 +41,33 @@ class GroupMemberRemove(BaseModel):
     """Remove member from group request model"""
     user_dn: str
 
+class BulkMembershipOperation(BaseModel):
+    """Every member in member_dns is added to / removed from every group in group_dns"""
+    group_dns: List[str] = Field(..., min_length=1)
+    member_dns: List[str] = Field(..., min_length=1)
+
+class BulkMembershipRequest(BaseModel):
+    """Bulk membership request model (one user into many groups, many users into one group, or many to many)"""
+    add: List[BulkMembershipOperation] = []
+    remove: List[BulkMembershipOperation] = []
+
+class BulkMembershipResult(BaseModel):
+    """Outcome for one (group, member) pair"""
+    group_dn: str
+    member_dn: str
+    action: str  # add or remove
+    success: bool
+    error: Optional[str] = None
+
+class BulkMembershipResponse(BaseModel):
+    """Bulk membership response model"""
+    success: bool  # True only if every pair succeeded
+    message: str
+    succeeded: int
+    failed: int
+    modify_operations: int
+    results: List[BulkMembershipResult]
+
 class GroupMemberResponse(BaseModel):
     """Group member response model"""
     dn: str
@@ -0,0 +1,99 @@
+"""
+Micro-benchmark: ldap3 Entry-based decoding vs raw-response decoding
+
+Runs against an in-memory ldap3 MOCK_SYNC server with the AD 2012 R2 schema,
+so no domain controller is needed.
+
+Usage:
+    python benchmark_ldap_decode.py [users] [rounds]
+"""
+import os
+import sys
+import time
+import uuid
+
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from ldap3 import Server, Connection, MOCK_SYNC, OFFLINE_AD_2012_R2, SUBTREE
+
+from app.core.database import decode_search_response
+
+BASE_DN = "OU=Bench,DC=tbkk,DC=co,DC=th"
+ATTRIBUTES = [
+    "cn", "sAMAccountName", "displayName", "mail", "department", "title",
+    "userAccountControl", "whenCreated", "lastLogonTimestamp", "memberOf", "objectGUID"
+]
+
+
+def entries_to_dicts(connection):
+    """Previous decoding path: ldap3 Entry objects, str() on every value"""
+    results = []
+    for entry in connection.entries:
+        entry_dict = {}
+        for attr in entry.entry_attributes:
+            values = []
+            for value in entry[attr].values:
+                if isinstance(value, bytes):
+                    values.append(value.decode('utf-8'))
+                else:
+                    values.append(str(value))
+            entry_dict[attr] = values
+        results.append((str(entry.entry_dn), entry_dict))
+    return results
+
+
+def build_connection(user_count: int) -> Connection:
+    server = Server("bench", get_info=OFFLINE_AD_2012_R2)
+    connection = Connection(server, user="CN=bench,DC=tbkk,DC=co,DC=th", password="bench", client_strategy=MOCK_SYNC)
+    connection.strategy.add_entry("CN=bench,DC=tbkk,DC=co,DC=th", {"userPassword": "bench", "sn": "bench"})
+    for i in range(user_count):
+        connection.strategy.add_entry(f"CN=user{i},{BASE_DN}", {
+            "objectClass": ["top", "person", "organizationalPerson", "user"],
+            "cn": f"user{i}",
+            "sAMAccountName": f"user{i}",
+            "displayName": f"ผู้ใช้ทดสอบ {i}",
+            "mail": f"user{i}@tbkk.co.th",
+            "department": f"Dept {i % 40}",
+            "title": "Engineer",
+            "userAccountControl": "512",
+            "whenCreated": "20240101000000.0Z",
+            "lastLogonTimestamp": str(133500000000000000 + i),
+            "memberOf": [f"CN=Group{i % 25},{BASE_DN}", f"CN=All,{BASE_DN}"],
+            "objectGUID": uuid.uuid4().bytes_le,
+        })
+    connection.bind()
+    return connection
+
+
+def time_decoder(name, connection, decode, rounds: int):
+    best = None
+    for _ in range(rounds):
+        # Drop ldap3's cached Entry objects so each round pays the full cost
+        connection._entries = None
+        started = time.perf_counter()
+        results = decode(connection)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    per_entry_us = best / max(len(results), 1) * 1_000_000
+    print(f"{name:<28} {best * 1000:9.1f} ms  {per_entry_us:7.2f} µs/entry  ({len(results)} entries)")
+    return best
+
+
+def main():
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    print(f"🔧 Building mock directory with {user_count} users...")
+    connection = build_connection(user_count)
+    connection.search(BASE_DN, "(objectClass=user)", SUBTREE, attributes=ATTRIBUTES)
+
+    print(f"⏱️ Best of {rounds} rounds:")
+    entry_time = time_decoder("ldap3 Entry objects", connection, entries_to_dicts, rounds)
+    raw_time = time_decoder("decode_search_response", connection, lambda c: decode_search_response(c.response), rounds)
+    print(f"🚀 Speedup: {entry_time / raw_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Micro-benchmark: list-scanning sliding-window limiter vs GCRA limiter
+
+Sends requests for one API key at a steady rate of simulated time and
+reports the cost per check as the number of requests already counted in
+the window grows. The GCRA cost should stay flat.
+
+Usage:
+    python benchmark_rate_limit.py [max_requests_per_window] [checks]
+"""
+import gc
+import os
+import sys
+import time
+from collections import defaultdict
+
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from app.core.rate_limit import RateLimiter
+
+WINDOW_SECONDS = 60
+
+
+class SlidingWindowLimiter:
+    """Previous implementation: a (timestamp, count) list per identifier and window"""
+
+    def __init__(self):
+        self._requests = defaultdict(lambda: defaultdict(list))
+
+    def check_rate_limit(self, identifier, limit, window_seconds, now):
+        window_key = f"window_{window_seconds}"
+        cutoff_time = now - window_seconds
+        self._requests[identifier][window_key] = [
+            (ts, count) for ts, count in self._requests[identifier][window_key] if ts > cutoff_time
+        ]
+        current_count = sum(count for ts, count in self._requests[identifier][window_key] if ts > cutoff_time)
+        is_allowed = current_count < limit
+        if is_allowed:
+            self._requests[identifier][window_key].append((now, 1))
+        return is_allowed
+
+
+def time_checks(name, check, in_window: int, checks: int) -> float:
+    """µs per check once ``in_window`` requests are counted in the window"""
+    spacing = WINDOW_SECONDS / in_window
+    now = 1_000_000.0
+    # Warm up: fill the window
+    for _ in range(in_window):
+        check(now)
+        now += spacing
+    started = time.perf_counter()
+    for _ in range(checks):
+        check(now)
+        now += spacing
+    elapsed = time.perf_counter() - started
+    per_check_us = elapsed / checks * 1_000_000
+    print(f"  {name:<16} {per_check_us:9.2f} µs/check")
+    return per_check_us
+
+
+def main():
+    max_in_window = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    checks = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    sizes = [size for size in (10, 100, 1000, 10000, 100000) if size <= max_in_window]
+    print(f"⏱️ {checks} checks per run, limit = requests per window (every request admitted)")
+    results = []
+    for size in sizes:
+        print(f"📈 {size} requests in the {WINDOW_SECONDS}s window:")
+        sliding = SlidingWindowLimiter()
+        gcra = RateLimiter()
+        old = time_checks("sliding window", lambda now: sliding.check_rate_limit("key", size + 1, WINDOW_SECONDS, now),
+                          size, checks)
+        new = time_checks("GCRA", lambda now: gcra._evaluate("key", [(size + 1, WINDOW_SECONDS), ((size + 1) * 60, 3600)],
+                                                             1, consume=True, now=now), size, checks)
+        results.append((size, old, new))
+        del sliding, gcra
+        gc.collect()
+
+    print("📊 Summary (µs/check):")
+    for size, old, new in results:
+        print(f"  {size:>7} in window  sliding {old:9.2f}  GCRA {new:6.2f}  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
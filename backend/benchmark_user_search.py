@@ -0,0 +1,114 @@
+"""
+Micro-benchmark: linear scan vs UserSearchIndex for users-list searches
+
+Builds a synthetic directory of Latin and Thai user names and times the
+searches the frontend search box sends while a name is being typed
+(q across cn / sAMAccountName / mail / displayName) plus field searches in
+each search mode. Index lookups should stay well under 10 ms.
+
+Usage:
+    python benchmark_user_search.py [users] [repeats]
+"""
+import gc
+import os
+import random
+import sys
+import time
+
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from app.core.search_index import UserSearchIndex, fold_text
+
+LATIN_NAMES = ["somchai", "suda", "anan", "preecha", "malee", "john", "maria", "kenji", "wei", "nattapong"]
+THAI_NAMES = ["สมชาย", "สุดา", "อนันต์", "ปรีชา", "มาลี", "ณัฐพงศ์", "กิตติ", "วิไล", "ธนากร", "พรทิพย์"]
+SURNAMES = ["jaidee", "srisuk", "wongsa", "smith", "tanaka", "ใจดี", "ศรีสุข", "วงศ์สา", "บุญมา", "ทองดี"]
+DEPARTMENTS = ["IT", "HR", "Finance", "Production", "QA", "ฝ่ายบัญชี", "ฝ่ายผลิต", "ฝ่ายไอที"]
+Q_ATTRIBUTES = ("cn", "sAMAccountName", "mail", "displayName")
+
+
+def make_users(count: int):
+    rng = random.Random(42)
+    users = []
+    for i in range(count):
+        first = rng.choice(LATIN_NAMES + THAI_NAMES)
+        last = rng.choice(SURNAMES)
+        username = f"u{i:06d}"
+        users.append({
+            "cn": f"{first} {last} {i}",
+            "sAMAccountName": username,
+            "mail": f"{username}@tbkk.co.th",
+            "displayName": f"{first.title()} {last.title()}",
+            "title": rng.choice(["Engineer", "Manager", "Operator", "วิศวกร", "ผู้จัดการ"]),
+            "department": rng.choice(DEPARTMENTS),
+            "physicalDeliveryOfficeName": rng.choice(["Chonburi", "Bangkok", "ชลบุรี"]),
+        })
+    return users
+
+
+def scan(users, all_of, any_of, mode):
+    """Reference: fold and compare every value (what filtering without the index costs)"""
+    def matches(value, term):
+        value = fold_text(value)
+        if not value:
+            return False
+        if mode == "starts_with":
+            return value.startswith(term)
+        if mode == "exact":
+            return value == term
+        if mode == "ends_with":
+            return value.endswith(term)
+        return term in value
+
+    all_of = [(attribute, fold_text(term)) for attribute, term in all_of]
+    any_of = [(attribute, fold_text(term)) for attribute, term in any_of]
+    return [
+        user_id for user_id, user in enumerate(users)
+        if all(matches(user.get(attribute), term) for attribute, term in all_of)
+        and (not any_of or any(matches(user.get(attribute), term) for attribute, term in any_of))
+    ]
+
+
+def time_call(func, repeats: int) -> float:
+    """Best ms per call over repeats"""
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    users = make_users(count)
+    started = time.perf_counter()
+    index = UserSearchIndex(users)
+    print(f"🏗️ Indexed {count} users in {(time.perf_counter() - started) * 1000:.0f} ms: {index.stats()}")
+
+    queries = [("typeahead", [], [(attribute, text) for attribute in Q_ATTRIBUTES], "contains")
+               for text in ("s", "so", "som", "somc", "somchai", "สม", "สมชา", "ใจดี")]
+    queries += [
+        ("field", [("department", "ฝ่าย")], [], "starts_with"),
+        ("field", [("mail", "@tbkk.co.th")], [], "ends_with"),
+        ("field", [("department", "it")], [], "exact"),
+        ("field", [("title", "engineer"), ("cn", "jaidee")], [], "contains"),
+    ]
+
+    print(f"⏱️ best of {repeats} (ms):")
+    for kind, all_of, any_of, mode in queries:
+        expected = scan(users, all_of, any_of, mode)
+        assert index.search(all_of, any_of, mode) == expected, (all_of, any_of, mode)
+        scanned = time_call(lambda: scan(users, all_of, any_of, mode), repeats)
+        indexed = time_call(lambda: index.search(all_of, any_of, mode), repeats)
+        term = (any_of or all_of)[0][1] if len(all_of) < 2 else " + ".join(term for _, term in all_of)
+        print(f"  {kind:<9} {mode:<11} {term!r:<22} {len(expected):>6} hits  "
+              f"scan {scanned:8.2f}  index {indexed:6.2f}  ({scanned / max(indexed, 1e-6):.0f}x)")
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Request-level check: POST /api/groups/members/bulk
+
+Sends bulk membership requests through the FastAPI app (routing, request
+validation, the handler, BulkMembershipJob and the response model) against
+an in-memory directory instead of a domain controller, and checks the
+per-pair results and the number of modify operations.
+
+Usage:
+    python check_group_bulk_membership.py
+"""
+import os
+import sys
+
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import groups as groups_router
+from app.routers.auth import check_api_key_permission, verify_token_or_api_key
+from app.schemas.auth import TokenData
+
+BASE_DN = "DC=example,DC=local"
+GROUPS = [f"CN=Group{i},OU=Groups,{BASE_DN}" for i in range(3)]
+USERS = [f"CN=User{i},OU=Users,{BASE_DN}" for i in range(4)]
+
+
+class InMemoryDirectory:
+    """The parts of AsyncLDAPConnection used by bulk_update_group_members"""
+
+    def __init__(self):
+        self.members = {dn.lower(): set() for dn in GROUPS}
+        self.modifies = 0
+        self.last_error = None
+
+    async def resolve_dns(self, dns, attributes=None, object_filter=None, chunk_size=None):
+        known = set(self.members) if object_filter == "(objectClass=group)" else {dn.lower() for dn in GROUPS + USERS}
+        found = {dn: (dn, {}) for dn in dns if dn.lower() in known}
+        return found, [dn for dn in dns if dn.lower() not in known]
+
+    async def modify_entry(self, dn, modifications, controls=None):
+        self.modifies += 1
+        members = self.members[dn.lower()]
+        for operation, _, values in modifications:
+            if operation == "MODIFY_ADD":
+                members.update(value.lower() for value in values)
+            else:
+                members.difference_update(value.lower() for value in values)
+        return True
+
+
+class ActivityLogRecorder:
+    def __init__(self):
+        self.entries = []
+
+    async def log_activity(self, **entry):
+        self.entries.append(entry)
+
+
+def main():
+    directory = InMemoryDirectory()
+    activity_log = ActivityLogRecorder()
+    groups_router.get_async_ldap_connection = lambda: directory
+    groups_router.async_activity_log_manager = activity_log
+    app.dependency_overrides[verify_token_or_api_key] = lambda: TokenData(username="bulk-check")
+    app.dependency_overrides[check_api_key_permission] = lambda: None
+    client = TestClient(app)  # No lifespan: startup would connect to LDAP
+
+    # One user into one group
+    response = client.post("/api/groups/members/bulk", json={"add": [{"group_dns": [GROUPS[0]], "member_dns": [USERS[0]]}]})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["success"] and body["succeeded"] == 1 and body["modify_operations"] == 1, body
+    assert USERS[0].lower() in directory.members[GROUPS[0].lower()]
+
+    # Many to many plus removes: one modify per group, one result per pair, unknown members reported
+    directory.modifies = 0
+    response = client.post("/api/groups/members/bulk", json={
+        "add": [{"group_dns": GROUPS[1:], "member_dns": USERS[1:] + [f"CN=Missing,{BASE_DN}"]}],
+        "remove": [{"group_dns": [GROUPS[0]], "member_dns": [USERS[0]]}],
+    })
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (7, 2), body
+    assert body["modify_operations"] == directory.modifies == 3, body
+    assert not directory.members[GROUPS[0].lower()]
+    assert all(result["error"] == "Member not found" for result in body["results"] if not result["success"])
+    assert {entry["action_type"] for entry in activity_log.entries} == {"group_member_bulk"}
+
+    # Nothing to do is a validation error, not a 500
+    response = client.post("/api/groups/members/bulk", json={"add": [], "remove": []})
+    assert response.status_code == 400, response.text
+
+    print("✅ POST /api/groups/members/bulk: adds, removes, per-pair results and validation OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -155,7 +155,7 @@ const Dashboard = () => {
         }),
         axios.get(`${config.apiUrl}/api/groups`, { 
           headers: getAuthHeaders(), 
-          params: { page: 1, page_size: 1000 },
+          params: { page: 1, page_size: 1000, include_members: false },
           timeout: 0 // No timeout
         }),
         axios.get(`${config.apiUrl}/api/ous`, { 
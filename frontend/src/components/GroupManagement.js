@@ -133,6 +133,7 @@ const GroupManagement = () => {
       const params = {
         page_size: 10000,
         page: 1,
+        include_members: false, // only memberCount is shown
         _t: forceRefresh ? Date.now() : undefined
       };
       